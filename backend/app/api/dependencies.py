@@ -1,6 +1,11 @@
 from fastapi import Request, Depends, HTTPException
-from app.core.rate_limit import check_rate_limit_shorten, check_rate_limit_api
+from app.core.rate_limit import (
+    check_rate_limit_shorten,
+    check_rate_limit_api,
+    check_rate_limit_shorten_batch,
+)
 from app.schemas.errors import RateLimitErrorResponse
+from app.schemas.shorten import BatchShortenRequest
 
 
 def get_client_ip(request: Request) -> str:
@@ -32,3 +37,14 @@ async def rate_limit_api_dependency(request: Request) -> None:
             status_code=429,
             detail=RateLimitErrorResponse(error="Rate limit exceeded", retry_after_seconds=retry_after).model_dump(),
         )
+
+
+async def rate_limit_shorten_batch_dependency(request: Request, body: BatchShortenRequest) -> None:
+    """Per-item rate limiting for bulk URL creation, separate from the single-URL budget."""
+    ip = get_client_ip(request)
+    allowed, retry_after = await check_rate_limit_shorten_batch(ip, cost=len(body.urls))
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=RateLimitErrorResponse(error="Rate limit exceeded", retry_after_seconds=retry_after).model_dump(),
+        )
@@ -1,11 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
-from app.schemas.analytics import AnalyticsResponse, DayCount
-from app.services.analytics_service import AnalyticsService
+from app.core.config import get_settings
+from app.core.database import get_read_db
+from app.schemas.analytics import (
+    AnalyticsBatchRequest,
+    AnalyticsBatchResponse,
+    AnalyticsResponse,
+    DayCount,
+    MinuteCount,
+    RealtimeResponse,
+    TopLink,
+    TopLinksResponse,
+)
+from app.services.analytics_service import DAYS, AnalyticsService, Granularity, parse_tz_offset
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 analytics_service = AnalyticsService()
+_settings = get_settings()
+
+
+@router.post(
+    "/batch",
+    response_model=AnalyticsBatchResponse,
+    summary="Get daily click analytics for many aliases",
+    description=(
+        "Returns UTC daily click counts for the last `days` days for up to "
+        "`ANALYTICS_BATCH_MAX_ALIASES` aliases, e.g. to draw a page of sparklines in one "
+        "round-trip.\n\n"
+        "Aliases are resolved with one query and every series not already in memory is "
+        "read with one grouped query. Unknown aliases are listed in `not_found`."
+    ),
+    response_description="Per-alias analytics, in request order.",
+)
+async def get_analytics_batch(
+    body: AnalyticsBatchRequest,
+    db: AsyncSession = Depends(get_read_db, scope="function"),
+) -> AnalyticsBatchResponse:
+    aliases = list(dict.fromkeys(body.aliases))
+    data = await analytics_service.get_clicks_by_day_many(db, aliases, days=body.days)
+    return AnalyticsBatchResponse(
+        results=[
+            AnalyticsResponse(
+                alias=alias,
+                clicks_by_day=[DayCount(date=d, clicks=c) for d, c in data[alias]],
+            )
+            for alias in aliases
+            if alias in data
+        ],
+        not_found=[alias for alias in aliases if alias not in data],
+    )
+
+
+@router.get(
+    "/top",
+    response_model=TopLinksResponse,
+    summary="Get the most-clicked links",
+    description=(
+        "Returns the most-clicked links over a sliding `window` of the last hour, 24 hours "
+        "or 7 days, answered from in-memory heavy-hitter sketches without touching the "
+        "clicks table.\n\n"
+        "Counts are estimates: each link's true count is within `clicks ± error`. A link "
+        "the sketches don't track has at most `max_error` clicks, and any unlisted link at "
+        "most the last listed `clicks` plus `max_error`. Windows slide in steps of 1/12 "
+        "(1h), 1/24 (24h) or 1/28 (7d) of their length and cover clicks this worker has "
+        "recorded since it started."
+    ),
+    response_description="Top links with error bounds.",
+)
+async def get_top_links(
+    window: Literal["1h", "24h", "7d"] = Query("24h", description="Sliding window."),
+    limit: int = Query(10, ge=1, le=100, description="Number of links to return."),
+    db: AsyncSession = Depends(get_read_db, scope="function"),
+) -> TopLinksResponse:
+    top, total, max_error = await analytics_service.get_top(db, window, limit)
+    return TopLinksResponse(
+        window=window,
+        total_clicks=total,
+        max_error=max_error,
+        links=[
+            TopLink(alias=url.alias, original_url=url.original_url, clicks=clicks, error=error)
+            for url, clicks, error in top
+        ],
+    )
 
 
 @router.get(
@@ -13,11 +90,17 @@ analytics_service = AnalyticsService()
     response_model=AnalyticsResponse,
     summary="Get click analytics for an alias",
     description=(
-        "Returns click counts broken down by calendar day for the **last 7 days**.\n\n"
-        "Results are cached; cache is invalidated when a new redirect is recorded."
+        "Returns click counts for the last `days` days (default 7), bucketed by calendar "
+        "day or by hour in the UTC offset given by `tz`.\n\n"
+        "UTC daily series also carry approximate `unique_visitors` per day and for the "
+        "whole window, estimated from per-day HyperLogLog sketches (about 1.6% error).\n\n"
+        "UTC daily series of up to `ANALYTICS_LIVE_DAYS` days are served from live "
+        "in-memory counters and include every click this worker has recorded; other "
+        "variants are cached for a short time."
     ),
     response_description="Analytics data with per-day click counts.",
     responses={
+        400: {"description": "Invalid `tz` offset."},
         404: {
             "description": "Alias not found.",
             "content": {
@@ -28,12 +111,63 @@ analytics_service = AnalyticsService()
 )
 async def get_analytics(
     alias: str,
-    db: AsyncSession = Depends(get_db),
+    days: int = Query(DAYS, ge=1, le=_settings.ANALYTICS_MAX_DAYS, description="Number of days to cover."),
+    granularity: Granularity = Query("day", description="Bucket size."),
+    tz: str = Query("+00:00", description="UTC offset for bucket boundaries, e.g. `+05:30` or `-08:00`."),
+    db: AsyncSession = Depends(get_read_db, scope="function"),
 ) -> AnalyticsResponse:
-    data = await analytics_service.get_clicks_by_day(db, alias, use_cache=True)
+    try:
+        tz_offset_minutes = parse_tz_offset(tz)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    data = await analytics_service.get_click_series(
+        db, alias, days=days, granularity=granularity, tz_offset_minutes=tz_offset_minutes, use_cache=True
+    )
     if data is None:
         raise HTTPException(status_code=404, detail="Alias not found")
+    if granularity != "day" or tz_offset_minutes != 0:
+        # Visitor sketches are kept per UTC day
+        return AnalyticsResponse(
+            alias=alias,
+            granularity=granularity,
+            clicks_by_day=[DayCount(date=d, clicks=c) for d, c in data],
+        )
+    per_day, unique_visitors = await analytics_service.get_unique_visitors(db, alias, days=days)
     return AnalyticsResponse(
         alias=alias,
-        clicks_by_day=[DayCount(date=d, clicks=c) for d, c in data],
+        granularity=granularity,
+        clicks_by_day=[DayCount(date=d, clicks=c, unique_visitors=per_day.get(d, 0)) for d, c in data],
+        unique_visitors=unique_visitors,
+    )
+
+
+@router.get(
+    "/{alias}/realtime",
+    response_model=RealtimeResponse,
+    summary="Get per-minute click counts for an alias",
+    description=(
+        "Returns clicks per UTC minute for the last `minutes` minutes (default and max "
+        "`ANALYTICS_REALTIME_MINUTES`), ending with the current minute. Served from "
+        "in-memory per-minute counters that every redirect updates."
+    ),
+    response_description="Per-minute click counts and their total.",
+    responses={404: {"description": "Alias not found."}},
+)
+async def get_realtime_analytics(
+    alias: str,
+    minutes: int = Query(
+        _settings.ANALYTICS_REALTIME_MINUTES,
+        ge=1,
+        le=_settings.ANALYTICS_REALTIME_MINUTES,
+        description="Number of minutes to cover.",
+    ),
+    db: AsyncSession = Depends(get_read_db, scope="function"),
+) -> RealtimeResponse:
+    data = await analytics_service.get_realtime(db, alias, minutes=minutes)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Alias not found")
+    return RealtimeResponse(
+        alias=alias,
+        total=sum(c for _, c in data),
+        clicks_by_minute=[MinuteCount(minute=m, clicks=c) for m, c in data],
     )
@@ -1,14 +1,15 @@
 import re
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from app.api.dependencies import get_client_ip
+from app.core.database import get_db, get_read_db
+from app.core.security import visitor_hash
 from app.services.url_service import UrlService
-from app.repositories.click_repository import ClickRepository
+from app.services.click_buffer import click_buffer
 
 router = APIRouter(tags=["redirect"])
 url_service = UrlService()
-click_repo = ClickRepository()
 ALIAS_PATTERN = re.compile(r"^[a-zA-Z0-9]{6}$")
 
 
@@ -19,7 +20,8 @@ ALIAS_PATTERN = re.compile(r"^[a-zA-Z0-9]{6}$")
     description=(
         "Resolves a 6-character alphanumeric alias to its original destination URL "
         "and issues an HTTP **302 Found** redirect.\n\n"
-        "Each successful redirect is recorded as a click for analytics purposes."
+        "Each successful redirect is recorded as a click for analytics purposes. "
+        "Clicks are buffered and written in batches, so the redirect does not wait on the database."
     ),
     response_description="Redirect to the destination URL.",
     responses={
@@ -35,12 +37,16 @@ ALIAS_PATTERN = re.compile(r"^[a-zA-Z0-9]{6}$")
 )
 async def redirect_to_url(
     alias: str,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db, scope="function"),
+    write_db: AsyncSession = Depends(get_db, scope="function"),
 ) -> RedirectResponse:
     if not alias or not ALIAS_PATTERN.match(alias):
         raise HTTPException(status_code=404, detail="Not found")
-    url = await url_service.get_by_alias(db, alias)
+    url = await url_service.resolve(db, alias)
     if url is None:
         raise HTTPException(status_code=404, detail="Not found")
-    await click_repo.create(db, url_id=url.id)
+    # write_db is only opened when clicks are written inline (no background writer)
+    visitor = visitor_hash(get_client_ip(request), request.headers.get("user-agent", ""))
+    await click_buffer.record(write_db, url.id, visitor)
     return RedirectResponse(url=url.original_url, status_code=302)
\ No newline at end of file
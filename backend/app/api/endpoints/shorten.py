@@ -1,8 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
-from app.api.dependencies import rate_limit_shorten_dependency, get_client_ip
-from app.schemas.shorten import ShortenRequest, ShortenResponse
+from app.api.dependencies import (
+    rate_limit_shorten_dependency,
+    rate_limit_shorten_batch_dependency,
+    get_client_ip,
+)
+from app.schemas.shorten import (
+    ShortenRequest,
+    ShortenResponse,
+    BatchShortenRequest,
+    BatchShortenItem,
+    BatchShortenResponse,
+)
 from app.schemas.errors import RateLimitErrorResponse
 from app.services.url_service import UrlService
 
@@ -32,7 +42,7 @@ _ERROR_RESPONSES = {
     summary="Shorten a URL",
     description=(
         "Accepts a long URL and returns a short alias.\n\n"
-        "The alias is a random 6-character alphanumeric string.\n\n"
+        "The alias is a non-sequential 6-character alphanumeric string.\n\n"
         "This endpoint is **rate-limited**. When the limit is hit the response "
         "is `429 Too Many Requests` and the body contains `retry_after_seconds`."
     ),
@@ -43,7 +53,7 @@ _ERROR_RESPONSES = {
 async def shorten(
     body: ShortenRequest,
     request: Request,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ) -> ShortenResponse:
     ok, err = url_service.validate_input_url(body.url)
     if not ok:
@@ -51,3 +61,44 @@ async def shorten(
     base_url = str(request.base_url).rstrip("/")
     alias, short_url = await url_service.shorten(db, body.url, base_url)
     return ShortenResponse(alias=alias, short_url=short_url)
+
+
+@router.post(
+    "/batch",
+    response_model=BatchShortenResponse,
+    status_code=201,
+    summary="Shorten many URLs",
+    description=(
+        "Accepts up to `SHORTEN_BATCH_MAX_SIZE` URLs and creates them in a single transaction.\n\n"
+        "Every URL is validated up front; invalid ones are reported in their result's "
+        "`error` field and the rest are still created. Results are returned in input order.\n\n"
+        "This endpoint has its own rate-limit budget, **counted per URL** rather than per request."
+    ),
+    response_description="Per-URL results, in input order.",
+    responses={
+        429: {
+            "description": "Rate limit exceeded — too many URLs shortened in the window.",
+            "model": RateLimitErrorResponse,
+        },
+    },
+    dependencies=[Depends(rate_limit_shorten_batch_dependency)],
+)
+async def shorten_batch(
+    body: BatchShortenRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db, scope="function"),
+) -> BatchShortenResponse:
+    results = [BatchShortenItem(url=url) for url in body.urls]
+    valid = []
+    for item in results:
+        ok, err = url_service.validate_input_url(item.url)
+        if ok:
+            valid.append(item)
+        else:
+            item.error = err or "Invalid URL"
+    if valid:
+        base_url = str(request.base_url).rstrip("/")
+        created = await url_service.shorten_many(db, [item.url for item in valid], base_url)
+        for item, (alias, short_url) in zip(valid, created):
+            item.alias, item.short_url = alias, short_url
+    return BatchShortenResponse(results=results)
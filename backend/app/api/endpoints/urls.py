@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from app.core.config import get_settings
+from app.core.database import get_db, get_read_db
 from app.schemas.urls import UrlListItem, UpdateUrlRequest, ArchiveUrlRequest
 from app.services.url_service import UrlService
 
 router = APIRouter(prefix="/urls", tags=["urls"])
 url_service = UrlService()
+_settings = get_settings()
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 _404 = {
     "description": "Alias not found.",
@@ -26,12 +36,31 @@ _400 = {
 @router.get(
     "",
     response_model=list[UrlListItem],
-    summary="List all short URLs",
-    description="Returns every short URL in the system with its alias, original destination, total click count, and archived status.",
-    response_description="Array of URL records.",
+    summary="List short URLs",
+    description=(
+        "Returns one page of short URLs, newest first, with alias, original destination, "
+        "total click count, and archived status.\n\n"
+        f"When more URLs exist the response carries an `{NEXT_CURSOR_HEADER}` header; "
+        "pass its value as `cursor` to fetch the next page."
+    ),
+    response_description="Array of URL records for this page.",
+    responses={400: {"description": "Malformed cursor."}},
 )
-async def list_urls(db: AsyncSession = Depends(get_db)) -> list[UrlListItem]:
-    rows = await url_service.list_all(db)
+async def list_urls(
+    response: Response,
+    archived: bool | None = Query(None, description="Only archived (`true`) or only active (`false`) URLs; omit for both."),
+    limit: int = Query(
+        _settings.URL_LIST_PAGE_SIZE, ge=1, le=_settings.URL_LIST_MAX_PAGE_SIZE, description="Page size."
+    ),
+    cursor: str | None = Query(None, description=f"Value of `{NEXT_CURSOR_HEADER}` from the previous page."),
+    db: AsyncSession = Depends(get_read_db, scope="function"),
+) -> list[UrlListItem]:
+    try:
+        rows, next_cursor = await url_service.list_page(db, limit, archived=archived, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return [
         UrlListItem(
             alias=url.alias,
@@ -43,6 +72,92 @@ async def list_urls(db: AsyncSession = Depends(get_db)) -> list[UrlListItem]:
     ]
 
 
+_EXPORT_COLUMNS = ("alias", "original_url", "archived", "created_at", "total_clicks")
+_EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def _export_ndjson(batches) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(
+            json.dumps(
+                {
+                    "alias": alias,
+                    "original_url": original_url,
+                    "archived": archived,
+                    "created_at": created_at.isoformat(),
+                    "total_clicks": total_clicks,
+                }
+            ) + "\n"
+            for alias, original_url, archived, created_at, total_clicks in rows
+        )
+
+
+async def _export_csv(batches) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (alias, original_url, str(archived).lower(), created_at.isoformat(), total_clicks)
+            for alias, original_url, archived, created_at, total_clicks in rows
+        )
+        yield buffer.getvalue()
+
+
+@router.get(
+    "/export",
+    summary="Export all short URLs",
+    description=(
+        "Streams every short URL with its total click count, oldest first, as "
+        "newline-delimited JSON (`format=ndjson`) or CSV (`format=csv`). Rows are read "
+        "from a server-side cursor in batches, so memory use does not grow with the table."
+    ),
+    response_description="NDJSON or CSV stream with columns " + ", ".join(f"`{c}`" for c in _EXPORT_COLUMNS) + ".",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in _EXPORT_MEDIA_TYPES.values()}}},
+)
+async def export_urls(
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Output format."),
+    # Request scope: unlike every other endpoint's session, this one must stay open
+    # while the body streams, so get_read_db closes it after the response is sent
+    db: AsyncSession = Depends(get_read_db, scope="request"),
+) -> StreamingResponse:
+    batches = url_service.export_rows(db)
+    body = _export_csv(batches) if format == "csv" else _export_ndjson(batches)
+    return StreamingResponse(
+        body,
+        media_type=_EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="urls.{format}"'},
+    )
+
+
+@router.get(
+    "/{alias}",
+    response_model=UrlListItem,
+    summary="Get a short URL",
+    description="Returns one short URL with its original destination, total click count, and archived status.",
+    response_description="URL record.",
+    responses={404: _404},
+)
+async def get_url(
+    alias: str,
+    db: AsyncSession = Depends(get_read_db, scope="function"),
+) -> UrlListItem:
+    found = await url_service.get_with_stats(db, alias)
+    if not found:
+        raise HTTPException(status_code=404, detail="URL not found")
+    url, total_clicks = found
+    return UrlListItem(
+        alias=url.alias,
+        original_url=url.original_url,
+        total_clicks=total_clicks,
+        archived=url.archived,
+    )
+
+
 @router.patch(
     "/{alias}",
     response_model=UrlListItem,
@@ -54,11 +169,12 @@ async def list_urls(db: AsyncSession = Depends(get_db)) -> list[UrlListItem]:
 async def update_url(
     alias: str,
     body: UpdateUrlRequest,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ) -> UrlListItem:
-    url = await url_service.get_by_alias(db, alias)
-    if not url:
+    found = await url_service.get_with_stats(db, alias)
+    if not found:
         raise HTTPException(status_code=404, detail="URL not found")
+    url, total_clicks = found
     
     # Validate the new URL
     ok, err = url_service.validate_input_url(body.original_url)
@@ -68,21 +184,10 @@ async def update_url(
     updated_url = await url_service.update_url(db, url, body.original_url)
     await db.commit()
     
-    # Get total clicks for response
-    rows = await url_service.list_all(db)
-    for u, clicks in rows:
-        if u.alias == alias:
-            return UrlListItem(
-                alias=updated_url.alias,
-                original_url=updated_url.original_url,
-                total_clicks=clicks,
-                archived=updated_url.archived,
-            )
-    
     return UrlListItem(
         alias=updated_url.alias,
         original_url=updated_url.original_url,
-        total_clicks=0,
+        total_clicks=total_clicks,
         archived=updated_url.archived,
     )
 
@@ -98,30 +203,20 @@ async def update_url(
 async def archive_url(
     alias: str,
     body: ArchiveUrlRequest,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ) -> UrlListItem:
-    url = await url_service.get_by_alias(db, alias)
-    if not url:
+    found = await url_service.get_with_stats(db, alias)
+    if not found:
         raise HTTPException(status_code=404, detail="URL not found")
+    url, total_clicks = found
     
     updated_url = await url_service.archive_url(db, url, body.archived)
     await db.commit()
     
-    # Get total clicks for response
-    rows = await url_service.list_all(db)
-    for u, clicks in rows:
-        if u.alias == alias:
-            return UrlListItem(
-                alias=updated_url.alias,
-                original_url=updated_url.original_url,
-                total_clicks=clicks,
-                archived=updated_url.archived,
-            )
-    
     return UrlListItem(
         alias=updated_url.alias,
         original_url=updated_url.original_url,
-        total_clicks=0,
+        total_clicks=total_clicks,
         archived=updated_url.archived,
     )
 
@@ -136,7 +231,7 @@ async def archive_url(
 )
 async def delete_url(
     alias: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ) -> None:
     url = await url_service.get_by_alias(db, alias)
     if not url:
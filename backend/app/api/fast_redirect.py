@@ -0,0 +1,64 @@
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.api.dependencies import get_client_ip
+from app.api.endpoints.redirect import ALIAS_PATTERN
+from app.core.security import visitor_hash
+from app.services.click_buffer import ClickBuffer, click_buffer
+from app.services.url_service import UrlService
+
+_CONTENT_LENGTH_ZERO = (b"content-length", b"0")
+
+
+class RedirectFastPathMiddleware:
+    """Pure-ASGI shortcut for cached redirects.
+
+    Answers `GET /{alias}` with a 302 straight from the URL cache, using the
+    record's pre-encoded Location header, and queues the click on the same
+    buffer as the redirect endpoint. Anything else - cache misses, other
+    routes, or clicks that would have to be written inline because the
+    buffer isn't running - falls through to the wrapped app.
+    """
+
+    def __init__(self, app: ASGIApp, buffer: ClickBuffer = click_buffer) -> None:
+        self.app = app
+        self.buffer = buffer
+        self.url_service = UrlService()
+        self._reserved_paths: frozenset[str] | None = None
+
+    def _reserved(self, scope: Scope) -> frozenset[str]:
+        # Static routes such as /health take precedence over aliases. The
+        # application sets scope["app"]; without one there is nothing to cache.
+        if self._reserved_paths is None:
+            app = scope.get("app")
+            if app is None:
+                return frozenset()
+            self._reserved_paths = frozenset(
+                route.path for route in app.routes if "{" not in getattr(route, "path", "{")
+            )
+        return self._reserved_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or not self.buffer.running:
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        alias = path[1:]
+        if len(path) != 7 or not ALIAS_PATTERN.match(alias) or path in self._reserved(scope):
+            await self.app(scope, receive, send)
+            return
+        record = self.url_service.peek(alias)
+        if record is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        visitor = visitor_hash(get_client_ip(request), request.headers.get("user-agent", ""))
+        await self.buffer.record(None, record.id, visitor)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 302,
+                "headers": [_CONTENT_LENGTH_ZERO, (b"location", record.location)],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
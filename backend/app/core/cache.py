@@ -0,0 +1,53 @@
+from cachetools import TTLCache
+from app.core.bloom import BloomFilter
+
+URL_CACHE = "urls"
+ANALYTICS_CACHE = "analytics"
+# Negative knowledge about aliases: a short-TTL cache of confirmed misses plus
+# a Bloom filter of every alias known to exist
+MISSING_ALIAS_CACHE = "missing_aliases"
+DESTINATION_CACHE = "destinations"
+
+# Process-wide registry so every service instance shares one cache per name
+_caches: dict[str, TTLCache] = {}
+_blooms: dict[str, BloomFilter] = {}
+
+
+def get_cache(name: str, maxsize: int, ttl: float) -> TTLCache:
+    """Return the process-wide cache registered under `name`, creating it on first use.
+
+    Caches are LRU-bounded with a TTL and need no lock: every operation is
+    synchronous, so coroutines can't interleave inside one.
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches[name] = TTLCache(maxsize=maxsize, ttl=ttl)
+    return cache
+
+
+def get_bloom(name: str) -> BloomFilter | None:
+    return _blooms.get(name)
+
+
+def set_bloom(name: str, bloom: BloomFilter | None) -> None:
+    if bloom is None:
+        _blooms.pop(name, None)
+    else:
+        _blooms[name] = bloom
+
+
+def evict(name: str, key: str) -> None:
+    cache = _caches.get(name)
+    if cache is not None:
+        cache.pop(key, None)
+    # A Bloom filter can't forget a key; invalidating negative knowledge
+    # means the key may now exist, so add it instead
+    bloom = _blooms.get(name)
+    if bloom is not None:
+        bloom.add(key)
+
+
+def clear_caches() -> None:
+    """Empty every registered cache - useful for testing."""
+    for cache in _caches.values():
+        cache.clear()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from pydantic import ConfigDict
+from pydantic import ConfigDict, model_validator
 from functools import lru_cache
 
 
@@ -7,19 +7,101 @@ class Settings(BaseSettings):
     model_config = ConfigDict(env_file=".env", extra="ignore")
 
     DATABASE_URL: str = "sqlite+aiosqlite:///./shortener.db"
+    DATABASE_READ_POOL_SIZE: int = 8  # read-only connections; writes share one connection
     API_STR: str = "/api"
 
-    # Rate limiting (in-memory)
+    # SQLite storage profile, applied to every connection. WAL lets redirects read
+    # while clicks are written; synchronous=NORMAL only fsyncs at checkpoints in WAL.
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -65536  # negative = KiB, i.e. 64 MiB page cache per connection
+    SQLITE_MMAP_SIZE: int = 268435456  # bytes of the file to memory-map; 0 disables
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_WAL_CHECKPOINT_SECONDS: float = 30  # passive checkpoint interval; 0 disables
+    # Lets compaction shrink the file; takes effect on new databases (existing ones: compact_clicks --enable-vacuum)
+    SQLITE_AUTO_VACUUM: str = "INCREMENTAL"
+
+    # Alias allocation: keyed permutation of a counter, reserved in blocks per worker.
+    # Empty: a random key is generated on first start and kept in the database (app/core/keys.py).
+    ALIAS_SECRET_KEY: str = ""
+    ALIAS_BLOCK_SIZE: int = 1000
+    # Keys the client IP + user agent hash fed to unique-visitor sketches; empty generates one like above
+    VISITOR_HASH_KEY: str = ""
+    SHORTEN_BATCH_MAX_SIZE: int = 1000
+    URL_LIST_PAGE_SIZE: int = 100  # default page size for GET /api/urls
+    URL_LIST_MAX_PAGE_SIZE: int = 1000
+    # Return the existing non-archived alias when the same destination is shortened again
+    SHORTEN_DEDUPLICATE: bool = False
+    DEDUP_CACHE_MAX_SIZE: int = 10000
+    DEDUP_CACHE_TTL_SECONDS: int = 600
+
+    # Serve cached redirects from a raw ASGI layer in front of FastAPI routing
+    REDIRECT_FAST_PATH: bool = False
+
+    # Rate limiting: "memory" (per process) or "sqlite" (shared by all workers on the host)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SQLITE_PATH: str = "./ratelimit.db"
     RATE_LIMIT_SHORTEN_REQUESTS: int = 5
     RATE_LIMIT_SHORTEN_WINDOW: int = 60
     RATE_LIMIT_API_REQUESTS: int = 20
     RATE_LIMIT_API_WINDOW: int = 60
+    RATE_LIMIT_BATCH_ITEMS: int = 1000  # URLs per window for /api/shorten/batch, counted per item
+    RATE_LIMIT_BATCH_WINDOW: int = 60
+    RATE_LIMIT_MAX_KEYS: int = 100000  # LRU-evicted beyond this many bucket:ip keys
 
     # Caching (in-memory)
     URL_CACHE_MAX_SIZE: int = 10000  # Cache up to 10k URLs
     URL_CACHE_TTL_SECONDS: int = 600  # 10 minutes
     ANALYTICS_CACHE_MAX_SIZE: int = 1000  # Cache up to 1k analytics results
     ANALYTICS_CACHE_TTL_SECONDS: int = 60  # 1 minute
+    ANALYTICS_MAX_DAYS: int = 90  # upper bound for the `days` query parameter
+    ANALYTICS_BATCH_MAX_ALIASES: int = 100  # aliases per POST /api/analytics/batch
+    # Live UTC day counters per URL, incremented on every click (see click_counters.py)
+    ANALYTICS_LIVE_DAYS: int = 31  # daily series up to this long are served from memory
+    ANALYTICS_LIVE_MAX_URLS: int = 100000
+    ANALYTICS_LIVE_RESYNC_SECONDS: float = 60  # re-seed to pick up other workers' clicks; 0 never
+    # Per-minute counters for /api/analytics/{alias}/realtime, kept only for recently clicked URLs
+    ANALYTICS_REALTIME_MINUTES: int = 60
+    ANALYTICS_REALTIME_MAX_URLS: int = 100000
+    ANALYTICS_REALTIME_RESYNC_SECONDS: float = 5
+    # Space-Saving counters per pane of the /api/analytics/top windows; error <= window clicks / this
+    TRENDING_CAPACITY: int = 1000
+    NEGATIVE_CACHE_MAX_SIZE: int = 100000  # Remembered unknown aliases
+    NEGATIVE_CACHE_TTL_SECONDS: int = 60
+    ALIAS_BLOOM_CAPACITY: int = 1000000  # Grown to 2x the alias count at startup if larger
+    ALIAS_BLOOM_ERROR_RATE: float = 0.01
+
+    # Cross-worker cache invalidation (polled from the cache_invalidations table)
+    CACHE_INVALIDATION_POLL_SECONDS: float = 0.05
+    CACHE_INVALIDATION_RETENTION_SECONDS: int = 3600
+
+    # Click ingestion (write-behind buffer)
+    CLICK_BUFFER_MAX_SIZE: int = 10000  # Redirects wait once this many clicks are queued
+    CLICK_BUFFER_BATCH_SIZE: int = 500  # Max clicks per multi-row INSERT
+    CLICK_BUFFER_FLUSH_INTERVAL_SECONDS: float = 0.5
+    # Failed writes (database locked, I/O errors) are retried with exponential backoff;
+    # while running a batch is retried until it succeeds, at shutdown this many times
+    CLICK_BUFFER_RETRY_BACKOFF_SECONDS: float = 0.1
+    CLICK_BUFFER_RETRY_MAX_BACKOFF_SECONDS: float = 5
+    CLICK_BUFFER_SHUTDOWN_RETRIES: int = 3
+
+    # Raw click retention in days; 0 (default) keeps every click. When set, older clicks are
+    # deleted (click_daily keeps their counts); it must exceed ANALYTICS_MAX_DAYS so hourly and
+    # offset series stay complete, e.g. 91.
+    CLICK_RETENTION_DAYS: int = 0
+    CLICK_COMPACTION_INTERVAL_SECONDS: float = 3600  # 0 disables the background job
+    CLICK_COMPACTION_BATCH_SIZE: int = 5000  # rows deleted per transaction
+    CLICK_COMPACTION_VACUUM_PAGES: int = 1000  # free pages returned to the OS per transaction
+
+    @model_validator(mode="after")
+    def _check_click_retention(self) -> "Settings":
+        if 0 < self.CLICK_RETENTION_DAYS <= self.ANALYTICS_MAX_DAYS:
+            raise ValueError(
+                f"CLICK_RETENTION_DAYS ({self.CLICK_RETENTION_DAYS}) must be 0 or more than "
+                f"ANALYTICS_MAX_DAYS ({self.ANALYTICS_MAX_DAYS})"
+            )
+        return self
 
 
 @lru_cache
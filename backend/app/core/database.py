@@ -1,28 +1,163 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+import contextlib
+from collections.abc import AsyncIterator
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import declarative_base, Session
 from app.core.config import get_settings
+from app.core.sqlite import apply_storage_profile, make_read_only, use_immediate_transactions
+
+_settings = get_settings()
+
+
+def _is_memory_database(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def _create_engines(url: str) -> tuple[AsyncEngine, AsyncEngine]:
+    """Return (writer, reader) engines for `url`.
+
+    SQLite allows one writer at a time, so all mutations go through a
+    single pooled connection and queue in-process instead of spinning in
+    SQLite's busy handler. Reads use their own pool of query-only
+    connections, which WAL mode lets run alongside the writer. An
+    in-memory database exists per connection, so there both are the same
+    engine.
+    """
+    if _is_memory_database(url):
+        engine = create_async_engine(url, echo=False, future=True)
+        apply_storage_profile(engine)
+        return engine, engine
+    writer = create_async_engine(url, echo=False, future=True, pool_size=1, max_overflow=0)
+    reader = create_async_engine(
+        url, echo=False, future=True, pool_size=_settings.DATABASE_READ_POOL_SIZE, max_overflow=0
+    )
+    apply_storage_profile(writer)
+    use_immediate_transactions(writer)
+    apply_storage_profile(reader)
+    make_read_only(reader)
+    return writer, reader
+
+
+# `engine` is the writer; `read_engine` serves SELECT-only work
+engine, read_engine = _create_engines(_settings.DATABASE_URL)
+
+
+class TrackedSession(Session):
+    """Session that records in `info["has_writes"]` whether it wrote anything."""
+
+
+@event.listens_for(TrackedSession, "do_orm_execute")
+def _track_statement(orm_execute_state) -> None:
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(TrackedSession, "after_flush")
+def _track_flush(session, flush_context) -> None:
+    session.info["has_writes"] = True
+
+
+@event.listens_for(TrackedSession, "after_commit")
+@event.listens_for(TrackedSession, "after_rollback")
+def _reset_writes(session) -> None:
+    session.info["has_writes"] = False
+
 
-engine = create_async_engine(
-    get_settings().DATABASE_URL,
-    echo=False,
-    future=True,
-)
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=TrackedSession,
+    expire_on_commit=False,
+    autoflush=False,
+)
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    sync_session_class=TrackedSession,
     expire_on_commit=False,
     autoflush=False,
 )
 Base = declarative_base()
 
 
-async def get_db() -> AsyncSession:
-    async with AsyncSessionLocal() as session:
+class LazySession:
+    """Stand-in for an AsyncSession that creates it on first attribute access.
+
+    Handlers answered from memory never touch it, so they never build a
+    session or check out a pooled connection.
+    """
+
+    __slots__ = ("_factory", "_session")
+
+    def __init__(self, factory: async_sessionmaker) -> None:
+        self._factory = factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name: str):
+        return getattr(self.session, name)
+
+    async def finish(self) -> None:
+        """Commit if anything was written, then release the connection.
+
+        Read-only sessions skip the commit; closing ends their transaction.
+        """
+        if self._session is None:
+            return
         try:
-            yield session
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
+            if self._session.sync_session.info.get("has_writes"):
+                await self._session.commit()
         finally:
-            await session.close()
+            await self._session.close()
+
+    async def abort(self) -> None:
+        if self._session is None:
+            return
+        try:
+            await self._session.rollback()
+        finally:
+            await self._session.close()
+
+
+@contextlib.asynccontextmanager
+async def _lazy_session(factory: async_sessionmaker) -> AsyncIterator[LazySession]:
+    """Commit on success and roll back on error, then release the connection."""
+    db = LazySession(factory)
+    try:
+        yield db
+    except Exception:
+        await db.abort()
+        raise
+    await db.finish()
+
+
+async def get_db() -> AsyncSession:
+    """Read-write session on the single writer connection. Use for endpoints that mutate.
+
+    Declare it with `Depends(get_db, scope="function")` so the commit runs, and
+    can fail the request, before the response is sent.
+    """
+    # `async with`, not `async for`: an error raised in the endpoint is thrown
+    # into this generator and must reach _lazy_session to roll back
+    async with _lazy_session(AsyncSessionLocal) as db:
+        yield db
+
+
+async def get_read_db() -> AsyncSession:
+    """Session on the read-only pool, for endpoints that only query.
+
+    Reads here never queue behind writes; any write raises an error. Like
+    `get_db`, declare it with scope="function" unless the response streams
+    from the session.
+    """
+    async with _lazy_session(ReadSessionLocal) as db:
+        yield db
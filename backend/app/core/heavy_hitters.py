@@ -0,0 +1,69 @@
+from collections.abc import Callable, Hashable
+
+
+class SpaceSaving:
+    """Space-Saving summary of the most frequent keys in a stream.
+
+    Tracks at most `capacity` keys. When full, a new key takes over a key
+    with the minimum count and inherits that count as its `error`, so every
+    tracked count overestimates the true count by at most its error, and
+    any untracked key occurred at most `min_count` times (<= total / capacity).
+    Keys are grouped in buckets by count, so `add` is O(1).
+
+    `on_change(key, delta)` is called for every change to a tracked count,
+    including the count an evicted key gives up.
+    """
+
+    def __init__(self, capacity: int, on_change: Callable[[Hashable, int], None] | None = None) -> None:
+        self.capacity = capacity
+        self.total = 0
+        self.counts: dict[Hashable, int] = {}
+        self.errors: dict[Hashable, int] = {}
+        self._buckets: dict[int, dict[Hashable, None]] = {}
+        self._min = 0
+        self._on_change = on_change
+
+    @property
+    def min_count(self) -> int:
+        """Upper bound on the count of any key not tracked (0 until full)."""
+        return self._min if len(self.counts) >= self.capacity else 0
+
+    def _move(self, key: Hashable, old: int, new: int) -> None:
+        bucket = self._buckets[old]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[old]
+            if old == self._min:
+                self._min = new
+        self._buckets.setdefault(new, {})[key] = None
+
+    def add(self, key: Hashable) -> None:
+        self.total += 1
+        count = self.counts.get(key)
+        if count is not None:
+            self.counts[key] = count + 1
+            self._move(key, count, count + 1)
+            if self._on_change:
+                self._on_change(key, 1)
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = 1
+            self.errors[key] = 0
+            self._buckets.setdefault(1, {})[key] = None
+            self._min = 1
+            if self._on_change:
+                self._on_change(key, 1)
+            return
+        # Replace a key with the minimum count
+        floor = self._min
+        evicted = next(iter(self._buckets[floor]))
+        del self.counts[evicted]
+        del self.errors[evicted]
+        del self._buckets[floor][evicted]
+        self.counts[key] = floor + 1
+        self.errors[key] = floor
+        self._buckets[floor][key] = None
+        self._move(key, floor, floor + 1)
+        if self._on_change:
+            self._on_change(evicted, -floor)
+            self._on_change(key, floor + 1)
@@ -0,0 +1,40 @@
+"""Secret keys for alias permutation and visitor hashing.
+
+A key set in the environment wins. Otherwise a random one is generated on
+first start and stored in the `app_keys` table, so every worker and every
+restart uses the same key without the public default making aliases
+enumerable.
+"""
+import secrets
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core.config import get_settings
+from app.repositories.app_key_repository import AppKeyRepository
+
+ALIAS_KEY = "alias"
+VISITOR_KEY = "visitor"
+# Key name -> the setting that overrides it
+_SETTINGS = {ALIAS_KEY: "ALIAS_SECRET_KEY", VISITOR_KEY: "VISITOR_HASH_KEY"}
+
+_loaded: dict[str, str] = {}
+
+
+def get_key(name: str) -> str:
+    """The configured key `name`, else the one `load_keys` read from the database."""
+    configured = getattr(get_settings(), _SETTINGS[name])
+    if configured:
+        return configured
+    try:
+        return _loaded[name]
+    except KeyError:
+        raise RuntimeError(f"{_SETTINGS[name]} is not set and load_keys() has not run") from None
+
+
+async def load_keys(session_factory: async_sessionmaker) -> None:
+    """Load (generating on first start) every key not set in the environment."""
+    settings = get_settings()
+    repo = AppKeyRepository()
+    async with session_factory() as session:
+        for name, setting in _SETTINGS.items():
+            if not getattr(settings, setting):
+                _loaded[name] = await repo.get_or_create(session, name, secrets.token_urlsafe(32))
+        await session.commit()
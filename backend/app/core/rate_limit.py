@@ -1,53 +1,224 @@
-from typing import Tuple
-from collections import defaultdict
-from datetime import datetime, timedelta, timezone
 import asyncio
+import math
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Tuple
 from app.core.config import get_settings
 
 _settings = get_settings()
 
 
-class InMemoryRateLimiter:
-    """Fixed-window rate limiter using in-memory storage."""
+def sliding_window(
+    state: tuple[int, int, int] | None,
+    now: float,
+    limit: int,
+    window_seconds: int,
+    cost: int = 1,
+) -> tuple[bool, int, tuple[int, int, int]]:
+    """Sliding-window counter step.
+
+    `state` is (window_index, previous_count, current_count). The request
+    count over the trailing window is estimated as the previous fixed
+    window's count, weighted by how much of it still overlaps, plus the
+    current window's count. A request consumes `cost` units of the budget.
+    Returns (allowed, retry_after_seconds, new_state).
+    """
+    index = int(now // window_seconds)
+    previous = current = 0
+    if state is not None:
+        last_index, last_previous, last_current = state
+        if last_index == index:
+            previous, current = last_previous, last_current
+        elif last_index == index - 1:
+            previous = last_current
+    elapsed = now / window_seconds - index  # fraction of the current window gone
+
+    if previous * (1 - elapsed) + current + cost <= limit:
+        return True, 0, (index, previous, current + cost)
+    if cost > limit:
+        return False, window_seconds, (index, previous, current)
+
+    # Seconds until the estimate leaves room for this request
+    if current + cost <= limit:
+        wait = (1 - (limit - current - cost) / previous - elapsed) * window_seconds
+    else:
+        # The current window alone is full: wait for it to slide out partially
+        wait = (1 - elapsed + 1 - (limit - cost) / current) * window_seconds
+    return False, max(1, math.ceil(wait)), (index, previous, current)
+
+
+class RateLimitBackend(ABC):
+    """Interface shared by rate limit backends; see `sliding_window` for the algorithm."""
+
+    @abstractmethod
+    async def check_rate_limit(
+        self, ip: str, limit: int, window_seconds: int, bucket: str = "default", cost: int = 1
+    ) -> Tuple[bool, int]:
+        """Check if request is allowed. Returns (allowed, retry_after_seconds)."""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Reset all rate limit data - useful for testing."""
+
 
-    def __init__(self):
-        self._requests: dict[str, list[datetime]] = defaultdict(list)
-        self._lock = asyncio.Lock()
+class InMemoryRateLimiter(RateLimitBackend):
+    """Sliding-window counter rate limiter with a bounded in-memory key table.
+
+    Each `bucket:ip` key holds three integers. Keys are kept in LRU order;
+    idle keys that no longer affect the estimate are dropped as new ones
+    arrive, and the least recently used key is evicted beyond `max_keys`.
+    """
+
+    def __init__(self, max_keys: int | None = None):
+        self.max_keys = max_keys or _settings.RATE_LIMIT_MAX_KEYS
+        # key -> (window_seconds, window_index, previous_count, current_count)
+        self._state: OrderedDict[str, tuple[int, int, int, int]] = OrderedDict()
 
     async def check_rate_limit(
-        self, ip: str, limit: int, window_seconds: int, bucket: str = "default"
+        self, ip: str, limit: int, window_seconds: int, bucket: str = "default", cost: int = 1
     ) -> Tuple[bool, int]:
         """
         Check if request is allowed. Returns (allowed, retry_after_seconds).
         """
         key = f"{bucket}:{ip}"
-        async with self._lock:
-            now = datetime.now(timezone.utc)
-            cutoff = now - timedelta(seconds=window_seconds)
-
-            if key in self._requests:
-                self._requests[key] = [
-                    req_time for req_time in self._requests[key] if req_time > cutoff
-                ]
+        now = time.time()
+        entry = self._state.get(key)
+        allowed, retry_after, state = sliding_window(
+            entry[1:] if entry else None, now, limit, window_seconds, cost
+        )
+        self._state[key] = (window_seconds, *state)
+        self._state.move_to_end(key)
+        if entry is None:
+            self._evict(now)
+        return allowed, retry_after
+
+    def _evict(self, now: float) -> None:
+        while self._state:
+            window_seconds, index, _, _ = next(iter(self._state.values()))
+            idle = (index + 2) * window_seconds <= now
+            if not idle and len(self._state) <= self.max_keys:
+                break
+            self._state.popitem(last=False)
 
-            request_count = len(self._requests[key])
-
-            if request_count >= limit:
-                oldest = self._requests[key][0]
-                retry_after = int(
-                    (oldest + timedelta(seconds=window_seconds) - now).total_seconds()
-                )
-                return False, max(0, retry_after)
+    def reset(self):
+        """Reset all rate limit data - useful for testing."""
+        self._state.clear()
+
+
+class SQLiteRateLimiter(RateLimitBackend):
+    """Sliding-window counter rate limiter stored in a shared SQLite file.
+
+    Every uvicorn worker on the host opens the same WAL-mode database, so
+    they all draw from one budget per key. Each check is a read and an
+    upsert inside BEGIN IMMEDIATE, which serializes concurrent checks
+    across processes. The state is disposable, so writes skip fsync.
+    Keys idle for two windows are pruned periodically.
+
+    The connection has no busy timeout: while another worker holds the
+    write lock, BEGIN IMMEDIATE fails at once and the check retries after
+    an asyncio sleep, so waiting never blocks the event loop.
+    """
+
+    PRUNE_EVERY = 1000  # checks between idle-key sweeps
+    BUSY_TIMEOUT = 5.0  # seconds to keep retrying a locked database
+    RETRY_DELAY = 0.001  # first retry delay, doubled up to MAX_RETRY_DELAY
+    MAX_RETRY_DELAY = 0.05
+
+    def __init__(self, path: str | None = None):
+        self.path = path or _settings.RATE_LIMIT_SQLITE_PATH
+        self._conn: sqlite3.Connection | None = None
+        self._checks = 0
+
+    def _open(self) -> sqlite3.Connection:
+        # Setup may wait for the write lock, so it runs with a busy timeout (in a thread)
+        conn = sqlite3.connect(
+            self.path, isolation_level=None, timeout=self.BUSY_TIMEOUT, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY, window_index INTEGER NOT NULL,"
+            " previous INTEGER NOT NULL, current INTEGER NOT NULL,"
+            " idle_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_idle_at ON rate_limits (idle_at)")
+        conn.execute("PRAGMA busy_timeout=0")
+        return conn
+
+    async def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so each worker process gets its own connection
+        if self._conn is None:
+            conn = await asyncio.to_thread(self._open)
+            if self._conn is None:
+                self._conn = conn
+            else:
+                conn.close()
+        return self._conn
+
+    async def _begin(self, conn: sqlite3.Connection) -> None:
+        deadline = time.monotonic() + self.BUSY_TIMEOUT
+        delay = self.RETRY_DELAY
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as exc:
+                if exc.sqlite_errorcode != sqlite3.SQLITE_BUSY or time.monotonic() >= deadline:
+                    raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.MAX_RETRY_DELAY)
 
-            self._requests[key].append(now)
-            return True, 0
+    async def check_rate_limit(
+        self, ip: str, limit: int, window_seconds: int, bucket: str = "default", cost: int = 1
+    ) -> Tuple[bool, int]:
+        """
+        Check if request is allowed. Returns (allowed, retry_after_seconds).
+        """
+        key = f"{bucket}:{ip}"
+        conn = await self._connection()
+        await self._begin(conn)
+        # No await from here to COMMIT, so checks in this worker can't interleave
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT window_index, previous, current FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            allowed, retry_after, (index, previous, current) = sliding_window(
+                row, now, limit, window_seconds, cost
+            )
+            conn.execute(
+                "INSERT INTO rate_limits (key, window_index, previous, current, idle_at)"
+                " VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET"
+                " window_index = excluded.window_index, previous = excluded.previous,"
+                " current = excluded.current, idle_at = excluded.idle_at",
+                (key, index, previous, current, (index + 2) * window_seconds),
+            )
+            self._checks += 1
+            if self._checks % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE idle_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
 
     def reset(self):
         """Reset all rate limit data - useful for testing."""
-        self._requests.clear()
+        if self._conn is None:
+            self._conn = self._open()
+        self._conn.execute("DELETE FROM rate_limits")
+
 
+def _create_backend() -> RateLimitBackend:
+    if _settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimiter()
+    return InMemoryRateLimiter()
 
-_rate_limiter = InMemoryRateLimiter()
+
+_rate_limiter = _create_backend()
 
 
 async def check_rate_limit_shorten(ip: str) -> Tuple[bool, int]:
@@ -66,3 +237,13 @@ async def check_rate_limit_api(ip: str) -> Tuple[bool, int]:
         _settings.RATE_LIMIT_API_WINDOW,
         bucket="api",
     )
+
+
+async def check_rate_limit_shorten_batch(ip: str, cost: int) -> Tuple[bool, int]:
+    return await _rate_limiter.check_rate_limit(
+        ip,
+        _settings.RATE_LIMIT_BATCH_ITEMS,
+        _settings.RATE_LIMIT_BATCH_WINDOW,
+        bucket="shorten_batch",
+        cost=cost,
+    )
@@ -0,0 +1,91 @@
+"""In-place upgrades for databases created by older versions.
+
+`create_all` only creates missing tables. This adds columns and indexes
+that were introduced later to tables that already exist, and rebuilds
+tables that have since switched to SQLite AUTOINCREMENT. New columns must
+be nullable or carry a server default for `ALTER TABLE ... ADD COLUMN`.
+Run it through `migrate`, which turns foreign keys off for the rebuilds.
+"""
+from sqlalchemy import Connection, MetaData, Table, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateColumn, CreateTable
+from app.core.database import Base
+
+
+def _missing_autoincrement(conn: Connection, table: Table) -> bool:
+    if conn.dialect.name != "sqlite" or not table.dialect_options["sqlite"]["autoincrement"]:
+        return False
+    ddl = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+    ).scalar()
+    return "AUTOINCREMENT" not in ddl.upper()
+
+
+def _rebuild(conn: Connection, table: Table, existing_columns: set[str]) -> str:
+    """Recreate `table` from its current definition, keeping its rows (and their ids)."""
+    if conn.exec_driver_sql("PRAGMA foreign_keys").scalar():
+        # Dropping the old table would first delete every row referencing it
+        raise RuntimeError(f"Rebuilding {table.name} needs foreign keys off; run it through migrate()")
+    rebuilt = table.to_metadata(MetaData(), name=f"{table.name}_rebuild")
+    quote = conn.dialect.identifier_preparer.quote
+    columns = ", ".join(quote(column.name) for column in table.columns if column.name in existing_columns)
+    conn.execute(CreateTable(rebuilt))
+    conn.exec_driver_sql(f"INSERT INTO {rebuilt.name} ({columns}) SELECT {columns} FROM {table.name}")
+    conn.exec_driver_sql(f"DROP TABLE {table.name}")
+    conn.exec_driver_sql(f"ALTER TABLE {rebuilt.name} RENAME TO {table.name}")
+    for index in table.indexes:
+        index.create(conn)
+    return f"REBUILD TABLE {table.name}"
+
+
+def upgrade_schema(conn: Connection) -> list[str]:
+    """Add missing columns and indexes to existing tables. Returns the DDL executed."""
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    executed = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        if _missing_autoincrement(conn, table):
+            # Also adds any missing columns and indexes
+            executed.append(_rebuild(conn, table, columns))
+            continue
+        for column in table.columns:
+            if column.name not in columns:
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(conn)}"
+                conn.exec_driver_sql(ddl)
+                executed.append(ddl)
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)
+                executed.append(f"CREATE INDEX {index.name}")
+    return executed
+
+
+async def migrate(engine: AsyncEngine) -> list[str]:
+    """Create missing tables and upgrade existing ones. Returns the upgrade DDL executed.
+
+    SQLite ignores PRAGMA foreign_keys inside a transaction, so it is
+    switched off on this connection before the transaction begins and
+    restored after it ends.
+    """
+    async with engine.connect() as conn:
+        sqlite = engine.dialect.name == "sqlite"
+        if sqlite:
+            isolation_level = conn.default_isolation_level
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            foreign_keys = (await conn.exec_driver_sql("PRAGMA foreign_keys")).scalar()
+            await conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            await conn.commit()  # ends SQLAlchemy's autobegun (AUTOCOMMIT) transaction
+            await conn.execution_options(isolation_level=isolation_level)
+        try:
+            async with conn.begin():
+                await conn.run_sync(Base.metadata.create_all)
+                executed = await conn.run_sync(upgrade_schema)
+        finally:
+            if sqlite:
+                await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.exec_driver_sql(f"PRAGMA foreign_keys={int(foreign_keys)}")
+    return executed
@@ -1,6 +1,9 @@
+import hashlib
 import re
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlsplit, urlunsplit
 from typing import Optional
+from app.core.keys import VISITOR_KEY, get_key
+from app.core.hll import hash_visitor
 
 
 # Allow http and https only; reject javascript:, data:, etc.
@@ -33,6 +36,20 @@ def validate_url(url: str) -> tuple[bool, Optional[str]]:
     return True, None
 
 
+def normalize_url(url: str) -> str:
+    """Canonical form used to detect repeat destinations: lowercase scheme and host, "/" for an empty path."""
+    parts = urlsplit(url.strip())
+    userinfo, at, host = parts.netloc.rpartition("@")
+    return urlunsplit(
+        (parts.scheme.lower(), userinfo + at + host.lower(), parts.path or "/", parts.query, parts.fragment)
+    )
+
+
+def destination_hash(url: str) -> bytes:
+    """Fixed-width (16-byte) digest of the normalized URL, indexed on `urls.url_hash`."""
+    return hashlib.blake2b(normalize_url(url).encode(), digest_size=16).digest()
+
+
 def sanitize_alias(alias: str) -> Optional[str]:
     """Allow only [a-zA-Z0-9] for alias; length 6."""
     if not alias or len(alias) != 6:
@@ -40,3 +57,8 @@ def sanitize_alias(alias: str) -> Optional[str]:
     if re.match(r"^[a-zA-Z0-9]{6}$", alias):
         return alias
     return None
+
+
+def visitor_hash(client_ip: str, user_agent: str) -> int:
+    """Keyed 64-bit visitor identifier for unique-visitor sketches; the IP itself is never stored."""
+    return hash_visitor(client_ip, user_agent, key=get_key(VISITOR_KEY).encode()[:64])
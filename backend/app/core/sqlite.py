@@ -0,0 +1,162 @@
+"""SQLite storage profile: per-connection pragmas, WAL checkpointing and file statistics."""
+import asyncio
+import contextlib
+import logging
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def pragma_statements(settings: Settings) -> list[str]:
+    """PRAGMAs applied to every new connection, in order."""
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}",
+        # Off by default in SQLite; without it rows for a deleted URL are written as orphans
+        "PRAGMA foreign_keys=ON",
+    ]
+
+
+def apply_storage_profile(engine: AsyncEngine, settings: Settings | None = None) -> None:
+    """Run the configured PRAGMAs on each connection `engine` opens. No-op for other databases."""
+    if engine.dialect.name != "sqlite":
+        return
+    settings = settings or get_settings()
+    statements = pragma_statements(settings)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            # auto_vacuum only takes effect before a new file is initialized (journal_mode
+            # does that), and setting it on an existing file waits for the write lock
+            cursor.execute("PRAGMA page_count")
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(f"PRAGMA auto_vacuum={settings.SQLITE_AUTO_VACUUM}")
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def use_immediate_transactions(engine: AsyncEngine) -> None:
+    """Start every transaction on `engine` with BEGIN IMMEDIATE. No-op for other databases.
+
+    A deferred transaction that reads before it writes has to upgrade its
+    lock, and if another connection committed in between SQLite fails the
+    upgrade with "database is locked" at once, without waiting out
+    busy_timeout. BEGIN IMMEDIATE takes the write lock up front, where
+    busy_timeout applies, so writers queue instead of failing.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _disable_implicit_begin(dbapi_connection, connection_record) -> None:
+        # The driver's own BEGIN would be deferred; emit ours instead
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin_immediate(conn) -> None:
+        if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def make_read_only(engine: AsyncEngine) -> None:
+    """Reject writes on every connection `engine` opens (PRAGMA query_only)."""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_query_only(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+
+async def page_stats(conn: AsyncConnection) -> tuple[int, int, int]:
+    """Returns (page_count, freelist_count, page_size) of the main database."""
+    stats = []
+    for name in ("page_count", "freelist_count", "page_size"):
+        stats.append((await conn.exec_driver_sql(f"PRAGMA {name}")).scalar())
+    return stats[0], stats[1], stats[2]
+
+
+async def incremental_vacuum(engine: AsyncEngine, pages: int) -> None:
+    """Return up to `pages` free pages to the OS. No-op unless auto_vacuum=INCREMENTAL.
+
+    SQLite frees one page per step of the statement, and the driver steps a
+    PRAGMA without result columns only once, so it is run as a script, which
+    steps it to completion. A script commits any open transaction first, so
+    it runs on its own connection, outside a transaction.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+
+
+class WalCheckpointer:
+    """Runs `PRAGMA wal_checkpoint(PASSIVE)` periodically.
+
+    SQLite's automatic checkpoints run inside whichever commit crosses
+    the threshold, adding that latency to a request, and can't complete
+    while readers hold old snapshots, so the WAL keeps growing under
+    steady traffic. A passive checkpoint never waits on readers or
+    writers; it copies what it can and leaves the rest for the next run.
+    """
+
+    def __init__(self, interval: float | None = None) -> None:
+        self.interval = interval if interval is not None else get_settings().SQLITE_WAL_CHECKPOINT_SECONDS
+        self._task: asyncio.Task | None = None
+        self._engine: AsyncEngine | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, engine: AsyncEngine) -> None:
+        """Start checkpointing `engine` if it is a file database in WAL mode."""
+        if self.running or self.interval <= 0 or engine.dialect.name != "sqlite":
+            return
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            journal_mode = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar()
+        if str(journal_mode).lower() != "wal":
+            return
+        self._engine = engine
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def checkpoint(self) -> tuple[int, int, int]:
+        """Returns (busy, wal_pages, checkpointed_pages) as reported by SQLite."""
+        async with self._engine.connect() as conn:
+            # Outside a transaction, so it never takes the write lock
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            row = (await conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")).one()
+        return row[0], row[1], row[2]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                busy, wal_pages, checkpointed = await self.checkpoint()
+                logger.debug("WAL checkpoint: %d/%d pages (busy=%d)", checkpointed, wal_pages, busy)
+            except Exception:
+                logger.exception("WAL checkpoint failed")
+
+
+wal_checkpointer = WalCheckpointer()
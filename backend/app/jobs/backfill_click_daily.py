@@ -0,0 +1,39 @@
+"""Rebuild the click_daily rollup from raw clicks.
+
+Runs automatically at startup when the rollup is empty but clicks exist
+(e.g. right after upgrading). Days before the click retention cutoff have
+no raw clicks left, so their rollup rows are kept. Run manually with:
+
+    python -m app.jobs.backfill_click_daily
+"""
+import asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core.database import AsyncSessionLocal
+from app.jobs.compact_clicks import retention_cutoff
+from app.repositories.click_repository import ClickRepository
+
+
+async def backfill_click_daily(
+    session_factory: async_sessionmaker = AsyncSessionLocal, force: bool = False
+) -> int | None:
+    """Rebuild the rollup in one transaction. Returns rows written, or None if skipped."""
+    click_repo = ClickRepository()
+    async with session_factory() as session:
+        if not force and not await click_repo.needs_daily_backfill(session):
+            return None
+        cutoff = retention_cutoff()
+        rows = await click_repo.rebuild_daily(session, since=cutoff.date() if cutoff else None)
+        await session.commit()
+        return rows
+
+
+if __name__ == "__main__":
+    from app.core.database import engine, Base
+
+    async def _main() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        rows = await backfill_click_daily(force=True)
+        print(f"click_daily rebuilt: {rows} rows")
+
+    asyncio.run(_main())
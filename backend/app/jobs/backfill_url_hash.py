@@ -0,0 +1,38 @@
+"""Fill urls.url_hash for rows created before destination deduplication.
+
+Runs automatically at startup when any row is missing its hash (e.g.
+right after upgrading). Run manually with:
+
+    python -m app.jobs.backfill_url_hash
+"""
+import asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core.database import AsyncSessionLocal
+from app.repositories.url_repository import UrlRepository
+
+BATCH_SIZE = 1000
+
+
+async def backfill_url_hash(session_factory: async_sessionmaker = AsyncSessionLocal) -> int:
+    """Hash missing rows in batches, one transaction each. Returns rows updated."""
+    url_repo = UrlRepository()
+    total = 0
+    while True:
+        async with session_factory() as session:
+            updated = await url_repo.fill_missing_hashes(session, BATCH_SIZE)
+            await session.commit()
+        total += updated
+        if updated < BATCH_SIZE:
+            return total
+
+
+if __name__ == "__main__":
+    from app.core.database import engine
+    from app.core.schema import migrate
+
+    async def _main() -> None:
+        await migrate(engine)
+        rows = await backfill_url_hash()
+        print(f"url_hash filled: {rows} rows")
+
+    asyncio.run(_main())
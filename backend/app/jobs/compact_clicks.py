@@ -0,0 +1,170 @@
+"""Delete raw clicks older than the retention window and shrink the database.
+
+Off by default: set CLICK_RETENTION_DAYS to the number of whole UTC days
+of raw clicks to keep (more than ANALYTICS_MAX_DAYS) to enable it.
+
+Per-day counts live on in click_daily, which every click write already
+updates, so analytics and `total_clicks` are unchanged. Clicks are deleted
+oldest first in batches of CLICK_COMPACTION_BATCH_SIZE, one short
+transaction each, so buffered click writes interleave with the job. Freed
+pages are then returned to the OS with `PRAGMA incremental_vacuum`.
+
+Runs every CLICK_COMPACTION_INTERVAL_SECONDS in the app. Run manually with:
+
+    python -m app.jobs.compact_clicks [--enable-vacuum]
+
+`--enable-vacuum` switches a database created before SQLITE_AUTO_VACUUM
+existed to incremental auto-vacuum. It rewrites the whole file once with
+VACUUM, blocking writers, so run it during a quiet period.
+"""
+import asyncio
+import contextlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.sqlite import incremental_vacuum, page_stats
+from app.repositories.click_repository import ClickRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CompactionReport:
+    rows_compacted: int
+    bytes_reclaimed: int
+
+
+def retention_cutoff(retention_days: int | None = None) -> datetime | None:
+    """Start of the oldest UTC day whose raw clicks are kept, or None to keep all."""
+    if retention_days is None:
+        retention_days = get_settings().CLICK_RETENTION_DAYS
+    if retention_days <= 0:
+        return None
+    today = datetime.now(timezone.utc).date()
+    # Whole days only, so every day in click_daily is either fully raw or fully compacted
+    return datetime.combine(today - timedelta(days=retention_days - 1), time.min)
+
+
+async def compact_clicks(
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    retention_days: int | None = None,
+    batch_size: int | None = None,
+    vacuum_pages: int | None = None,
+) -> CompactionReport:
+    """Delete clicks before the retention cutoff in batches, then vacuum freed pages."""
+    settings = get_settings()
+    batch_size = batch_size or settings.CLICK_COMPACTION_BATCH_SIZE
+    vacuum_pages = vacuum_pages or settings.CLICK_COMPACTION_VACUUM_PAGES
+    cutoff = retention_cutoff(retention_days)
+    if cutoff is None:
+        return CompactionReport(rows_compacted=0, bytes_reclaimed=0)
+
+    click_repo = ClickRepository()
+    async with session_factory() as session:
+        engine = session.bind
+        conn = await session.connection()
+        pages_before, _, page_size = await page_stats(conn)
+        auto_vacuum = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        await session.commit()
+
+    rows = 0
+    while True:
+        async with session_factory() as session:
+            deleted = await click_repo.delete_before(session, cutoff, batch_size)
+            await session.commit()
+        rows += deleted
+        if deleted < batch_size:
+            break
+        await asyncio.sleep(0)  # let queued writes take the writer connection
+
+    while auto_vacuum == 2:  # INCREMENTAL
+        async with session_factory() as session:
+            free_pages = (await page_stats(await session.connection()))[1]
+        if not free_pages:
+            break
+        # Outside any session, so no transaction is committed behind it
+        await incremental_vacuum(engine, vacuum_pages)
+        await asyncio.sleep(0)
+
+    async with session_factory() as session:
+        pages_after, free_pages, _ = await page_stats(await session.connection())
+    if auto_vacuum != 2 and free_pages:
+        logger.info(
+            "%d free pages are reused but not returned to the OS; "
+            "run `python -m app.jobs.compact_clicks --enable-vacuum` once",
+            free_pages,
+        )
+    return CompactionReport(
+        rows_compacted=rows, bytes_reclaimed=max(0, pages_before - pages_after) * page_size
+    )
+
+
+class ClickCompactor:
+    """Runs `compact_clicks` every `interval` seconds, starting right away."""
+
+    def __init__(self, interval: float | None = None) -> None:
+        self.interval = interval if interval is not None else get_settings().CLICK_COMPACTION_INTERVAL_SECONDS
+        self._task: asyncio.Task | None = None
+        self._session_factory: async_sessionmaker | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, session_factory: async_sessionmaker) -> None:
+        if self.running or self.interval <= 0 or retention_cutoff() is None:
+            return
+        self._session_factory = session_factory
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                report = await compact_clicks(self._session_factory)
+                if report.rows_compacted or report.bytes_reclaimed:
+                    logger.info(
+                        "Compacted %d clicks, reclaimed %d bytes",
+                        report.rows_compacted,
+                        report.bytes_reclaimed,
+                    )
+            except Exception:
+                logger.exception("Click compaction failed")
+            await asyncio.sleep(self.interval)
+
+
+click_compactor = ClickCompactor()
+
+
+async def enable_incremental_vacuum(engine: AsyncEngine) -> None:
+    """Convert the database to auto_vacuum=INCREMENTAL (rewrites the file)."""
+    async with engine.connect() as conn:
+        # VACUUM cannot run inside a transaction
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+
+
+if __name__ == "__main__":
+    import sys
+    from app.core.database import engine, Base
+
+    async def _main() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        if "--enable-vacuum" in sys.argv[1:]:
+            await enable_incremental_vacuum(engine)
+        report = await compact_clicks()
+        print(f"clicks compacted: {report.rows_compacted} rows, {report.bytes_reclaimed} bytes reclaimed")
+
+    asyncio.run(_main())
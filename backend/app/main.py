@@ -3,16 +3,39 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from app.core.database import engine, Base
+from app.core.config import get_settings
+from app.core.database import engine, AsyncSessionLocal, ReadSessionLocal
+from app.core.keys import load_keys
+from app.core.schema import migrate
+from app.core.sqlite import wal_checkpointer
 from app.api.router import api_router
 from app.api.endpoints import redirect as redirect_router
+from app.api.fast_redirect import RedirectFastPathMiddleware
+from app.services.click_buffer import click_buffer
+from app.services.cache_invalidator import cache_invalidator
+from app.services.url_service import UrlService
+from app.jobs.backfill_click_daily import backfill_click_daily
+from app.jobs.backfill_url_hash import backfill_url_hash
+from app.jobs.compact_clicks import click_compactor
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await migrate(engine)
+    await load_keys(AsyncSessionLocal)
+    await backfill_click_daily(AsyncSessionLocal)
+    await backfill_url_hash(AsyncSessionLocal)
+    await click_buffer.start(AsyncSessionLocal)
+    await cache_invalidator.start(
+        AsyncSessionLocal, UrlService().load_alias_filter, read_session_factory=ReadSessionLocal
+    )
+    await wal_checkpointer.start(engine)
+    await click_compactor.start(AsyncSessionLocal)
     yield
+    await click_compactor.stop()
+    await wal_checkpointer.stop()
+    await cache_invalidator.stop()
+    await click_buffer.stop()
 
 
 _DESCRIPTION = """
@@ -73,12 +96,16 @@ app = FastAPI(
     },
     lifespan=lifespan,
 )
+if get_settings().REDIRECT_FAST_PATH:
+    # Added first so it runs inside CORS and responses keep the same headers
+    app.add_middleware(RedirectFastPathMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(api_router, prefix="/api")
@@ -1,4 +1,9 @@
 from app.models.url import Url
 from app.models.click import Click
+from app.models.click_daily import ClickDaily
+from app.models.visitor_sketch import VisitorSketch
+from app.models.cache_invalidation import CacheInvalidation
+from app.models.alias_sequence import AliasSequence
+from app.models.app_key import AppKey
 
-__all__ = ["Url", "Click"]
+__all__ = ["Url", "Click", "ClickDaily", "VisitorSketch", "CacheInvalidation", "AliasSequence", "AppKey"]
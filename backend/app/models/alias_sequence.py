@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+
+class AliasSequence(Base):
+    """Monotonic counter that alias blocks are reserved from."""
+
+    __tablename__ = "alias_sequences"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    next_value: Mapped[int] = mapped_column(BigInteger, nullable=False)
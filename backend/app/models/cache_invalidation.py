@@ -0,0 +1,17 @@
+from datetime import datetime, timezone
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+
+class CacheInvalidation(Base):
+    """Append-only log of cache keys to evict, read by every worker process."""
+
+    __tablename__ = "cache_invalidations"
+    # Never reuse ids after pruning empties the table, or pollers would skip new rows
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    cache: Mapped[str] = mapped_column(String(32), nullable=False)
+    key: Mapped[str] = mapped_column(String(64), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
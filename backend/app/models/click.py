@@ -1,11 +1,13 @@
 from datetime import datetime, timezone
-from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy import DateTime, ForeignKey, Index, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 
 
 class Click(Base):
     __tablename__ = "clicks"
+    # Per-URL time-range scans for analytics: url_id equality, then a clicked_at range
+    __table_args__ = (Index("ix_clicks_url_id_clicked_at", "url_id", "clicked_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     url_id: Mapped[int] = mapped_column(ForeignKey("urls.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,16 @@
+from datetime import date
+from sqlalchemy import Date, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.core.database import Base
+
+
+class ClickDaily(Base):
+    """Per-URL, per-UTC-day click counts, maintained as clicks are recorded."""
+
+    __tablename__ = "click_daily"
+
+    url_id: Mapped[int] = mapped_column(ForeignKey("urls.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    url = relationship("Url", back_populates="daily_clicks")
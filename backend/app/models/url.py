@@ -1,16 +1,24 @@
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, Text, Boolean
+from sqlalchemy import String, DateTime, Text, Boolean, LargeBinary, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 
 
 class Url(Base):
     __tablename__ = "urls"
+    # Serves the newest-first keyset pagination of the URL list
+    # AUTOINCREMENT never reuses the id of a deleted URL, so clicks still queued for it
+    # are rejected instead of landing on a new URL
+    __table_args__ = (Index("ix_urls_created_at_id", "created_at", "id"), {"sqlite_autoincrement": True})
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     alias: Mapped[str] = mapped_column(String(6), unique=True, index=True, nullable=False)
     original_url: Mapped[str] = mapped_column(Text, nullable=False)
+    # destination_hash(original_url); nullable so existing databases can add it in place
+    url_hash: Mapped[bytes | None] = mapped_column(LargeBinary(16), index=True, nullable=True)
     archived: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
 
     clicks = relationship("Click", back_populates="url", cascade="all, delete-orphan")
+    daily_clicks = relationship("ClickDaily", back_populates="url", cascade="all, delete-orphan")
+    visitor_sketches = relationship("VisitorSketch", back_populates="url", cascade="all, delete-orphan")
@@ -0,0 +1,17 @@
+from datetime import date
+from sqlalchemy import Date, ForeignKey, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.core.database import Base
+from app.core.hll import REGISTERS
+
+
+class VisitorSketch(Base):
+    """Per-URL, per-UTC-day HyperLogLog sketch of distinct visitors (fixed-size blob)."""
+
+    __tablename__ = "visitor_sketches"
+
+    url_id: Mapped[int] = mapped_column(ForeignKey("urls.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    registers: Mapped[bytes] = mapped_column(LargeBinary(REGISTERS), nullable=False)
+
+    url = relationship("Url", back_populates="visitor_sketches")
@@ -0,0 +1,15 @@
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.models import AliasSequence
+
+
+class AliasSequenceRepository:
+    async def advance(self, db: AsyncSession | AsyncConnection, name: str, size: int) -> int:
+        """Atomically add `size` to the sequence and return its new end (exclusive)."""
+        stmt = sqlite_insert(AliasSequence).values(name=name, next_value=size)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AliasSequence.name],
+            set_={"next_value": AliasSequence.next_value + size},
+        ).returning(AliasSequence.next_value)
+        result = await db.execute(stmt)
+        return result.scalar_one()
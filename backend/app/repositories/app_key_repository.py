@@ -0,0 +1,16 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import AppKey
+
+
+class AppKeyRepository:
+    async def get_or_create(self, db: AsyncSession, name: str, value: str) -> str:
+        """Return the stored key `name`, storing `value` first if there is none.
+
+        Workers starting together all read back whichever value was stored first.
+        """
+        stmt = sqlite_insert(AppKey).values(name=name, value=value).on_conflict_do_nothing()
+        await db.execute(stmt)
+        result = await db.execute(select(AppKey.value).where(AppKey.name == name))
+        return result.scalar_one()
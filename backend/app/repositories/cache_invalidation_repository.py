@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import select, func, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import CacheInvalidation
+
+
+class CacheInvalidationRepository:
+    async def add(self, db: AsyncSession, cache: str, keys: list[str]) -> None:
+        await db.execute(
+            insert(CacheInvalidation), [{"cache": cache, "key": key} for key in keys]
+        )
+
+    async def latest_id(self, db: AsyncSession) -> int:
+        result = await db.execute(select(func.max(CacheInvalidation.id)))
+        return result.scalar() or 0
+
+    async def list_since(self, db: AsyncSession, last_id: int) -> list[tuple[int, str, str]]:
+        """Returns (id, cache, key) rows with id > last_id, oldest first."""
+        stmt = (
+            select(CacheInvalidation.id, CacheInvalidation.cache, CacheInvalidation.key)
+            .where(CacheInvalidation.id > last_id)
+            .order_by(CacheInvalidation.id)
+        )
+        result = await db.execute(stmt)
+        return [(row[0], row[1], row[2]) for row in result.all()]
+
+    async def prune(self, db: AsyncSession, before: datetime) -> None:
+        await db.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < before))
@@ -1,32 +1,116 @@
-from datetime import datetime, date
-from sqlalchemy import select, func
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime, date, time
+from sqlalchemy import select, func, insert, delete, exists
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import Click
+from app.models import Click, ClickDaily
 
 
 class ClickRepository:
-    async def create(self, db: AsyncSession, url_id: int) -> Click:
-        click = Click(url_id=url_id)
-        db.add(click)
-        await db.flush()
-        await db.refresh(click)
-        return click
+    async def create_many(
+        self, db: AsyncSession, clicks: Sequence[tuple[int, datetime]]
+    ) -> None:
+        """Insert (url_id, clicked_at) rows as one multi-row INSERT and bump the daily rollup."""
+        if not clicks:
+            return
+        await db.execute(
+            insert(Click),
+            [{"url_id": url_id, "clicked_at": clicked_at} for url_id, clicked_at in clicks],
+        )
+        per_day = Counter((url_id, clicked_at.date()) for url_id, clicked_at in clicks)
+        stmt = sqlite_insert(ClickDaily)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ClickDaily.url_id, ClickDaily.day],
+            set_={"count": ClickDaily.count + stmt.excluded.count},
+        )
+        await db.execute(
+            stmt,
+            [{"url_id": url_id, "day": day, "count": n} for (url_id, day), n in per_day.items()],
+        )
 
     async def count_by_url_and_date_range(
+        self,
+        db: AsyncSession,
+        url_id: int,
+        start: datetime,
+        end: datetime,
+        bucket_format: str = "%Y-%m-%d",
+        tz_offset_minutes: int = 0,
+    ) -> list[tuple[str, int]]:
+        """Returns (bucket, count) for clicks in the half-open UTC range [start, end) that have clicks.
+
+        The range is compared against the bare column, so it is served by
+        the (url_id, clicked_at) index. Buckets are `bucket_format`
+        (strftime) of the click time shifted by `tz_offset_minutes`.
+        """
+        bucket = func.strftime(bucket_format, Click.clicked_at, f"{tz_offset_minutes:+d} minutes")
+        stmt = (
+            select(bucket, func.count())
+            .where(Click.url_id == url_id, Click.clicked_at >= start, Click.clicked_at < end)
+            .group_by(bucket)
+        )
+        result = await db.execute(stmt)
+        return [(row[0], row[1]) for row in result.all()]
+
+    async def daily_counts(
         self, db: AsyncSession, url_id: int, start: date, end: date
     ) -> list[tuple[date, int]]:
-        """Returns list of (date, count) for each day in [start, end] that has clicks."""
-        stmt = (
-            select(
-                func.date(Click.clicked_at).label("day"),
-                func.count(Click.id).label("cnt"),
-            )
-            .where(
-                Click.url_id == url_id,
-                func.date(Click.clicked_at) >= start,
-                func.date(Click.clicked_at) <= end,
-            )
-            .group_by(func.date(Click.clicked_at))
+        """Returns (day, count) rollup rows for days in [start, end] that have clicks."""
+        stmt = select(ClickDaily.day, ClickDaily.count).where(
+            ClickDaily.url_id == url_id,
+            ClickDaily.day >= start,
+            ClickDaily.day <= end,
         )
         result = await db.execute(stmt)
         return [(row[0], row[1]) for row in result.all()]
+
+    async def daily_counts_many(
+        self, db: AsyncSession, url_ids: list[int], start: date, end: date
+    ) -> dict[int, list[tuple[date, int]]]:
+        """`daily_counts` for several URLs in one query over the (url_id, day) key."""
+        stmt = select(ClickDaily.url_id, ClickDaily.day, ClickDaily.count).where(
+            ClickDaily.url_id.in_(url_ids),
+            ClickDaily.day >= start,
+            ClickDaily.day <= end,
+        )
+        result = await db.execute(stmt)
+        counts: dict[int, list[tuple[date, int]]] = {url_id: [] for url_id in url_ids}
+        for url_id, day, count in result.all():
+            counts[url_id].append((day, count))
+        return counts
+
+    async def delete_before(self, db: AsyncSession, cutoff: datetime, limit: int) -> int:
+        """Delete up to `limit` of the oldest clicks before `cutoff`. Returns rows deleted.
+
+        The click_daily rollup is left alone, so their counts survive.
+        """
+        oldest = (
+            select(Click.id).where(Click.clicked_at < cutoff).order_by(Click.clicked_at).limit(limit)
+        )
+        stmt = delete(Click).where(Click.id.in_(oldest.scalar_subquery()))
+        result = await db.execute(stmt.execution_options(synchronize_session=False))
+        return result.rowcount
+
+    async def needs_daily_backfill(self, db: AsyncSession) -> bool:
+        """True when raw clicks exist but the daily rollup is empty."""
+        stmt = select(exists().where(Click.id.isnot(None)), exists().where(ClickDaily.url_id.isnot(None)))
+        has_clicks, has_rollup = (await db.execute(stmt)).one()
+        return bool(has_clicks) and not has_rollup
+
+    async def rebuild_daily(self, db: AsyncSession, since: date | None = None) -> int:
+        """Recompute the daily rollup from raw clicks. Returns the number of rollup rows.
+
+        With `since`, only days from `since` on are rebuilt; earlier rollup
+        rows are kept, e.g. for days whose raw clicks were compacted away.
+        """
+        day = func.date(Click.clicked_at)
+        clicks = select(Click.url_id, day, func.count(Click.id)).group_by(Click.url_id, day)
+        if since is None:
+            await db.execute(delete(ClickDaily))
+        else:
+            await db.execute(delete(ClickDaily).where(ClickDaily.day >= since))
+            clicks = clicks.where(Click.clicked_at >= datetime.combine(since, time.min))
+        await db.execute(insert(ClickDaily).from_select(["url_id", "day", "count"], clicks))
+        result = await db.execute(select(func.count()).select_from(ClickDaily))
+        return result.scalar_one()
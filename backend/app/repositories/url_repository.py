@@ -1,6 +1,9 @@
-from sqlalchemy import select, func
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import Url, Click
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from sqlalchemy import Row, select, func, insert, update, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.core.security import destination_hash
+from app.models import Url, ClickDaily
 
 
 class UrlRepository:
@@ -8,48 +11,147 @@ class UrlRepository:
         result = await db.execute(select(Url).where(Url.id == id))
         return result.scalars().one_or_none()
 
+    async def get_by_ids(self, db: AsyncSession, ids: list[int]) -> dict[int, Url]:
+        result = await db.scalars(select(Url).where(Url.id.in_(ids)))
+        return {url.id: url for url in result.all()}
+
     async def get_by_alias(self, db: AsyncSession, alias: str) -> Url | None:
         result = await db.execute(select(Url).where(Url.alias == alias))
         return result.scalars().one_or_none()
 
-    async def alias_exists(self, db: AsyncSession, alias: str) -> bool:
-        result = await db.execute(select(Url.id).where(Url.alias == alias).limit(1))
-        return result.scalar() is not None
+    async def get_by_aliases(self, db: AsyncSession, aliases: list[str]) -> list[Url]:
+        """Urls for whichever of `aliases` exist, in one IN query."""
+        result = await db.scalars(select(Url).where(Url.alias.in_(aliases)))
+        return list(result.all())
+
+    async def existing_aliases(
+        self, db: AsyncSession | AsyncConnection, aliases: list[str]
+    ) -> set[str]:
+        """Return the subset of `aliases` already present, in one IN query."""
+        result = await db.execute(select(Url.alias).where(Url.alias.in_(aliases)))
+        return set(result.scalars().all())
+
+    async def get_by_hashes(self, db: AsyncSession, hashes: list[bytes]) -> dict[bytes, Url]:
+        """Oldest non-archived Url per destination hash, in one indexed IN query."""
+        stmt = (
+            select(Url)
+            .where(Url.url_hash.in_(hashes), Url.archived.is_(False))
+            .order_by(Url.id.desc())
+        )
+        result = await db.scalars(stmt)
+        # Descending order: the oldest row per hash is written last and wins
+        return {url.url_hash: url for url in result.all()}
+
+    async def fill_missing_hashes(self, db: AsyncSession, limit: int) -> int:
+        """Set url_hash on up to `limit` rows that lack it. Returns rows updated."""
+        result = await db.execute(
+            select(Url.id, Url.original_url).where(Url.url_hash.is_(None)).limit(limit)
+        )
+        rows = [{"id": id_, "url_hash": destination_hash(original_url)} for id_, original_url in result.all()]
+        if rows:
+            await db.execute(update(Url), rows)
+        return len(rows)
+
+    async def count(self, db: AsyncSession) -> int:
+        result = await db.execute(select(func.count(Url.id)))
+        return result.scalar_one()
+
+    async def iter_aliases(self, db: AsyncSession) -> AsyncIterator[str]:
+        """Stream every alias without loading the whole table."""
+        result = await db.stream_scalars(select(Url.alias).execution_options(yield_per=1000))
+        async for alias in result:
+            yield alias
+
+    async def iter_export_rows(
+        self, db: AsyncSession, batch_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Stream (alias, original_url, archived, created_at, total_clicks) rows in id order, a batch at a time.
+
+        Totals are a correlated lookup on the click_daily primary key, so
+        each row costs the same however large the table is.
+        """
+        total_clicks = (
+            select(func.coalesce(func.sum(ClickDaily.count), 0))
+            .where(ClickDaily.url_id == Url.id)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(Url.alias, Url.original_url, Url.archived, Url.created_at, total_clicks.label("total_clicks"))
+            .order_by(Url.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
 
     async def create(self, db: AsyncSession, alias: str, original_url: str) -> Url:
-        url = Url(alias=alias, original_url=original_url)
+        url = Url(alias=alias, original_url=original_url, url_hash=destination_hash(original_url))
         db.add(url)
+        # Defaults are set client-side, so the flushed object is complete
         await db.flush()
-        await db.refresh(url)
         return url
 
-    async def list_all_ordered(self, db: AsyncSession) -> list[tuple[Url, int]]:
-        """List all URLs with total_clicks, ORDER BY created_at DESC."""
-        subq = (
-            select(Click.url_id, func.count(Click.id).label("total_clicks"))
-            .group_by(Click.url_id)
-        ).subquery()
+    async def create_many(self, db: AsyncSession, rows: list[tuple[str, str]]) -> list[Url]:
+        """Insert (alias, original_url) rows as multi-row INSERT ... RETURNING. Order is not preserved."""
+        # Asking for parameter order would force SQLite back to one INSERT per row
+        stmt = insert(Url).returning(Url)
+        result = await db.scalars(
+            stmt,
+            [
+                {"alias": alias, "original_url": original_url, "url_hash": destination_hash(original_url)}
+                for alias, original_url in rows
+            ],
+        )
+        return list(result.all())
+
+    async def list_page(
+        self,
+        db: AsyncSession,
+        limit: int,
+        archived: bool | None = None,
+        after: tuple[datetime, int] | None = None,
+    ) -> list[Url]:
+        """Up to `limit` URLs ordered by (created_at, id) DESC, starting after the `after` key."""
+        stmt = select(Url).order_by(Url.created_at.desc(), Url.id.desc()).limit(limit)
+        if archived is not None:
+            stmt = stmt.where(Url.archived.is_(archived))
+        if after is not None:
+            stmt = stmt.where(tuple_(Url.created_at, Url.id) < after)
+        result = await db.scalars(stmt)
+        return list(result.all())
+
+    async def get_with_stats(self, db: AsyncSession, alias: str) -> tuple[Url, int] | None:
+        """Url and its total clicks in one query: alias index plus click_daily primary-key range."""
+        total_clicks = (
+            select(func.coalesce(func.sum(ClickDaily.count), 0))
+            .where(ClickDaily.url_id == Url.id)
+            .scalar_subquery()
+        )
+        result = await db.execute(select(Url, total_clicks).where(Url.alias == alias))
+        row = result.first()
+        return (row[0], int(row[1])) if row else None
+
+    async def total_clicks(self, db: AsyncSession, url_ids: list[int]) -> dict[int, int]:
+        """Total clicks per URL id from the daily rollup; ids without clicks are omitted."""
         stmt = (
-            select(Url, func.coalesce(subq.c.total_clicks, 0).label("total_clicks"))
-            .outerjoin(subq, Url.id == subq.c.url_id)
-            .order_by(Url.created_at.desc())
+            select(ClickDaily.url_id, func.sum(ClickDaily.count))
+            .where(ClickDaily.url_id.in_(url_ids))
+            .group_by(ClickDaily.url_id)
         )
         result = await db.execute(stmt)
-        rows = result.all()
-        return [(row[0], int(row[1])) for row in rows]
+        return {url_id: int(total) for url_id, total in result.all()}
 
     async def update_original_url(self, db: AsyncSession, url: Url, new_url: str) -> Url:
         """Update the original URL."""
         url.original_url = new_url
+        url.url_hash = destination_hash(new_url)
         await db.flush()
-        await db.refresh(url)
         return url
 
     async def toggle_archive(self, db: AsyncSession, url: Url, archived: bool) -> Url:
         """Archive or unarchive a URL."""
         url.archived = archived
         await db.flush()
-        await db.refresh(url)
         return url
 
     async def delete(self, db: AsyncSession, url: Url) -> None:
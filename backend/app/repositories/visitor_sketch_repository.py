@@ -0,0 +1,46 @@
+from datetime import date
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.hll import HyperLogLog
+from app.models import VisitorSketch
+
+
+class VisitorSketchRepository:
+    async def add_visitors(self, db: AsyncSession, visitors: dict[tuple[int, date], list[int]]) -> None:
+        """Add visitor hashes to the (url_id, day) sketches: one read and one upsert for all keys.
+
+        Run it after the clicks are inserted, so the transaction already holds
+        the write lock and no other writer can change the sketches in between.
+        """
+        result = await db.execute(
+            select(VisitorSketch.url_id, VisitorSketch.day, VisitorSketch.registers).where(
+                tuple_(VisitorSketch.url_id, VisitorSketch.day).in_(list(visitors))
+            )
+        )
+        sketches = {(url_id, day): HyperLogLog(registers) for url_id, day, registers in result.all()}
+        rows = []
+        for key, hashes in visitors.items():
+            sketch = sketches.get(key) or HyperLogLog()
+            for value in hashes:
+                sketch.add(value)
+            rows.append({"url_id": key[0], "day": key[1], "registers": sketch.to_bytes()})
+        stmt = sqlite_insert(VisitorSketch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VisitorSketch.url_id, VisitorSketch.day],
+            set_={"registers": stmt.excluded.registers},
+        )
+        await db.execute(stmt, rows)
+
+    async def get_range(
+        self, db: AsyncSession, url_id: int, start: date, end: date
+    ) -> list[tuple[date, HyperLogLog]]:
+        """Sketches for days in [start, end] that have visitors."""
+        result = await db.execute(
+            select(VisitorSketch.day, VisitorSketch.registers).where(
+                VisitorSketch.url_id == url_id,
+                VisitorSketch.day >= start,
+                VisitorSketch.day <= end,
+            )
+        )
+        return [(day, HyperLogLog(registers)) for day, registers in result.all()]
@@ -1,20 +1,36 @@
 from pydantic import BaseModel, Field
+from app.core.config import get_settings
 
 
 class DayCount(BaseModel):
-    date: str = Field(..., description="Calendar date in `YYYY-MM-DD` format.", examples=["2026-02-25"])
-    clicks: int = Field(..., description="Number of redirect clicks recorded on this date.", examples=[17])
+    date: str = Field(
+        ...,
+        description="Bucket start in the requested offset: `YYYY-MM-DD` for days, `YYYY-MM-DDTHH:00` for hours.",
+        examples=["2026-02-25"],
+    )
+    clicks: int = Field(..., description="Number of redirect clicks recorded in this bucket.", examples=[17])
+    unique_visitors: int | None = Field(
+        None,
+        description="Approximate distinct visitors (client IP + user agent) in this UTC day; null for hourly or offset buckets.",
+        examples=[11],
+    )
 
     model_config = {
-        "json_schema_extra": {"examples": [{"date": "2026-02-25", "clicks": 17}]}
+        "json_schema_extra": {"examples": [{"date": "2026-02-25", "clicks": 17, "unique_visitors": 11}]}
     }
 
 
 class AnalyticsResponse(BaseModel):
     alias: str = Field(..., description="The alias whose analytics are returned.", examples=["aB3xYz"])
+    granularity: str = Field("day", description="Bucket size: `day` or `hour`.", examples=["day"])
     clicks_by_day: list[DayCount] = Field(
         ...,
-        description="Click counts for each of the last 7 calendar days, ordered oldest-first.",
+        description="Click counts for each bucket in the requested window, ordered oldest-first.",
+    )
+    unique_visitors: int | None = Field(
+        None,
+        description="Approximate distinct visitors over the whole window (UTC daily series only).",
+        examples=[48],
     )
 
     model_config = {
@@ -22,6 +38,7 @@ class AnalyticsResponse(BaseModel):
             "examples": [
                 {
                     "alias": "aB3xYz",
+                    "granularity": "day",
                     "clicks_by_day": [
                         {"date": "2026-02-19", "clicks": 5},
                         {"date": "2026-02-20", "clicks": 8},
@@ -35,3 +52,84 @@ class AnalyticsResponse(BaseModel):
             ]
         }
     }
+
+
+class MinuteCount(BaseModel):
+    minute: str = Field(..., description="Minute start in UTC, `YYYY-MM-DDTHH:MM`.", examples=["2026-02-25T14:05"])
+    clicks: int = Field(..., description="Number of redirect clicks recorded in this minute.", examples=[3])
+
+
+class RealtimeResponse(BaseModel):
+    alias: str = Field(..., description="The alias whose analytics are returned.", examples=["aB3xYz"])
+    total: int = Field(..., description="Clicks in the whole window.", examples=[9])
+    clicks_by_minute: list[MinuteCount] = Field(
+        ...,
+        description="Click counts per minute, oldest first; the last entry is the current, partial minute.",
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "alias": "aB3xYz",
+                    "total": 9,
+                    "clicks_by_minute": [
+                        {"minute": "2026-02-25T14:03", "clicks": 2},
+                        {"minute": "2026-02-25T14:04", "clicks": 4},
+                        {"minute": "2026-02-25T14:05", "clicks": 3},
+                    ],
+                }
+            ]
+        }
+    }
+
+
+class TopLink(BaseModel):
+    alias: str = Field(..., description="Alias of the short URL.", examples=["aB3xYz"])
+    original_url: str = Field(..., description="Destination URL.", examples=["https://www.example.com/launch"])
+    clicks: int = Field(..., description="Estimated clicks in the window.", examples=[1520])
+    error: int = Field(..., description="The true count is within `clicks ± error`.", examples=[3])
+
+
+class TopLinksResponse(BaseModel):
+    window: str = Field(..., description="The sliding window: `1h`, `24h` or `7d`.", examples=["24h"])
+    total_clicks: int = Field(..., description="Clicks counted in the window.", examples=[48211])
+    max_error: int = Field(
+        ...,
+        description=(
+            "Upper bound on any listed `error` and on the clicks of a link the sketches don't track. "
+            "An unlisted link has at most the last listed `clicks` plus `max_error`."
+        ),
+        examples=[12],
+    )
+    links: list[TopLink] = Field(..., description="Most-clicked links, most clicked first.")
+
+
+class AnalyticsBatchRequest(BaseModel):
+    aliases: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=get_settings().ANALYTICS_BATCH_MAX_ALIASES,
+        description="Aliases whose daily click series to return.",
+        examples=[["aB3xYz", "Qr7pLm"]],
+    )
+    days: int = Field(
+        7,
+        ge=1,
+        le=get_settings().ANALYTICS_MAX_DAYS,
+        description="Number of UTC calendar days to cover, ending today.",
+        examples=[7],
+    )
+
+    model_config = {
+        "json_schema_extra": {"examples": [{"aliases": ["aB3xYz", "Qr7pLm"], "days": 7}]}
+    }
+
+
+class AnalyticsBatchResponse(BaseModel):
+    results: list[AnalyticsResponse] = Field(
+        ..., description="Daily analytics for each known alias, in request order."
+    )
+    not_found: list[str] = Field(
+        default_factory=list, description="Requested aliases that do not exist."
+    )
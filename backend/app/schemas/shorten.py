@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from app.core.config import get_settings
 
 
 class ShortenRequest(BaseModel):
@@ -36,3 +37,47 @@ class ShortenResponse(BaseModel):
             ]
         }
     }
+
+
+class BatchShortenRequest(BaseModel):
+    urls: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=get_settings().SHORTEN_BATCH_MAX_SIZE,
+        description="Destination URLs to shorten, validated individually.",
+        examples=[["https://www.example.com/a", "https://www.example.com/b"]],
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {"urls": ["https://www.example.com/a", "https://www.example.com/b"]}
+            ]
+        }
+    }
+
+
+class BatchShortenItem(BaseModel):
+    url: str = Field(..., description="The submitted URL, as given.")
+    alias: str | None = Field(None, description="Alias of the created short URL; null if the URL was rejected.")
+    short_url: str | None = Field(None, description="Fully-qualified short URL; null if the URL was rejected.")
+    error: str | None = Field(None, description="Why the URL was rejected; null on success.")
+
+
+class BatchShortenResponse(BaseModel):
+    results: list[BatchShortenItem] = Field(
+        ..., description="One result per submitted URL, in input order."
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "results": [
+                        {"url": "https://www.example.com/a", "alias": "aB3xYz", "short_url": "https://crumbl.io/aB3xYz", "error": None},
+                        {"url": "ftp://example.com", "alias": None, "short_url": None, "error": "Invalid URL: scheme must be http or https"},
+                    ]
+                }
+            ]
+        }
+    }
@@ -0,0 +1,134 @@
+import hashlib
+import string
+from collections import deque
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+from app.core.config import get_settings
+from app.core.keys import ALIAS_KEY, get_key
+from app.repositories.alias_sequence_repository import AliasSequenceRepository
+from app.repositories.url_repository import UrlRepository
+
+ALIAS_LENGTH = 6
+ALIAS_CHARS = string.ascii_letters + string.digits
+ALIAS_SPACE = len(ALIAS_CHARS) ** ALIAS_LENGTH
+
+
+class AliasPermutation:
+    """Keyed bijection on [0, domain).
+
+    A balanced Feistel network over just enough bits to cover the domain,
+    with cycle-walking to stay inside it. Distinct inputs always map to
+    distinct outputs, and without the key consecutive inputs look random.
+    """
+
+    ROUNDS = 6
+
+    def __init__(self, key: str, domain: int = ALIAS_SPACE) -> None:
+        self.domain = domain
+        self.half_bits = max(1, ((domain - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.half_bits) - 1
+        self.key = hashlib.blake2b(key.encode(), digest_size=32).digest()
+
+    def _round(self, round_no: int, value: int) -> int:
+        data = round_no.to_bytes(1, "little") + value.to_bytes(8, "little")
+        digest = hashlib.blake2b(data, key=self.key, digest_size=8).digest()
+        return int.from_bytes(digest, "little") & self.mask
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self.half_bits, value & self.mask
+        for round_no in range(self.ROUNDS):
+            left, right = right, left ^ self._round(round_no, right)
+        return (left << self.half_bits) | right
+
+    def __call__(self, value: int) -> int:
+        if not 0 <= value < self.domain:
+            raise ValueError("value outside permutation domain")
+        value = self._encrypt(value)
+        while value >= self.domain:
+            value = self._encrypt(value)
+        return value
+
+
+def encode_alias(value: int) -> str:
+    """Encode 0 <= value < ALIAS_SPACE as a fixed-length ALIAS_CHARS string."""
+    chars = []
+    for _ in range(ALIAS_LENGTH):
+        value, digit = divmod(value, len(ALIAS_CHARS))
+        chars.append(ALIAS_CHARS[digit])
+    return "".join(reversed(chars))
+
+
+class AliasAllocator:
+    """Hands out aliases that cannot collide, without probing the urls table.
+
+    Each worker reserves a block of sequence values with one atomic upsert,
+    then maps every value through a keyed permutation of the alias space.
+    Values are never reused, so aliases are unique across workers. Aliases
+    created before the allocator existed were random; any that land in a
+    new block are skipped once, when the block is reserved.
+
+    A block is reserved in the caller's transaction, so it needs no second
+    connection. Until that transaction commits, the rest of the block is
+    handed out only to the same session; if it rolls back, the reservation
+    is undone and the rest of the block is dropped.
+    """
+
+    SEQUENCE = "urls"
+
+    def __init__(self, secret: str | None = None, block_size: int | None = None) -> None:
+        self.secret = secret
+        self._permutation: AliasPermutation | None = None
+        self.block_size = block_size or get_settings().ALIAS_BLOCK_SIZE
+        self.sequence_repo = AliasSequenceRepository()
+        self.url_repo = UrlRepository()
+        self._aliases: deque[str] = deque()
+        # Session.info key of the aliases reserved in a session's open transaction
+        self._key = ("reserved_aliases", id(self))
+
+    @property
+    def permutation(self) -> AliasPermutation:
+        # Built on first use: without ALIAS_SECRET_KEY the key is loaded from the database at startup
+        if self._permutation is None:
+            self._permutation = AliasPermutation(self.secret or get_key(ALIAS_KEY))
+        return self._permutation
+
+    async def allocate(self, db: AsyncSession, count: int = 1) -> list[str]:
+        """Return `count` fresh aliases, reserving blocks in `db`'s transaction as needed."""
+        reserved = self._reserved(db)
+        aliases = []
+        while len(aliases) < count:
+            if not reserved and not self._aliases:
+                await self._reserve(db, reserved, max(self.block_size, count - len(aliases)))
+            aliases.append((reserved or self._aliases).popleft())
+        return aliases
+
+    def release(self, db: AsyncSession, aliases: list[str]) -> None:
+        """Return aliases allocated through `db` but unused; they are handed out next."""
+        self._reserved(db).extendleft(reversed(aliases))
+
+    def _reserved(self, db: AsyncSession) -> deque[str]:
+        session = db.sync_session
+        if not event.contains(session, "after_commit", self._on_commit):
+            event.listen(session, "after_commit", self._on_commit)
+            event.listen(session, "after_transaction_end", self._on_transaction_end)
+        return session.info.setdefault(self._key, deque())
+
+    def _on_commit(self, session: Session) -> None:
+        self._aliases.extend(session.info.pop(self._key, ()))
+
+    def _on_transaction_end(self, session: Session, transaction: SessionTransaction) -> None:
+        # Still there only if the transaction rolled back, which undid the reservation
+        if transaction.parent is None:
+            session.info.pop(self._key, None)
+
+    async def _reserve(self, db: AsyncSession, reserved: deque[str], size: int) -> None:
+        end = await self.sequence_repo.advance(db, self.SEQUENCE, size)
+        if end > ALIAS_SPACE:
+            raise RuntimeError("Alias space exhausted")
+        aliases = [encode_alias(self.permutation(v)) for v in range(end - size, end)]
+        taken = await self.url_repo.existing_aliases(db, aliases)
+        reserved.extend(a for a in aliases if a not in taken)
+
+
+alias_allocator = AliasAllocator()
@@ -1,74 +1,278 @@
-from datetime import date, timedelta
-import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Literal
 from sqlalchemy.ext.asyncio import AsyncSession
-from cachetools import TTLCache
+from app.core.cache import ANALYTICS_CACHE, TTLCache, get_cache
+from app.models import Url
 from app.repositories.url_repository import UrlRepository
 from app.repositories.click_repository import ClickRepository
+from app.repositories.visitor_sketch_repository import VisitorSketchRepository
+from app.core.hll import HyperLogLog
+from app.services.trending import TrendingTracker, trending_tracker
 from app.core.config import get_settings
+from app.services.click_counters import (
+    DailyClickCounters,
+    MinuteClickCounters,
+    daily_click_counters,
+    minute_click_counters,
+)
+from app.services.url_service import UrlService
 
 DAYS = 7
+REALTIME_MINUTES = 60
+
+Granularity = Literal["day", "hour"]
+
+# Bucket labels; the same strftime format is used in SQL and Python
+_BUCKET_FORMATS = {"day": "%Y-%m-%d", "hour": "%Y-%m-%dT%H:00", "minute": "%Y-%m-%dT%H:%M"}
+_BUCKET_STEPS = {"day": timedelta(days=1), "hour": timedelta(hours=1)}
+_MAX_VARIANTS_PER_ALIAS = 16
+
+
+def parse_tz_offset(tz: str) -> int:
+    """Parse a UTC offset like "+05:30", "-0800" or "Z" into minutes. Raises ValueError."""
+    if tz in ("Z", "z"):
+        return 0
+    if tz[:1] == " ":
+        tz = "+" + tz[1:]  # an unescaped "+" in a query string arrives as a space
+    digits = tz[1:].replace(":", "")
+    if tz[:1] not in ("+", "-") or len(digits) != 4 or not digits.isdigit():
+        raise ValueError(f"Invalid UTC offset: {tz!r}")
+    hours, minutes = int(digits[:2]), int(digits[2:])
+    if hours > 14 or minutes >= 60:
+        raise ValueError(f"Invalid UTC offset: {tz!r}")
+    total = hours * 60 + minutes
+    return -total if tz[0] == "-" else total
 
 
 class AnalyticsService:
     def __init__(self) -> None:
         self.url_repo = UrlRepository()
         self.click_repo = ClickRepository()
+        self.sketch_repo = VisitorSketchRepository()
+        self.url_service = UrlService()
+        # Process-wide live day counters, incremented by the click buffer
+        self._live: DailyClickCounters = daily_click_counters
+        self._realtime: MinuteClickCounters = minute_click_counters
+        self._trending: TrendingTracker = trending_tracker
         settings = get_settings()
-        # TTL cache for analytics queries
-        self._analytics_cache: TTLCache = TTLCache(
+        # Process-wide TTL cache for analytics queries: alias -> {(days, granularity, tz): series}
+        self._analytics_cache: TTLCache = get_cache(
+            ANALYTICS_CACHE,
             maxsize=settings.ANALYTICS_CACHE_MAX_SIZE,
             ttl=settings.ANALYTICS_CACHE_TTL_SECONDS
         )
-        self._cache_lock = asyncio.Lock()
-
-    def _date_range(self) -> tuple[date, date]:
-        end = date.today()
-        start = end - timedelta(days=DAYS - 1)
-        return start, end
-
-    def _zero_filled_days(self) -> list[tuple[str, int]]:
-        start, end = self._date_range()
-        out: list[tuple[str, int]] = []
-        d = start
-        while d <= end:
-            out.append((d.strftime("%Y-%m-%d"), 0))
-            d += timedelta(days=1)
-        return out
+
+    def _window(
+        self, days: int, granularity: Granularity, tz_offset_minutes: int
+    ) -> tuple[datetime, datetime, datetime]:
+        """Returns (first bucket in local time, UTC start, UTC end) of the half-open window.
+
+        Days are whole local calendar days ending today; hours are the
+        trailing `days * 24` local hours ending with the current one.
+        """
+        offset = timedelta(minutes=tz_offset_minutes)
+        now_local = datetime.now(timezone.utc).replace(tzinfo=None) + offset
+        if granularity == "day":
+            end_local = now_local.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            start_local = end_local - timedelta(days=days)
+        else:
+            end_local = now_local.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            start_local = end_local - timedelta(hours=days * 24)
+        return start_local, start_local - offset, end_local - offset
+
+    async def _counts(
+        self,
+        db: AsyncSession,
+        url_id: int,
+        start: datetime,
+        end: datetime,
+        granularity: Granularity,
+        tz_offset_minutes: int,
+    ) -> dict[str, int]:
+        if granularity == "day" and tz_offset_minutes == 0:
+            # UTC days line up with the click_daily rollup
+            rows = await self.click_repo.daily_counts(db, url_id, start.date(), (end - timedelta(days=1)).date())
+            return {d.strftime("%Y-%m-%d"): c for d, c in rows}
+        rows = await self.click_repo.count_by_url_and_date_range(
+            db, url_id, start, end, _BUCKET_FORMATS[granularity], tz_offset_minutes
+        )
+        return dict(rows)
+
+    def _cached(self, alias: str, variant: tuple) -> list[tuple[str, int]] | None:
+        cached = self._analytics_cache.get(alias)
+        return cached.get(variant) if cached is not None else None
+
+    def _store(self, alias: str, variant: tuple, result: list[tuple[str, int]]) -> None:
+        # Variants of one alias share an entry so evicting the alias drops them all
+        cached = self._analytics_cache.get(alias)
+        if cached is None or len(cached) >= _MAX_VARIANTS_PER_ALIAS:
+            cached = {}
+            self._analytics_cache[alias] = cached
+        cached[variant] = result
+
+    async def get_clicks_by_day_many(
+        self, db: AsyncSession, aliases: list[str], days: int = DAYS
+    ) -> dict[str, list[tuple[str, int]]]:
+        """
+        `get_clicks_by_day` for several aliases: one IN query resolves the
+        aliases the URL cache doesn't hold, and one grouped click_daily query
+        covers every series that isn't already in memory.
+        Unknown aliases are left out of the result.
+        """
+        urls = await self.url_service.resolve_many(db, aliases)
+        if days <= self._live.days:
+            live = await self._live.series_many(db, {url.id: alias for alias, url in urls.items()}, days)
+            return {
+                alias: [(day.strftime("%Y-%m-%d"), count) for day, count in live[url.id]]
+                for alias, url in urls.items()
+            }
+
+        # Longer windows than the live counters hold: cached rollup reads
+        variant = (days, "day", 0)
+        result = {}
+        for alias in urls:
+            cached = self._cached(alias, variant)
+            if cached is not None:
+                result[alias] = cached
+        missing = {url.id: alias for alias, url in urls.items() if alias not in result}
+        if missing:
+            start_local, start, end = self._window(days, "day", 0)
+            rows = await self.click_repo.daily_counts_many(
+                db, list(missing), start.date(), (end - timedelta(days=1)).date()
+            )
+            for url_id, alias in missing.items():
+                counts = {d.strftime("%Y-%m-%d"): c for d, c in rows[url_id]}
+                result[alias] = self._fill(counts, start_local, end - start, "day")
+                self._store(alias, variant, result[alias])
+        return result
 
     async def get_clicks_by_day(
-        self, db: AsyncSession, alias: str, use_cache: bool = True
+        self, db: AsyncSession, alias: str, days: int = DAYS
+    ) -> list[tuple[str, int]] | None:
+        """
+        Returns (YYYY-MM-DD, count) pairs, oldest first, for the last `days`
+        UTC days. Returns None if alias not found.
+        Up to ANALYTICS_LIVE_DAYS days are served from the live day counters:
+        only the first read of an alias (and periodic re-seeds) query the
+        click_daily rollup, and clicks recorded since are already counted.
+        """
+        return (await self.get_clicks_by_day_many(db, [alias], days)).get(alias)
+
+    async def get_unique_visitors(
+        self, db: AsyncSession, alias: str, days: int = DAYS
+    ) -> tuple[dict[str, int], int] | None:
+        """
+        Returns approximate distinct visitors per UTC day (YYYY-MM-DD -> count,
+        days without visitors omitted) and across the whole window, from the
+        per-day HyperLogLog sketches. Returns None if alias not found.
+        The window total merges the daily sketches, so a visitor seen on
+        several days counts once. Visitors of clicks still in the buffer are
+        added to the stored sketches, so the counts keep pace with the live
+        click counts served alongside them.
+        """
+        url = await self.url_service.resolve(db, alias)
+        if url is None:
+            return None
+        _, start, end = self._window(days, "day", 0)
+        first, last = start.date(), (end - timedelta(days=1)).date()
+        buffer = self._live.buffer
+        # With commits held, every visitor is either in a stored sketch or unflushed
+        async with buffer.holding_commits():
+            sketches = dict(await self.sketch_repo.get_range(db, url.id, first, last))
+            for event in buffer.unflushed():
+                day = event.clicked_at.date()
+                if event.url_id == url.id and event.visitor is not None and first <= day <= last:
+                    sketches.setdefault(day, HyperLogLog()).add(event.visitor)
+        union = HyperLogLog()
+        per_day = {}
+        for day, sketch in sorted(sketches.items()):
+            per_day[day.strftime("%Y-%m-%d")] = sketch.count()
+            union.merge(sketch)
+        return per_day, union.count()
+
+    async def get_realtime(
+        self, db: AsyncSession, alias: str, minutes: int = REALTIME_MINUTES
     ) -> list[tuple[str, int]] | None:
         """
-        Returns list of (date_str YYYY-MM-DD, count) for last 7 days, zero-filled.
+        Returns (YYYY-MM-DDTHH:MM, count) pairs in UTC, oldest first, for the
+        last `minutes` minutes (at most ANALYTICS_REALTIME_MINUTES), ending
+        with the current partial minute. Returns None if alias not found.
+        Served from the live minute counters.
+        """
+        url = await self.url_service.resolve(db, alias)
+        if url is None:
+            return None
+        series = await self._realtime.series(db, url.id, alias, min(minutes, self._realtime.minutes))
+        return [(minute.strftime(_BUCKET_FORMATS["minute"]), count) for minute, count in series]
+
+    async def get_top(
+        self, db: AsyncSession, window: str, limit: int = 10
+    ) -> tuple[list[tuple[Url, int, int]], int, int]:
+        """
+        Returns ((url, clicks, error) for the `limit` most-clicked URLs in
+        `window`, most clicked first; total clicks in the window; max error).
+        Counts are Space-Saving estimates kept in memory: each is within
+        `error` of the true count. An untracked URL has at most `max error`
+        clicks, and any unlisted one at most the last listed count plus
+        `max error`. Only the URLs themselves are loaded, in one IN query.
+        """
+        hitters, total, max_error = self._trending.top(window, limit)
+        urls = await self.url_repo.get_by_ids(db, [h.url_id for h in hitters]) if hitters else {}
+        # URLs deleted since their clicks were counted are skipped
+        top = [(urls[h.url_id], h.clicks, h.error) for h in hitters if h.url_id in urls]
+        return top, total, max_error
+
+    @staticmethod
+    def _fill(
+        counts: dict[str, int], start_local: datetime, span: timedelta, granularity: Granularity
+    ) -> list[tuple[str, int]]:
+        """Zero-filled (bucket, count) pairs for every bucket of the window."""
+        fmt, step = _BUCKET_FORMATS[granularity], _BUCKET_STEPS[granularity]
+        end_local = start_local + span
+        result = []
+        bucket = start_local
+        while bucket < end_local:
+            label = bucket.strftime(fmt)
+            result.append((label, counts.get(label, 0)))
+            bucket += step
+        return result
+
+    async def get_click_series(
+        self,
+        db: AsyncSession,
+        alias: str,
+        days: int = DAYS,
+        granularity: Granularity = "day",
+        tz_offset_minutes: int = 0,
+        use_cache: bool = True,
+    ) -> list[tuple[str, int]] | None:
+        """
+        Returns zero-filled (bucket, count) pairs, oldest first, for the last
+        `days` days in the given UTC offset. Buckets are `YYYY-MM-DD` days or
+        `YYYY-MM-DDTHH:00` hours in local time.
         Returns None if alias not found.
-        Cached for 60 seconds to reduce expensive aggregation queries.
+        UTC daily series are served by `get_clicks_by_day`; others count raw
+        clicks over the (url_id, clicked_at) index and are cached for
+        ANALYTICS_CACHE_TTL_SECONDS. `use_cache=False` always queries.
         """
+        if use_cache and granularity == "day" and tz_offset_minutes == 0:
+            return await self.get_clicks_by_day(db, alias, days)
+
+        variant = (days, granularity, tz_offset_minutes)
         # Check cache first
         if use_cache:
-            async with self._cache_lock:
-                if alias in self._analytics_cache:
-                    return self._analytics_cache[alias]
-        
-        url = await self.url_repo.get_by_alias(db, alias)
+            cached = self._cached(alias, variant)
+            if cached is not None:
+                return cached
+
+        url = await self.url_service.resolve(db, alias)
         if not url:
             return None
 
-        start, end = self._date_range()
-        counts = await self.click_repo.count_by_url_and_date_range(
-            db, url.id, start, end
-        )
-        # Handle date format - SQLite returns strings from func.date()
-        by_date = {}
-        for d, c in counts:
-            date_str = d.strftime("%Y-%m-%d") if hasattr(d, 'strftime') else str(d)
-            by_date[date_str] = c
-        
-        result = self._zero_filled_days()
-        result = [(d, by_date.get(d, 0)) for d, _ in result]
-        
-        # Store in cache
+        start_local, start, end = self._window(days, granularity, tz_offset_minutes)
+        counts = await self._counts(db, url.id, start, end, granularity, tz_offset_minutes)
+        result = self._fill(counts, start_local, end - start, granularity)
         if use_cache:
-            async with self._cache_lock:
-                self._analytics_cache[alias] = result
-        
+            self._store(alias, variant, result)
+
         return result
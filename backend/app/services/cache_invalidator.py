@@ -0,0 +1,113 @@
+import asyncio
+import contextlib
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.cache import evict
+from app.core.config import get_settings
+from app.repositories.cache_invalidation_repository import CacheInvalidationRepository
+
+logger = logging.getLogger(__name__)
+
+
+class CacheInvalidator:
+    """Propagates cache evictions across uvicorn worker processes.
+
+    Mutations publish (cache, key) rows into the cache_invalidations table in
+    the same transaction as the change, so they become visible exactly when
+    the change commits. Every worker polls the table by primary key and
+    evicts the listed keys from its process-wide caches.
+
+    `generation` increases whenever evictions are applied; readers capture it
+    before a database read and skip caching the result if it moved, so a row
+    read before a concurrent update is never cached after its eviction.
+    """
+
+    def __init__(self, poll_interval: float | None = None, retention_seconds: int | None = None) -> None:
+        settings = get_settings()
+        self.poll_interval = poll_interval or settings.CACHE_INVALIDATION_POLL_SECONDS
+        self.retention = timedelta(
+            seconds=retention_seconds or settings.CACHE_INVALIDATION_RETENTION_SECONDS
+        )
+        self.repo = CacheInvalidationRepository()
+        self.generation = 0
+        self._last_id = 0
+        self._task: asyncio.Task | None = None
+        self._session_factory: async_sessionmaker | None = None
+        self._read_session_factory: async_sessionmaker | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(
+        self,
+        session_factory: async_sessionmaker,
+        *loaders: Callable[[AsyncSession], Awaitable[None]],
+        read_session_factory: async_sessionmaker | None = None,
+    ) -> None:
+        """Start polling from the current end of the log.
+
+        `loaders` warm caches from the database after the starting position
+        is captured, so anything published while they run is still applied.
+        Polls and loaders use `read_session_factory` when given; only pruning
+        needs `session_factory`.
+        """
+        if self.running:
+            return
+        self._session_factory = session_factory
+        self._read_session_factory = read_session_factory or session_factory
+        async with self._read_session_factory() as session:
+            self._last_id = await self.repo.latest_id(session)
+            for loader in loaders:
+                await loader(session)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def publish(self, db: AsyncSession, cache: str, *keys: str) -> None:
+        """Evict `keys` locally and queue their eviction for every other worker."""
+        self._apply([(cache, key) for key in keys])
+        await self.repo.add(db, cache, list(keys))
+
+    async def poll(self, db: AsyncSession) -> int:
+        """Apply invalidations published since the last poll. Returns how many were applied."""
+        if await self.repo.latest_id(db) < self._last_id:
+            # The log's ids restarted (e.g. a pre-AUTOINCREMENT table emptied by pruning)
+            self._last_id = 0
+        rows = await self.repo.list_since(db, self._last_id)
+        if rows:
+            self._last_id = rows[-1][0]
+            self._apply([(cache, key) for _, cache, key in rows])
+        return len(rows)
+
+    def _apply(self, entries: list[tuple[str, str]]) -> None:
+        for cache, key in entries:
+            evict(cache, key)
+        self.generation += 1
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_prune = loop.time()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                async with self._read_session_factory() as session:
+                    await self.poll(session)
+                if loop.time() >= next_prune:
+                    next_prune = loop.time() + 60
+                    async with self._session_factory() as session:
+                        await self.repo.prune(session, datetime.now(timezone.utc) - self.retention)
+                        await session.commit()
+            except Exception:
+                logger.exception("Cache invalidation poll failed")
+
+
+cache_invalidator = CacheInvalidator()
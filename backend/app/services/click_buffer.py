@@ -0,0 +1,214 @@
+import asyncio
+import contextlib
+import logging
+from collections import Counter
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.repositories.click_repository import ClickRepository
+from app.repositories.visitor_sketch_repository import VisitorSketchRepository
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ClickEvent:
+    url_id: int
+    clicked_at: datetime
+    visitor: int | None = None  # visitor_hash() of the client, for unique-visitor sketches
+
+
+class ClickBuffer:
+    """Write-behind buffer for redirect clicks.
+
+    Redirects enqueue a ClickEvent and return immediately; a background writer
+    drains the queue and persists clicks as multi-row inserts, flushing when a
+    batch is full or the flush interval elapses. A full queue makes `record`
+    wait (backpressure) instead of dropping clicks, as does a database that
+    stays locked (see `_write`). Subscribed listeners see every click as it
+    is recorded, before it is persisted; `holding_commits` and `unflushed`
+    let them line up what they saw with what the database holds.
+    """
+
+    def __init__(
+        self,
+        max_size: int | None = None,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.max_size = max_size or settings.CLICK_BUFFER_MAX_SIZE
+        self.batch_size = batch_size or settings.CLICK_BUFFER_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.CLICK_BUFFER_FLUSH_INTERVAL_SECONDS
+        self.retry_backoff = settings.CLICK_BUFFER_RETRY_BACKOFF_SECONDS
+        self.retry_max_backoff = settings.CLICK_BUFFER_RETRY_MAX_BACKOFF_SECONDS
+        self.shutdown_retries = settings.CLICK_BUFFER_SHUTDOWN_RETRIES
+        self.click_repo = ClickRepository()
+        self.sketch_repo = VisitorSketchRepository()
+        self._queue: asyncio.Queue[ClickEvent | None] | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._session_factory: async_sessionmaker | None = None
+        self._listeners: list[Callable[[ClickEvent], None]] = []
+        # Clicks queued or being written; they leave when their batch commits or is dropped
+        self._unflushed: Counter[ClickEvent] = Counter()
+        self._commit_lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def subscribe(self, listener: Callable[[ClickEvent], None]) -> None:
+        """Call `listener` synchronously with each recorded ClickEvent."""
+        self._listeners.append(listener)
+
+    async def start(self, session_factory: async_sessionmaker) -> None:
+        """Start the background writer. Clicks are written through `session_factory`."""
+        if self.running:
+            return
+        self._session_factory = session_factory
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush every queued click and stop the background writer."""
+        if not self.running:
+            return
+        self._stopping = True
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    @contextlib.asynccontextmanager
+    async def holding_commits(self) -> AsyncIterator[None]:
+        """Keep the writer from committing while the block runs.
+
+        Inside it, the clicks this worker recorded are exactly those already
+        in the database plus `unflushed()`, so a reader can query one and add
+        the other without missing or double counting a click.
+        """
+        async with self._commit_lock:
+            yield
+
+    def unflushed(self) -> list[ClickEvent]:
+        """Clicks recorded and queued but not yet committed."""
+        return list(self._unflushed.elements())
+
+    async def record(self, db: AsyncSession, url_id: int, visitor: int | None = None) -> None:
+        """Record a click for `url_id` by `visitor` (a visitor_hash, if known).
+
+        When the writer is running the click is queued; otherwise (e.g. no
+        lifespan, as in tests) it is written inline through `db`.
+        """
+        event = ClickEvent(url_id=url_id, clicked_at=datetime.now(timezone.utc), visitor=visitor)
+        if self.running:
+            self._unflushed[event] += 1
+        for listener in self._listeners:
+            listener(event)
+        if self.running:
+            await self._queue.put(event)
+            return
+        await self._persist(db, [event])
+
+    async def _persist(self, db: AsyncSession, events: list[ClickEvent]) -> None:
+        await self.click_repo.create_many(db, [(e.url_id, e.clicked_at) for e in events])
+        visitors: dict[tuple[int, date], list[int]] = {}
+        for e in events:
+            if e.visitor is not None:
+                visitors.setdefault((e.url_id, e.clicked_at.date()), []).append(e.visitor)
+        if visitors:
+            await self.sketch_repo.add_visitors(db, visitors)
+
+    async def _get(self, timeout: float) -> tuple[bool, ClickEvent | None]:
+        """(True, item) for the next queued item within `timeout` seconds, else (False, None).
+
+        Unlike `wait_for(queue.get())`, a get that completes as the timeout
+        fires still returns its item instead of dropping it.
+        """
+        getter = asyncio.ensure_future(self._queue.get())
+        done, _ = await asyncio.wait({getter}, timeout=timeout)
+        if not done:
+            getter.cancel()
+            await asyncio.wait({getter})
+            if getter.cancelled():
+                return False, None
+        return True, getter.result()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            event = await self._queue.get()
+            if event is None:
+                break
+            batch = [event]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    event = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    got, event = await self._get(timeout)
+                    if not got:
+                        break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+            await self._write(batch)
+
+    async def _write(self, batch: list[ClickEvent]) -> None:
+        """Persist `batch`, retrying transient errors and dropping only rejected clicks.
+
+        Operational errors (database locked, I/O) are retried with backoff;
+        meanwhile the queue fills and redirects wait instead of losing
+        clicks. Once stopping, a batch gets CLICK_BUFFER_SHUTDOWN_RETRIES
+        more tries.
+        Any other error means the database rejected some click (e.g. its
+        URL was deleted), so the batch is split to isolate and drop it.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self._session_factory() as session:
+                    await self._persist(session, batch)
+                    async with self._commit_lock:
+                        await session.commit()
+                        self._flushed(batch)
+                return
+            except OperationalError:
+                if self._stopping and attempt >= self.shutdown_retries:
+                    logger.exception("Dropped %d buffered clicks at shutdown", len(batch))
+                    self._flushed(batch)
+                    return
+                delay = min(self.retry_backoff * 2**attempt, self.retry_max_backoff)
+                logger.warning(
+                    "Writing %d buffered clicks failed, retrying in %.2fs", len(batch), delay, exc_info=True
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+            except Exception:
+                if len(batch) == 1:
+                    logger.exception("Dropped a click for url_id %d rejected by the database", batch[0].url_id)
+                    self._flushed(batch)
+                    return
+                middle = len(batch) // 2
+                await self._write(batch[:middle])
+                await self._write(batch[middle:])
+                return
+
+    def _flushed(self, batch: list[ClickEvent]) -> None:
+        for event in batch:
+            self._unflushed[event] -= 1
+            if not self._unflushed[event]:
+                del self._unflushed[event]
+
+
+click_buffer = ClickBuffer()
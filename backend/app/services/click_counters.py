@@ -0,0 +1,302 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
+from app.repositories.click_repository import ClickRepository
+from app.services.click_buffer import ClickBuffer, ClickEvent, click_buffer
+
+_MINUTE_FORMAT = "%Y-%m-%dT%H:%M"
+
+
+class BucketRing:
+    """Click counts for the last `size` buckets (days, minutes) of one URL.
+
+    Buckets are consecutive integers - day ordinals or minutes since the
+    epoch - stored at index bucket modulo `size`.
+    """
+
+    __slots__ = ("alias", "newest", "counts", "seeded_at")
+
+    def __init__(self, alias: str | None, size: int, newest: int) -> None:
+        self.alias = alias
+        self.newest = newest
+        self.counts = [0] * size
+        self.seeded_at = time.monotonic()
+
+    def _advance(self, bucket: int) -> None:
+        # Zero the slots of the buckets skipped since the newest one seen
+        size = len(self.counts)
+        for skipped in range(self.newest + 1, min(bucket, self.newest + size) + 1):
+            self.counts[skipped % size] = 0
+        self.newest = max(self.newest, bucket)
+
+    def add(self, bucket: int, count: int = 1) -> None:
+        if bucket > self.newest:
+            self._advance(bucket)
+        if bucket > self.newest - len(self.counts):
+            self.counts[bucket % len(self.counts)] += count
+
+    def series(self, newest: int, length: int) -> list[int]:
+        """Counts for the `length` buckets ending with `newest`, oldest first."""
+        if newest > self.newest:
+            self._advance(newest)
+        return [self.counts[b % len(self.counts)] for b in range(newest - length + 1, newest + 1)]
+
+
+class _LiveCounters(ABC):
+    """Per-URL bucket rings kept current by the click buffer.
+
+    A URL's ring is seeded from the database, plus the clicks `buffer` has
+    not flushed yet, the first time it is read; after that every recorded
+    click increments it, so reads need no query. Subclasses decide which
+    rings to keep (`_keep`), at most `max_urls` of them.
+
+    Each worker only observes its own clicks, so with several workers a
+    ring is re-seeded once it is `resync_seconds` old (0 never re-seeds).
+    """
+
+    def __init__(
+        self, size: int, max_urls: int, resync_seconds: float, buffer: ClickBuffer | None = None
+    ) -> None:
+        self.size = size
+        self.max_urls = max_urls
+        self.resync_seconds = resync_seconds
+        self.buffer = buffer or click_buffer
+        self.click_repo = ClickRepository()
+        self._rings: OrderedDict[int, BucketRing] = OrderedDict()
+
+    @abstractmethod
+    def _bucket(self, moment: datetime) -> int:
+        """Bucket number of `moment`; consecutive buckets differ by one."""
+
+    @abstractmethod
+    async def _load(
+        self, db: AsyncSession, url_ids: list[int], first: int, last: int
+    ) -> dict[int, list[tuple[int, int]]]:
+        """(bucket, count) rows per URL for buckets in [first, last]."""
+
+    @abstractmethod
+    def _keep(self, rings: dict[int, BucketRing]) -> None:
+        """Store the just-seeded `rings` (url_id -> ring) that should stay live."""
+
+    def __contains__(self, url_id: int) -> bool:
+        return url_id in self._rings
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def observe(self, event: ClickEvent) -> None:
+        """Click buffer listener: count `event` for URLs that have a ring."""
+        ring = self._rings.get(event.url_id)
+        if ring is not None:
+            ring.add(self._bucket(event.clicked_at))
+
+    def clear(self) -> None:
+        self._rings.clear()
+
+    def _fresh(self, ring: BucketRing | None, alias: str) -> bool:
+        # Row ids can be reused after a delete, so the alias must match too
+        if ring is None or ring.alias != alias:
+            return False
+        return not self.resync_seconds or time.monotonic() - ring.seeded_at < self.resync_seconds
+
+    async def _seed(self, db: AsyncSession, urls: dict[int, str], newest: int) -> dict[int, BucketRing]:
+        """Seed rings for `urls` (url_id -> alias) from the database and the unflushed clicks."""
+        rings = {url_id: BucketRing(alias, self.size, newest) for url_id, alias in urls.items()}
+        # With commits held, every click is either in the query's result or unflushed, not both
+        async with self.buffer.holding_commits():
+            counts = await self._load(db, list(rings), newest - self.size + 1, newest)
+            for url_id, ring in rings.items():
+                for bucket, count in counts[url_id]:
+                    ring.add(bucket, count)
+            for event in self.buffer.unflushed():
+                ring = rings.get(event.url_id)
+                if ring is not None:
+                    ring.add(self._bucket(event.clicked_at))
+            # Later clicks reach the kept rings through observe
+            self._keep(rings)
+        return rings
+
+    async def _series_many(
+        self, db: AsyncSession, urls: dict[int, str], length: int
+    ) -> tuple[int, dict[int, list[int]]]:
+        """Newest bucket, and counts for the last `length` buckets per url_id, oldest first.
+
+        `urls` maps url_id -> alias; URLs without a fresh ring are seeded together.
+        """
+        newest = self._bucket(datetime.now(timezone.utc))
+        rings = {}
+        stale = {}
+        for url_id, alias in urls.items():
+            ring = self._rings.get(url_id)
+            if self._fresh(ring, alias):
+                rings[url_id] = ring
+            else:
+                stale[url_id] = alias
+        if stale:
+            rings.update(await self._seed(db, stale, newest))
+        return newest, {url_id: ring.series(newest, length) for url_id, ring in rings.items()}
+
+
+class DailyClickCounters(_LiveCounters):
+    """Live click counts for the last ANALYTICS_LIVE_DAYS UTC days, seeded from click_daily."""
+
+    def __init__(
+        self,
+        days: int | None = None,
+        max_urls: int | None = None,
+        resync_seconds: float | None = None,
+        buffer: ClickBuffer | None = None,
+    ) -> None:
+        settings = get_settings()
+        super().__init__(
+            days or settings.ANALYTICS_LIVE_DAYS,
+            max_urls or settings.ANALYTICS_LIVE_MAX_URLS,
+            settings.ANALYTICS_LIVE_RESYNC_SECONDS if resync_seconds is None else resync_seconds,
+            buffer,
+        )
+
+    @property
+    def days(self) -> int:
+        return self.size
+
+    def _bucket(self, moment: datetime) -> int:
+        return moment.toordinal()
+
+    def _keep(self, rings: dict[int, BucketRing]) -> None:
+        self._rings.update(rings)
+        for url_id in rings:
+            self._rings.move_to_end(url_id)
+        while len(self._rings) > self.max_urls:
+            self._rings.popitem(last=False)
+
+    async def _load(
+        self, db: AsyncSession, url_ids: list[int], first: int, last: int
+    ) -> dict[int, list[tuple[int, int]]]:
+        rows = await self.click_repo.daily_counts_many(
+            db, url_ids, date.fromordinal(first), date.fromordinal(last)
+        )
+        return {url_id: [(day.toordinal(), count) for day, count in counts] for url_id, counts in rows.items()}
+
+    async def series_many(
+        self, db: AsyncSession, urls: dict[int, str], days: int
+    ) -> dict[int, list[tuple[date, int]]]:
+        """Clicks per UTC day for the last `days` days (at most `self.days`), oldest first.
+
+        `urls` maps url_id -> alias; URLs without a fresh ring are seeded in one query.
+        Rings are LRU-bounded by `max_urls`.
+        """
+        for url_id in urls:
+            if url_id in self._rings:
+                self._rings.move_to_end(url_id)
+        today, counts = await self._series_many(db, urls, days)
+        days_range = [date.fromordinal(day) for day in range(today - days + 1, today + 1)]
+        return {url_id: list(zip(days_range, series)) for url_id, series in counts.items()}
+
+
+class MinuteClickCounters(_LiveCounters):
+    """Live click counts for the last ANALYTICS_REALTIME_MINUTES minutes.
+
+    Unlike the day counters, any click starts a ring, so exactly the URLs
+    clicked within the window hold one: URLs are kept in order of their
+    last click, and on every click and read those whose last click fell
+    out of the window are dropped. Reads seed a ring from raw clicks over
+    the (url_id, clicked_at) index; a URL not clicked here within the
+    window is seeded on each read and not kept.
+    """
+
+    def __init__(
+        self,
+        minutes: int | None = None,
+        max_urls: int | None = None,
+        resync_seconds: float | None = None,
+        buffer: ClickBuffer | None = None,
+    ) -> None:
+        settings = get_settings()
+        super().__init__(
+            minutes or settings.ANALYTICS_REALTIME_MINUTES,
+            max_urls or settings.ANALYTICS_REALTIME_MAX_URLS,
+            settings.ANALYTICS_REALTIME_RESYNC_SECONDS if resync_seconds is None else resync_seconds,
+            buffer,
+        )
+        # url_id -> minute of its last click, least recently clicked first
+        self._clicked: OrderedDict[int, int] = OrderedDict()
+
+    @property
+    def minutes(self) -> int:
+        return self.size
+
+    def _bucket(self, moment: datetime) -> int:
+        return int(moment.timestamp()) // 60
+
+    async def _load(
+        self, db: AsyncSession, url_ids: list[int], first: int, last: int
+    ) -> dict[int, list[tuple[int, int]]]:
+        start = datetime.fromtimestamp(first * 60, timezone.utc)
+        end = datetime.fromtimestamp((last + 1) * 60, timezone.utc)
+        counts = {}
+        for url_id in url_ids:
+            rows = await self.click_repo.count_by_url_and_date_range(db, url_id, start, end, _MINUTE_FORMAT)
+            counts[url_id] = [
+                (self._bucket(datetime.strptime(label, _MINUTE_FORMAT).replace(tzinfo=timezone.utc)), count)
+                for label, count in rows
+            ]
+        return counts
+
+    def _keep(self, rings: dict[int, BucketRing]) -> None:
+        # Only URLs clicked within the window; the seeded ring replaces one started by a click
+        for url_id, ring in rings.items():
+            if url_id in self._clicked:
+                self._rings[url_id] = ring
+
+    def _expire(self, minute: int) -> None:
+        clicked = self._clicked
+        while clicked:
+            url_id, last = next(iter(clicked.items()))
+            if last > minute - self.size and len(clicked) <= self.max_urls:
+                break
+            del clicked[url_id]
+            del self._rings[url_id]
+
+    def observe(self, event: ClickEvent) -> None:
+        minute = self._bucket(event.clicked_at)
+        ring = self._rings.get(event.url_id)
+        if ring is None:
+            # No alias means not seeded, so the first read still loads the window
+            ring = self._rings[event.url_id] = BucketRing(None, self.size, minute)
+        ring.add(minute)
+        self._clicked[event.url_id] = minute
+        self._clicked.move_to_end(event.url_id)
+        self._expire(minute)
+
+    def clear(self) -> None:
+        super().clear()
+        self._clicked.clear()
+
+    async def _series_many(
+        self, db: AsyncSession, urls: dict[int, str], length: int
+    ) -> tuple[int, dict[int, list[int]]]:
+        # Expire on reads too, so quiet URLs go even when no clicks arrive
+        self._expire(self._bucket(datetime.now(timezone.utc)))
+        return await super()._series_many(db, urls, length)
+
+    async def series(
+        self, db: AsyncSession, url_id: int, alias: str, minutes: int
+    ) -> list[tuple[datetime, int]]:
+        """Clicks per minute for the last `minutes` minutes (at most `self.minutes`), oldest first.
+
+        The newest bucket is the current, partial minute.
+        """
+        newest, counts = await self._series_many(db, {url_id: alias}, minutes)
+        return [
+            (datetime.fromtimestamp(minute * 60, timezone.utc), count)
+            for minute, count in zip(range(newest - minutes + 1, newest + 1), counts[url_id])
+        ]
+
+
+daily_click_counters = DailyClickCounters()
+minute_click_counters = MinuteClickCounters()
+click_buffer.subscribe(daily_click_counters.observe)
+click_buffer.subscribe(minute_click_counters.observe)
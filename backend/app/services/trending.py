@@ -0,0 +1,111 @@
+import heapq
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from app.core.config import get_settings
+from app.core.heavy_hitters import SpaceSaving
+from app.services.click_buffer import ClickEvent, click_buffer
+
+# Window name -> (pane length in seconds, number of panes)
+WINDOWS = {
+    "1h": (300, 12),
+    "24h": (3600, 24),
+    "7d": (21600, 28),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class HeavyHitter:
+    url_id: int
+    clicks: int  # estimated clicks in the window
+    error: int  # the true count is within [clicks - error, clicks + error]
+
+
+class SlidingHeavyHitters:
+    """Most-clicked URLs over a sliding window, from a stream of clicks.
+
+    The window is split into `panes` consecutive panes of `pane_seconds`,
+    each summarized by a Space-Saving sketch of `capacity` counters; panes
+    older than the window are dropped whole, so the window slides one pane
+    at a time. A running sum over the live panes is kept as they change, so
+    a query costs the same however many clicks the window holds.
+    """
+
+    def __init__(self, pane_seconds: int, panes: int, capacity: int) -> None:
+        self.pane_seconds = pane_seconds
+        self.panes = panes
+        self.capacity = capacity
+        self._panes: deque[tuple[int, SpaceSaving]] = deque()
+        self._sums: dict[int, int] = {}
+
+    def clear(self) -> None:
+        self._panes.clear()
+        self._sums.clear()
+
+    def _change(self, url_id: int, delta: int) -> None:
+        count = self._sums.get(url_id, 0) + delta
+        if count:
+            self._sums[url_id] = count
+        else:
+            self._sums.pop(url_id, None)
+
+    def _expire(self, pane: int) -> None:
+        while self._panes and self._panes[0][0] <= pane - self.panes:
+            _, sketch = self._panes.popleft()
+            for url_id, count in sketch.counts.items():
+                self._change(url_id, -count)
+
+    def add(self, url_id: int, when: datetime) -> None:
+        pane = int(when.timestamp()) // self.pane_seconds
+        if not self._panes or self._panes[-1][0] < pane:
+            self._expire(pane)
+            self._panes.append((pane, SpaceSaving(self.capacity, self._change)))
+        self._panes[-1][1].add(url_id)
+
+    def top(self, limit: int, now: datetime | None = None) -> tuple[list[HeavyHitter], int, int]:
+        """The `limit` most-clicked URLs, plus (total clicks, max error) for the window.
+
+        An untracked URL has at most `max error` clicks in the window, and a
+        tracked one left out at most the last hitter's clicks plus `max error`.
+        """
+        now = now or datetime.now(timezone.utc)
+        self._expire(int(now.timestamp()) // self.pane_seconds)
+        sketches = [sketch for _, sketch in self._panes]
+        total = sum(sketch.total for sketch in sketches)
+        max_error = sum(sketch.min_count for sketch in sketches)
+        hitters = []
+        for url_id, clicks in heapq.nlargest(limit, self._sums.items(), key=lambda item: item[1]):
+            # Overcounted where a pane tracks it, possibly undercounted where a full pane evicted it
+            error = sum(
+                sketch.errors[url_id] if url_id in sketch.errors else sketch.min_count
+                for sketch in sketches
+            )
+            hitters.append(HeavyHitter(url_id=url_id, clicks=clicks, error=error))
+        return hitters, total, max_error
+
+
+class TrendingTracker:
+    """Sliding heavy-hitter trackers for each of WINDOWS, fed by the click buffer."""
+
+    def __init__(self, capacity: int | None = None) -> None:
+        capacity = capacity or get_settings().TRENDING_CAPACITY
+        self.capacity = capacity
+        self.windows = {
+            name: SlidingHeavyHitters(pane_seconds, panes, capacity)
+            for name, (pane_seconds, panes) in WINDOWS.items()
+        }
+
+    def clear(self) -> None:
+        for window in self.windows.values():
+            window.clear()
+
+    def observe(self, event: ClickEvent) -> None:
+        for window in self.windows.values():
+            window.add(event.url_id, event.clicked_at)
+
+    def top(self, window: str, limit: int) -> tuple[list[HeavyHitter], int, int]:
+        return self.windows[window].top(limit)
+
+
+trending_tracker = TrendingTracker()
+click_buffer.subscribe(trending_tracker.observe)
@@ -1,88 +1,289 @@
-import random
-import string
-import asyncio
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from urllib.parse import quote
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from cachetools import TTLCache
-from app.core.security import validate_url
+from app.core.bloom import BloomFilter
+from app.core.cache import (
+    URL_CACHE,
+    ANALYTICS_CACHE,
+    MISSING_ALIAS_CACHE,
+    DESTINATION_CACHE,
+    TTLCache,
+    get_bloom,
+    get_cache,
+    set_bloom,
+)
+from app.core.security import validate_url, destination_hash
 from app.repositories.url_repository import UrlRepository
 from app.models import Url
 from app.core.config import get_settings
+from app.services.cache_invalidator import cache_invalidator
+from app.services.alias_allocator import ALIAS_CHARS, ALIAS_LENGTH, alias_allocator
 
-ALIAS_LENGTH = 6
-ALIAS_CHARS = string.ascii_letters + string.digits
 
+@dataclass(frozen=True, slots=True)
+class UrlRecord:
+    """Session-free snapshot of a Url held by the resolution cache."""
 
-def _random_alias() -> str:
-    return "".join(random.choices(ALIAS_CHARS, k=ALIAS_LENGTH))
+    id: int
+    alias: str
+    original_url: str
+    archived: bool
+    # Pre-encoded Location header value, quoted the same way RedirectResponse does
+    location: bytes = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        location = quote(self.original_url, safe=":/%#?=@[]!$&'()*+,;")
+        object.__setattr__(self, "location", location.encode("latin-1"))
+
+    @classmethod
+    def from_model(cls, url: Url) -> "UrlRecord":
+        return cls(id=url.id, alias=url.alias, original_url=url.original_url, archived=url.archived)
+
+
+def encode_cursor(url: Url) -> str:
+    """Opaque list cursor holding the (created_at, id) keyset position of `url`."""
+    key = f"{url.created_at.isoformat()}|{url.id}"
+    return urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of `encode_cursor`. Raises ValueError if the cursor is malformed."""
+    try:
+        key = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, url_id = key.split("|")
+        return datetime.fromisoformat(created_at), int(url_id)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _destination_key(url: Url) -> str:
+    """DESTINATION_CACHE key for a Url; rows from before url_hash existed may lack it."""
+    return (url.url_hash or destination_hash(url.original_url)).hex()
 
 
 class UrlService:
     def __init__(self) -> None:
         self.repo = UrlRepository()
         settings = get_settings()
-        # TTL cache for hot URL lookups
-        self._url_cache: TTLCache = TTLCache(
+        # Process-wide TTL cache of alias -> UrlRecord for hot URL lookups
+        self._url_cache: TTLCache = get_cache(
+            URL_CACHE,
             maxsize=settings.URL_CACHE_MAX_SIZE,
             ttl=settings.URL_CACHE_TTL_SECONDS
         )
-        self._cache_lock = asyncio.Lock()
+        # Short-TTL cache of aliases confirmed not to exist
+        self._missing_cache: TTLCache = get_cache(
+            MISSING_ALIAS_CACHE,
+            maxsize=settings.NEGATIVE_CACHE_MAX_SIZE,
+            ttl=settings.NEGATIVE_CACHE_TTL_SECONDS,
+        )
+        # Destination hash (hex) -> alias of its oldest live short URL, for deduplication
+        self._dedup = settings.SHORTEN_DEDUPLICATE
+        self._destination_cache: TTLCache = get_cache(
+            DESTINATION_CACHE,
+            maxsize=settings.DEDUP_CACHE_MAX_SIZE,
+            ttl=settings.DEDUP_CACHE_TTL_SECONDS,
+        )
 
     def validate_input_url(self, url: str) -> tuple[bool, str | None]:
         ok, err = validate_url(url)
         return ok, err
 
+    async def _existing_aliases(self, db: AsyncSession, hashes: list[bytes]) -> dict[bytes, str]:
+        """Map destination hashes that already have a live short URL to its alias."""
+        found = {}
+        missing = []
+        for url_hash in hashes:
+            alias = self._destination_cache.get(url_hash.hex())
+            if alias is not None:
+                found[url_hash] = alias
+            else:
+                missing.append(url_hash)
+        if missing:
+            generation = cache_invalidator.generation
+            urls = await self.repo.get_by_hashes(db, missing)
+            # Don't cache a result that may have been invalidated while we read it
+            cacheable = cache_invalidator.generation == generation
+            for url_hash, url in urls.items():
+                found[url_hash] = url.alias
+                if cacheable:
+                    self._destination_cache[url_hash.hex()] = url.alias
+        return found
+
+    async def _create(self, db: AsyncSession, original_urls: list[str], aliases: list[str]) -> None:
+        """Insert new short URLs in one statement and warm the caches."""
+        if len(aliases) == 1:
+            urls = [await self.repo.create(db, alias=aliases[0], original_url=original_urls[0])]
+        else:
+            urls = await self.repo.create_many(db, list(zip(aliases, original_urls)))
+
+        # Add to the alias Bloom filter and drop negative entries in every worker
+        await cache_invalidator.publish(db, MISSING_ALIAS_CACHE, *aliases)
+
+        # Pre-populate caches with the newly created URLs
+        for url in urls:
+            self._url_cache[url.alias] = UrlRecord.from_model(url)
+            if self._dedup:
+                self._destination_cache[url.url_hash.hex()] = url.alias
+
+    async def shorten_many(
+        self, db: AsyncSession, original_urls: list[str], base_url: str
+    ) -> list[tuple[str, str]]:
+        """Create short URLs for already-validated URLs in one INSERT. Returns (alias, short_url) in input order.
+
+        With SHORTEN_DEDUPLICATE, destinations that already have a live alias
+        (or repeat within the batch) reuse it instead of creating a row.
+        """
+        original_urls = [url.strip() for url in original_urls]
+        aliases = await alias_allocator.allocate(db, len(original_urls))
+        if self._dedup:
+            hashes = [destination_hash(url) for url in original_urls]
+            by_hash = await self._existing_aliases(db, hashes)
+            new = {h: url for h, url in zip(hashes, original_urls) if h not in by_hash}
+            fresh, unused = aliases[:len(new)], aliases[len(new):]
+            alias_allocator.release(db, unused)
+            if new:
+                await self._create(db, list(new.values()), fresh)
+                by_hash.update(zip(new, fresh))
+            aliases = [by_hash[h] for h in hashes]
+        else:
+            await self._create(db, original_urls, aliases)
+        base_url = base_url.rstrip("/")
+        return [(alias, f"{base_url}/{alias}") for alias in aliases]
+
     async def shorten(
         self, db: AsyncSession, original_url: str, base_url: str
     ) -> tuple[str, str]:
-        """Create short URL. Returns (alias, short_url). Regenerates alias on collision."""
-        alias = _random_alias()
-        while await self.repo.alias_exists(db, alias):
-            alias = _random_alias()
-        url = await self.repo.create(db, alias=alias, original_url=original_url.strip())
-        short_url = f"{base_url.rstrip('/')}/{alias}"
-        
-        # Pre-populate cache with newly created URL
-        # Object is already flushed and refreshed by repository
-        async with self._cache_lock:
-            self._url_cache[alias] = url
-        
-        return alias, short_url
+        """Create short URL. Returns (alias, short_url). Aliases come from the collision-free allocator."""
+        [result] = await self.shorten_many(db, [original_url], base_url)
+        return result
 
-    async def get_by_alias(self, db: AsyncSession, alias: str, use_cache: bool = True) -> Url | None:
-        """Get URL by alias with in-memory caching for hot URLs.
-        
-        Note: Cached objects are merged into the current session to avoid
-        SQLAlchemy session binding issues.
+    def peek(self, alias: str) -> UrlRecord | None:
+        """Return the cached record for `alias` without any I/O, or None."""
+        return self._url_cache.get(alias)
+
+    async def resolve(self, db: AsyncSession, alias: str) -> UrlRecord | None:
+        """Resolve an alias for redirects.
+
+        Cache hits are served from an immutable UrlRecord without touching
+        the session. Aliases absent from the Bloom filter of known aliases,
+        or recently confirmed missing, are answered without a query; only
+        the remaining misses query the database.
         """
-        # Check cache first
-        if use_cache:
-            async with self._cache_lock:
-                if alias in self._url_cache:
-                    cached_url = self._url_cache[alias]
-                    # Merge cached object into current session
-                    # load=False means don't query DB, just attach to session
-                    return await db.run_sync(lambda session: session.merge(cached_url, load=False))
-        
-        # Cache miss - fetch from DB
+        record = self._url_cache.get(alias)
+        if record is not None:
+            return record
+        bloom = get_bloom(MISSING_ALIAS_CACHE)
+        if bloom is not None and alias not in bloom:
+            return None
+        if alias in self._missing_cache:
+            return None
+
+        generation = cache_invalidator.generation
         url = await self.repo.get_by_alias(db, alias)
-        
-        # Store in cache for future requests
-        if url and use_cache:
-            async with self._cache_lock:
-                self._url_cache[alias] = url
-        
-        return url
+        # Don't cache a result that may have been invalidated while we read it
+        cacheable = cache_invalidator.generation == generation
+        if url is None:
+            if cacheable:
+                self._missing_cache[alias] = True
+            return None
+        record = UrlRecord.from_model(url)
+        if cacheable:
+            self._url_cache[alias] = record
+        return record
+
+    async def resolve_many(self, db: AsyncSession, aliases: list[str]) -> dict[str, UrlRecord]:
+        """`resolve` for several aliases; the misses are looked up in one IN query.
+
+        Returns records for the aliases that exist.
+        """
+        records = {}
+        lookup = []
+        bloom = get_bloom(MISSING_ALIAS_CACHE)
+        for alias in dict.fromkeys(aliases):
+            record = self._url_cache.get(alias)
+            if record is not None:
+                records[alias] = record
+            elif (bloom is None or alias in bloom) and alias not in self._missing_cache:
+                lookup.append(alias)
+        if not lookup:
+            return records
+
+        generation = cache_invalidator.generation
+        urls = await self.repo.get_by_aliases(db, lookup)
+        cacheable = cache_invalidator.generation == generation
+        for url in urls:
+            record = records[url.alias] = UrlRecord.from_model(url)
+            if cacheable:
+                self._url_cache[url.alias] = record
+        if cacheable:
+            for alias in lookup:
+                if alias not in records:
+                    self._missing_cache[alias] = True
+        return records
+
+    async def load_alias_filter(self, db: AsyncSession) -> None:
+        """Build the Bloom filter of existing aliases (run once at startup).
+
+        Until it is loaded, every cache miss falls through to the database.
+        Deleted aliases stay in the filter; their 404s come from the
+        negative cache after one query.
+        """
+        settings = get_settings()
+        capacity = max(settings.ALIAS_BLOOM_CAPACITY, 2 * await self.repo.count(db))
+        bloom = BloomFilter(capacity, settings.ALIAS_BLOOM_ERROR_RATE)
+        async for alias in self.repo.iter_aliases(db):
+            bloom.add(alias)
+        set_bloom(MISSING_ALIAS_CACHE, bloom)
+
+    async def get_by_alias(self, db: AsyncSession, alias: str) -> Url | None:
+        """Load the Url ORM object for management paths that mutate it.
+
+        Bypasses the resolution cache so the object is attached to `db` and current.
+        """
+        return await self.repo.get_by_alias(db, alias)
+
+    async def get_with_stats(self, db: AsyncSession, alias: str) -> tuple[Url, int] | None:
+        """Load a Url (attached to `db`, as `get_by_alias`) together with its total clicks."""
+        return await self.repo.get_with_stats(db, alias)
+
+    async def list_page(
+        self,
+        db: AsyncSession,
+        limit: int,
+        archived: bool | None = None,
+        cursor: str | None = None,
+    ) -> tuple[list[tuple[Url, int]], str | None]:
+        """One page of URLs, newest first, with click totals for that page only.
+
+        Returns ((url, total_clicks) rows, next_cursor); next_cursor is None on the last page.
+        Raises ValueError for a malformed cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        urls = await self.repo.list_page(db, limit + 1, archived=archived, after=after)
+        next_cursor = None
+        if len(urls) > limit:
+            urls = urls[:limit]
+            next_cursor = encode_cursor(urls[-1])
+        totals = await self.repo.total_clicks(db, [url.id for url in urls]) if urls else {}
+        return [(url, totals.get(url.id, 0)) for url in urls], next_cursor
 
-    async def list_all(self, db: AsyncSession) -> list[tuple[Url, int]]:
-        return await self.repo.list_all_ordered(db)
+    def export_rows(self, db: AsyncSession) -> AsyncIterator[Sequence[Row]]:
+        """Batches of every URL with its click total, streamed from a server-side cursor."""
+        return self.repo.iter_export_rows(db)
 
     async def update_url(self, db: AsyncSession, url: Url, new_url: str) -> Url:
         """Update the original URL of an existing short link."""
+        old_key = _destination_key(url)
         updated_url = await self.repo.update_original_url(db, url, new_url)
         
-        # Invalidate cache entry for this alias
-        async with self._cache_lock:
-            self._url_cache.pop(url.alias, None)
+        # Invalidate this alias in every worker once the change commits
+        await cache_invalidator.publish(db, URL_CACHE, url.alias)
+        await cache_invalidator.publish(db, DESTINATION_CACHE, old_key)
         
         return updated_url
 
@@ -90,9 +291,9 @@ class UrlService:
         """Archive or unarchive a URL."""
         updated_url = await self.repo.toggle_archive(db, url, archived)
         
-        # Invalidate cache entry for this alias
-        async with self._cache_lock:
-            self._url_cache.pop(url.alias, None)
+        # Invalidate this alias in every worker once the change commits
+        await cache_invalidator.publish(db, URL_CACHE, url.alias)
+        await cache_invalidator.publish(db, DESTINATION_CACHE, _destination_key(url))
         
         return updated_url
 
@@ -100,6 +301,7 @@ class UrlService:
         """Delete a URL and all its clicks."""
         await self.repo.delete(db, url)
         
-        # Remove from cache
-        async with self._cache_lock:
-            self._url_cache.pop(url.alias, None)
+        # Remove from caches in every worker once the delete commits
+        await cache_invalidator.publish(db, URL_CACHE, url.alias)
+        await cache_invalidator.publish(db, ANALYTICS_CACHE, url.alias)
+        await cache_invalidator.publish(db, DESTINATION_CACHE, _destination_key(url))
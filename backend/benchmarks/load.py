@@ -0,0 +1,168 @@
+"""HTTP load benchmark against a real uvicorn server.
+
+Starts `uvicorn app.main:app` on a temporary SQLite database, keeps
+`--concurrency` requests in flight over keep-alive connections and reports
+throughput and latency percentiles.
+
+    cd backend
+    python -m benchmarks.load redirect --concurrency 1000 --requests 20000
+
+Extra settings can be passed to the server as environment variables, e.g.
+`REDIRECT_FAST_PATH=true python -m benchmarks.load redirect`.
+`--storage legacy` runs SQLite with its stock settings (rollback journal,
+synchronous=FULL, no mmap) to compare against the configured profile.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# SQLite defaults, i.e. the storage behaviour before the SQLITE_* profile existed
+LEGACY_STORAGE = {
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_CACHE_SIZE": "-2000",
+    "SQLITE_MMAP_SIZE": "0",
+    "SQLITE_TEMP_STORE": "DEFAULT",
+    "SQLITE_WAL_CHECKPOINT_SECONDS": "0",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def _server(workers: int, storage: str = "profile"):
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            **(LEGACY_STORAGE if storage == "legacy" else {}),
+            "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/bench.db",
+            "RATE_LIMIT_SHORTEN_REQUESTS": "100000000",
+        }
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                with contextlib.suppress(httpx.HTTPError):
+                    if httpx.get(f"{base_url}/health").status_code == 200:
+                        break
+                time.sleep(0.1)
+            yield base_url
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class _Connection:
+    """Minimal keep-alive HTTP/1.1 client; cheap enough not to be the bottleneck."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> "_Connection":
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> tuple[int, bytes]:
+        head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\n"
+        if body:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + body)
+        raw = await self.reader.readuntil(b"\r\n\r\n")
+        status = int(raw.split(b" ", 2)[1])
+        length = 0
+        for line in raw.lower().split(b"\r\n"):
+            if line.startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        return status, await self.reader.readexactly(length)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def _run(base_url: str, scenario: str, concurrency: int, total: int, n_aliases: int) -> None:
+    host, port = base_url.removeprefix("http://").split(":")
+    setup = await _Connection.open(host, int(port))
+    aliases = []
+    for i in range(n_aliases):
+        _, body = await setup.request("POST", "/api/shorten", json.dumps({"url": f"https://example.com/{i}"}).encode())
+        aliases.append(json.loads(body)["alias"])
+    for alias in aliases:  # warm the URL cache
+        await setup.request("GET", f"/{alias}")
+    setup.close()
+
+    expected = 302 if scenario == "redirect" else 201
+    latencies: list[float] = []
+    per_worker = total // concurrency
+    connections = [await _Connection.open(host, int(port)) for _ in range(concurrency)]
+
+    async def worker(conn: _Connection, offset: int) -> None:
+        for i in range(per_worker):
+            n = offset * per_worker + i
+            start = time.perf_counter()
+            if scenario == "redirect":
+                status, _ = await conn.request("GET", f"/{aliases[n % n_aliases]}")
+            else:
+                payload = json.dumps({"url": f"https://example.com/load/{n}"}).encode()
+                status, _ = await conn.request("POST", "/api/shorten", payload)
+            latencies.append(time.perf_counter() - start)
+            assert status == expected, status
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(conn, i) for i, conn in enumerate(connections)))
+    elapsed = time.perf_counter() - started
+    for conn in connections:
+        conn.close()
+
+    latencies.sort()
+    print(f"{scenario}: requests={len(latencies)} concurrency={concurrency} elapsed={elapsed:.2f}s")
+    print(f"throughput={len(latencies) / elapsed:.0f} req/s")
+    print(
+        f"p50={_percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={_percentile(latencies, 99) * 1000:.1f}ms "
+        f"max={latencies[-1] * 1000:.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenario", choices=["redirect", "shorten"])
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--aliases", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--storage", choices=["profile", "legacy"], default="profile")
+    args = parser.parse_args()
+
+    with _server(args.workers, args.storage) as base_url:
+        asyncio.run(_run(base_url, args.scenario, args.concurrency, args.requests, args.aliases))
+
+
+if __name__ == "__main__":
+    main()
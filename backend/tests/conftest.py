@@ -7,11 +7,17 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 
 # Use in-memory SQLite before app imports so engine picks it up
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+# Tests skip the lifespan that loads the generated keys
+os.environ["ALIAS_SECRET_KEY"] = "test-alias-key"
+os.environ["VISITOR_HASH_KEY"] = "test-visitor-key"
 from app.core.config import get_settings
 get_settings.cache_clear()
 
 from app.main import app
-from app.core.database import get_db, Base
+from app.core.cache import clear_caches
+from app.core.database import get_db, get_read_db, Base
+from app.services.click_counters import daily_click_counters, minute_click_counters
+from app.services.trending import trending_tracker
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 test_engine = create_async_engine(TEST_DATABASE_URL, echo=False, future=True)
@@ -38,6 +44,14 @@ async def db_session():
         yield session
         await session.rollback()
         await session.close()
+    # Endpoints that commit explicitly escape the rollback; start each test empty
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    # URL ids and aliases restart with the tables, so forget in-memory per-URL state too
+    clear_caches()
+    daily_click_counters.clear()
+    minute_click_counters.clear()
+    trending_tracker.clear()
 
 
 @pytest_asyncio.fixture
@@ -48,10 +62,16 @@ async def client(db_session):
     async def override_rate_limit():
         pass  # No-op: disable rate limiting in tests
 
-    from app.api.dependencies import rate_limit_shorten_dependency, rate_limit_api_dependency
+    from app.api.dependencies import (
+        rate_limit_shorten_dependency,
+        rate_limit_api_dependency,
+        rate_limit_shorten_batch_dependency,
+    )
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     app.dependency_overrides[rate_limit_shorten_dependency] = override_rate_limit
     app.dependency_overrides[rate_limit_api_dependency] = override_rate_limit
+    app.dependency_overrides[rate_limit_shorten_batch_dependency] = override_rate_limit
     async with AsyncClient(
         transport=ASGITransport(app=app),
         base_url="http://test",
@@ -72,6 +92,7 @@ async def client_with_rate_limit(db_session):
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     # Note: NOT overriding rate_limit dependencies, so rate limiting is active
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from app.core import keys
+from app.core.config import get_settings
+from app.core.database import Base, _create_engines
+from app.models import Url
+from app.services.alias_allocator import (
+    ALIAS_CHARS,
+    ALIAS_LENGTH,
+    AliasAllocator,
+    AliasPermutation,
+    encode_alias,
+)
+
+
+@pytest_asyncio.fixture
+async def alias_sessionmaker(tmp_path):
+    """File database so blocks reserved on separate connections stay isolated."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'aliases.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+def test_permutation_is_bijective():
+    # Domain deliberately not a power of two to exercise cycle-walking
+    permutation = AliasPermutation("test-key", domain=5000)
+    outputs = {permutation(v) for v in range(5000)}
+    assert outputs == set(range(5000))
+    assert [permutation(v) for v in range(10)] != list(range(10))
+
+
+def test_encode_alias_is_fixed_length():
+    assert encode_alias(0) == ALIAS_CHARS[0] * ALIAS_LENGTH
+    assert len(encode_alias(len(ALIAS_CHARS) ** ALIAS_LENGTH - 1)) == ALIAS_LENGTH
+
+
+@pytest.mark.asyncio
+async def test_workers_never_share_aliases(alias_sessionmaker):
+    worker_a = AliasAllocator(secret="k", block_size=10)
+    worker_b = AliasAllocator(secret="k", block_size=10)
+    async with alias_sessionmaker() as db:
+        aliases = []
+        for _ in range(3):
+            aliases += await worker_a.allocate(db, 7)
+            aliases += await worker_b.allocate(db, 7)
+    assert len(aliases) == len(set(aliases)) == 42
+
+
+@pytest.mark.asyncio
+async def test_existing_aliases_are_skipped(alias_sessionmaker):
+    taken = AliasAllocator(secret="k", block_size=5)
+    async with alias_sessionmaker() as db:
+        legacy = await taken.allocate(db, 5)
+        # Simulate pre-allocator random aliases sitting in the next block
+        db.add_all(Url(alias=a, original_url="https://example.com") for a in legacy)
+        await db.commit()
+        async with db.bind.begin() as conn:
+            await conn.exec_driver_sql("UPDATE alias_sequences SET next_value = 0")
+
+        allocator = AliasAllocator(secret="k", block_size=10)
+        fresh = await allocator.allocate(db, 5)
+    assert not set(fresh) & set(legacy)
+
+
+@pytest.mark.asyncio
+async def test_allocate_after_query_on_single_writer(tmp_path):
+    """Reserving a block reuses the session's connection, so it works mid-transaction."""
+    writer, reader = _create_engines(f"sqlite+aiosqlite:///{tmp_path / 'writer.db'}")
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    allocator = AliasAllocator(secret="k", block_size=5)
+    async with async_sessionmaker(writer, class_=AsyncSession)() as db:
+        db.add(Url(alias="legacy", original_url="https://example.com"))
+        await db.flush()
+        aliases = await asyncio.wait_for(allocator.allocate(db, 12), timeout=5)
+        await db.commit()
+    assert len(set(aliases)) == 12
+    await writer.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_block_is_not_handed_out(alias_sessionmaker):
+    allocator = AliasAllocator(secret="k", block_size=10)
+    async with alias_sessionmaker() as db:
+        await allocator.allocate(db, 1)
+        await db.rollback()
+
+    # The rollback undid the reservation, so its values are reserved again
+    committed = []
+    for _ in range(2):
+        async with alias_sessionmaker() as db:
+            aliases = await allocator.allocate(db, 10)
+            db.add_all(Url(alias=a, original_url="https://example.com") for a in aliases)
+            await db.commit()
+        committed += aliases
+    assert len(set(committed)) == 20
+
+
+@pytest.mark.asyncio
+async def test_committed_block_is_shared(alias_sessionmaker):
+    allocator = AliasAllocator(secret="k", block_size=10)
+    async with alias_sessionmaker() as db:
+        first = await allocator.allocate(db, 1)
+        await db.commit()
+    async with alias_sessionmaker() as db:
+        rest = await allocator.allocate(db, 9)
+        # Served from the committed block, without reserving another
+        next_value = (await db.execute(text("SELECT next_value FROM alias_sequences"))).scalar()
+    assert next_value == 10
+    assert len(set(first + rest)) == 10
+
+
+@pytest.mark.asyncio
+async def test_generated_keys_are_stored_and_shared(alias_sessionmaker, monkeypatch):
+    """Without configured keys, every worker loads the same random key from the database."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ALIAS_SECRET_KEY", "")
+    monkeypatch.setattr(settings, "VISITOR_HASH_KEY", "")
+    monkeypatch.setattr(keys, "_loaded", {})
+    with pytest.raises(RuntimeError, match="ALIAS_SECRET_KEY"):
+        keys.get_key(keys.ALIAS_KEY)
+
+    await keys.load_keys(alias_sessionmaker)
+    alias_key, visitor_key = keys.get_key(keys.ALIAS_KEY), keys.get_key(keys.VISITOR_KEY)
+    assert len({alias_key, visitor_key}) == 2
+    monkeypatch.setattr(keys, "_loaded", {})
+    await keys.load_keys(alias_sessionmaker)  # a second worker, or a restart
+    assert keys.get_key(keys.ALIAS_KEY) == alias_key
+    assert keys.get_key(keys.VISITOR_KEY) == visitor_key
+
+    async with alias_sessionmaker() as db:
+        first = await AliasAllocator(block_size=5).allocate(db, 5)
+    assert first == [encode_alias(AliasPermutation(alias_key)(v)) for v in range(5)]
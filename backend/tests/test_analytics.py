@@ -0,0 +1,356 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.hll import REGISTERS, HyperLogLog, hash_visitor
+from app.core.database import Base, _create_engines
+from app.core.heavy_hitters import SpaceSaving
+from app.models import Click, ClickDaily, Url
+from app.repositories.click_repository import ClickRepository
+from app.services.analytics_service import AnalyticsService, parse_tz_offset
+from app.services.click_buffer import ClickBuffer, ClickEvent
+from app.services.click_counters import BucketRing, DailyClickCounters, MinuteClickCounters
+from app.services.trending import SlidingHeavyHitters
+from app.services.url_service import UrlService
+
+
+@pytest.mark.asyncio
+async def test_analytics_counts_todays_clicks(client: AsyncClient):
+    s = await client.post("/api/shorten", json={"url": "https://example.com/rollup"})
+    alias = s.json()["alias"]
+    for _ in range(3):
+        await client.get(f"/{alias}")
+
+    r = await client.get(f"/api/analytics/{alias}")
+    assert r.status_code == 200
+    days = r.json()["clicks_by_day"]
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    # All three clicks come from the same test client
+    assert days[-1] == {"date": today, "clicks": 3, "unique_visitors": 1}
+    assert sum(d["clicks"] for d in days) == 3
+    assert r.json()["unique_visitors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_analytics_live_after_new_clicks(client: AsyncClient):
+    s = await client.post("/api/shorten", json={"url": "https://example.com/live"})
+    alias = s.json()["alias"]
+    await client.get(f"/{alias}")
+    r = await client.get(f"/api/analytics/{alias}")
+    assert r.json()["clicks_by_day"][-1]["clicks"] == 1
+
+    # No cache eviction needed: the redirect increments the live counter
+    for _ in range(2):
+        await client.get(f"/{alias}")
+    r = await client.get(f"/api/analytics/{alias}")
+    assert r.json()["clicks_by_day"][-1]["clicks"] == 3
+    assert len(r.json()["clicks_by_day"]) == 7
+
+
+def test_bucket_ring_rolls_over():
+    ring = BucketRing("abc123", size=3, newest=100)
+    ring.add(100, 2)
+    ring.add(98)
+    ring.add(97)  # older than the ring, ignored
+    assert ring.series(100, 3) == [1, 0, 2]
+    ring.add(102)
+    assert ring.series(102, 3) == [2, 0, 1]
+    assert ring.series(110, 3) == [0, 0, 0]
+
+
+@pytest.mark.asyncio
+async def test_live_counters_seed_while_buffer_flushes(tmp_path):
+    """A seed counts every recorded click once, whether it is queued, being written or committed."""
+    writer, reader = _create_engines(f"sqlite+aiosqlite:///{tmp_path / 'live.db'}")
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    write_sessions = async_sessionmaker(writer, class_=AsyncSession, expire_on_commit=False)
+    read_sessions = async_sessionmaker(reader, class_=AsyncSession, expire_on_commit=False)
+    async with write_sessions() as db:
+        url = Url(alias="seeded", original_url="https://example.com/seeded")
+        db.add(url)
+        await db.commit()
+
+    buffer = ClickBuffer(batch_size=3, flush_interval=0.001)
+    # A tiny resync interval re-seeds on every read
+    counters = DailyClickCounters(resync_seconds=1e-9, buffer=buffer)
+    buffer.subscribe(counters.observe)
+    await buffer.start(write_sessions)
+    try:
+        for clicks in range(1, 101):
+            await buffer.record(None, url.id)
+            async with read_sessions() as db:
+                series = await counters.series_many(db, {url.id: url.alias}, 1)
+            assert series[url.id][-1][1] == clicks
+    finally:
+        await buffer.stop()
+    async with read_sessions() as db:
+        series = await counters.series_many(db, {url.id: url.alias}, 1)
+    assert series[url.id][-1][1] == 100
+    await writer.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unique_visitors_include_unflushed_clicks(tmp_path):
+    """Visitors of clicks still in the buffer are counted, like the clicks themselves."""
+    writer, reader = _create_engines(f"sqlite+aiosqlite:///{tmp_path / 'uniques.db'}")
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    write_sessions = async_sessionmaker(writer, class_=AsyncSession, expire_on_commit=False)
+    read_sessions = async_sessionmaker(reader, class_=AsyncSession, expire_on_commit=False)
+    async with write_sessions() as db:
+        url = Url(alias="unflushed", original_url="https://example.com/unflushed")
+        db.add(url)
+        await db.commit()
+
+    # A large batch and long interval keep the first clicks queued
+    buffer = ClickBuffer(batch_size=1000, flush_interval=3600)
+    service = AnalyticsService()
+    service._live = DailyClickCounters(buffer=buffer)
+    await buffer.start(write_sessions)
+    try:
+        for i in range(4):
+            await buffer.record(None, url.id, visitor=hash_visitor(f"10.0.0.{i}", "ua"))
+        async with read_sessions() as db:
+            assert (await service.get_unique_visitors(db, url.alias))[1] == 4
+    finally:
+        await buffer.stop()
+    # Once flushed, the same visitors come from the stored sketch and are not counted twice
+    await buffer.start(write_sessions)
+    try:
+        await buffer.record(None, url.id, visitor=hash_visitor("10.0.0.0", "ua"))
+        async with read_sessions() as db:
+            assert (await service.get_unique_visitors(db, url.alias))[1] == 4
+    finally:
+        await buffer.stop()
+    await writer.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_rebuild_daily_rollup_from_raw_clicks(db_session):
+    now = datetime.now(timezone.utc)
+    db_session.add_all(
+        [Click(url_id=1, clicked_at=now), Click(url_id=1, clicked_at=now),
+         Click(url_id=1, clicked_at=now - timedelta(days=1)), Click(url_id=2, clicked_at=now)]
+    )
+    await db_session.flush()
+
+    repo = ClickRepository()
+    assert await repo.needs_daily_backfill(db_session)
+    assert await repo.rebuild_daily(db_session) == 3
+    assert not await repo.needs_daily_backfill(db_session)
+
+    rows = (await db_session.execute(select(ClickDaily.url_id, ClickDaily.day, ClickDaily.count))).all()
+    assert sorted(rows) == sorted(
+        [(1, now.date(), 2), (1, (now - timedelta(days=1)).date(), 1), (2, now.date(), 1)]
+    )
+
+
+@pytest.mark.asyncio
+async def test_click_series_granularity_and_offset(db_session):
+    alias, _ = await UrlService().shorten(db_session, "https://example.com/series", "http://test")
+    url = await UrlService().get_by_alias(db_session, alias)
+    now = datetime.now(timezone.utc)
+    clicks = [(url.id, now), (url.id, now - timedelta(hours=1)), (url.id, now - timedelta(days=2))]
+    await ClickRepository().create_many(db_session, clicks)
+
+    service = AnalyticsService()
+    daily = await service.get_click_series(db_session, alias, days=3, use_cache=False)
+    assert [d for d, _ in daily][-1] == now.strftime("%Y-%m-%d")
+    assert sum(c for _, c in daily) == 3
+
+    # The raw-click path (hourly) must agree with the rollup
+    raw = await service.get_click_series(db_session, alias, days=3, granularity="hour", use_cache=False)
+    assert sum(c for _, c in raw) == 3
+
+    hourly = await service.get_click_series(db_session, alias, days=1, granularity="hour", use_cache=False)
+    assert len(hourly) == 24
+    assert hourly[-1] == (now.strftime("%Y-%m-%dT%H:00"), 1)
+
+    shifted = await service.get_click_series(
+        db_session, alias, days=1, granularity="hour", tz_offset_minutes=330, use_cache=False
+    )
+    assert shifted[-1] == ((now + timedelta(minutes=330)).strftime("%Y-%m-%dT%H:00"), 1)
+    assert sum(c for _, c in shifted) == sum(c for _, c in hourly)
+
+
+@pytest.mark.asyncio
+async def test_unique_visitors(client: AsyncClient):
+    s = await client.post("/api/shorten", json={"url": "https://example.com/uniques"})
+    alias = s.json()["alias"]
+    for i in range(20):
+        await client.get(f"/{alias}", headers={"user-agent": f"agent-{i % 5}"})
+
+    r = await client.get(f"/api/analytics/{alias}")
+    data = r.json()
+    assert data["clicks_by_day"][-1]["clicks"] == 20
+    assert data["clicks_by_day"][-1]["unique_visitors"] == 5
+    assert data["unique_visitors"] == 5
+
+    # Visitors stay in step with the live click counts
+    await client.get(f"/{alias}", headers={"user-agent": "agent-new"})
+    data = (await client.get(f"/api/analytics/{alias}")).json()
+    assert data["clicks_by_day"][-1]["clicks"] == 21
+    assert data["unique_visitors"] == 6
+
+    r = await client.get(f"/api/analytics/{alias}", params={"granularity": "hour"})
+    assert r.json()["unique_visitors"] is None
+
+
+def test_hyperloglog_estimate_and_merge():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(20000):
+        a.add(hash_visitor(f"10.0.{i}", "ua"))
+    for i in range(10000, 30000):
+        b.add(hash_visitor(f"10.0.{i}", "ua"))
+    assert abs(a.count() - 20000) < 20000 * 0.05
+
+    blob = a.to_bytes()
+    assert len(blob) == REGISTERS
+    merged = HyperLogLog(blob)
+    merged.merge(b)
+    assert bytes(merged.registers) == bytes(map(max, a.registers, b.registers))
+    assert abs(merged.count() - 30000) < 30000 * 0.05
+
+
+def test_parse_tz_offset():
+    assert parse_tz_offset("+05:30") == 330
+    assert parse_tz_offset("-0800") == -480
+    assert parse_tz_offset(" 01:00") == 60
+    assert parse_tz_offset("Z") == 0
+    with pytest.raises(ValueError):
+        parse_tz_offset("+25:00")
+
+
+@pytest.mark.asyncio
+async def test_analytics_query_parameters(client: AsyncClient):
+    s = await client.post("/api/shorten", json={"url": "https://example.com/params"})
+    alias = s.json()["alias"]
+    await client.get(f"/{alias}")
+
+    r = await client.get(f"/api/analytics/{alias}", params={"days": 2, "granularity": "hour", "tz": "-03:00"})
+    assert r.status_code == 200
+    assert r.json()["granularity"] == "hour"
+    assert len(r.json()["clicks_by_day"]) == 48
+    assert sum(d["clicks"] for d in r.json()["clicks_by_day"]) == 1
+
+    r = await client.get(f"/api/analytics/{alias}", params={"tz": "bogus"})
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_realtime_minutes(client: AsyncClient):
+    s = await client.post("/api/shorten", json={"url": "https://example.com/realtime"})
+    alias = s.json()["alias"]
+    await client.get(f"/{alias}")
+    r = await client.get(f"/api/analytics/{alias}/realtime")
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data["clicks_by_minute"]) == 60
+    assert data["total"] == 1
+
+    for _ in range(2):
+        await client.get(f"/{alias}")
+    r = await client.get(f"/api/analytics/{alias}/realtime", params={"minutes": 15})
+    data = r.json()
+    assert len(data["clicks_by_minute"]) == 15
+    assert data["total"] == 3
+    assert len(data["clicks_by_minute"][-1]["minute"]) == 16  # YYYY-MM-DDTHH:MM
+
+    r = await client.get("/api/analytics/nonex1/realtime")
+    assert r.status_code == 404
+
+
+def test_minute_counters_drop_quiet_urls():
+    counters = MinuteClickCounters(minutes=60)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    counters.observe(ClickEvent(url_id=1, clicked_at=start))
+    counters.observe(ClickEvent(url_id=2, clicked_at=start + timedelta(minutes=30)))
+    assert 1 in counters and 2 in counters
+    counters.observe(ClickEvent(url_id=2, clicked_at=start + timedelta(minutes=60)))
+    assert 1 not in counters and len(counters) == 1
+
+
+@pytest.mark.asyncio
+async def test_minute_counters_evict_by_last_click(db_session):
+    counters = MinuteClickCounters(minutes=60)
+    start = datetime.now(timezone.utc) - timedelta(minutes=58)
+    counters.observe(ClickEvent(url_id=1, clicked_at=start))
+    counters.observe(ClickEvent(url_id=2, clicked_at=start + timedelta(minutes=10)))
+    # A read doesn't count as activity, so URL 1 is still the least recently clicked
+    await counters.series(db_session, 1, "first", 60)
+    counters.observe(ClickEvent(url_id=3, clicked_at=start + timedelta(minutes=62)))
+    assert 1 not in counters and 2 in counters and 3 in counters
+
+
+@pytest.mark.asyncio
+async def test_minute_counters_expire_on_read(db_session):
+    counters = MinuteClickCounters(minutes=60)
+    counters.observe(ClickEvent(url_id=1, clicked_at=datetime.now(timezone.utc) - timedelta(minutes=61)))
+    assert 1 in counters
+    series = await counters.series(db_session, 2, "never", 60)
+    assert sum(count for _, count in series) == 0
+    # The quiet URL expired without a new click, and the unclicked one wasn't kept
+    assert len(counters) == 0
+
+
+@pytest.mark.asyncio
+async def test_top_links(client: AsyncClient):
+    aliases = []
+    for i in range(3):
+        s = await client.post("/api/shorten", json={"url": f"https://example.com/top{i}"})
+        aliases.append(s.json()["alias"])
+    for alias, clicks in zip(aliases, (2, 5, 1)):
+        for _ in range(clicks):
+            await client.get(f"/{alias}")
+
+    r = await client.get("/api/analytics/top", params={"window": "1h", "limit": 100})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["window"] == "1h"
+    counts = {link["alias"]: link["clicks"] for link in data["links"]}
+    assert [counts[a] for a in aliases] == [2, 5, 1]
+    ranked = [link["alias"] for link in data["links"] if link["alias"] in aliases]
+    assert ranked == [aliases[1], aliases[0], aliases[2]]
+    assert data["max_error"] == 0
+
+    r = await client.get("/api/analytics/top", params={"window": "30d"})
+    assert r.status_code == 422
+
+
+def test_sliding_heavy_hitters_bounds():
+    rng = random.Random(7)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    tracker = SlidingHeavyHitters(pane_seconds=60, panes=10, capacity=20)
+    truth = Counter()
+    for i in range(20000):
+        when = start + timedelta(seconds=i * 0.06)  # 20 minutes of clicks
+        url_id = min(int(rng.paretovariate(1.2)), 500)
+        tracker.add(url_id, when)
+        if when >= start + timedelta(minutes=10):  # panes still inside the window at the end
+            truth[url_id] += 1
+
+    hitters, total, max_error = tracker.top(5, now=start + timedelta(minutes=19, seconds=59))
+    assert total == sum(truth.values())
+    assert max_error <= total * 10 // 20
+    for hitter in hitters:
+        assert abs(hitter.clicks - truth[hitter.url_id]) <= hitter.error <= max_error
+    assert hitters[0].url_id == truth.most_common(1)[0][0]
+    # Unlisted URLs, tracked or not, stay under the last hitter's count plus max_error
+    listed = {hitter.url_id for hitter in hitters}
+    assert all(count <= hitters[-1].clicks + max_error for url_id, count in truth.items() if url_id not in listed)
+
+
+def test_space_saving_replaces_minimum():
+    summary = SpaceSaving(capacity=2)
+    for key in "aab":
+        summary.add(key)
+    summary.add("c")  # evicts b (count 1)
+    assert summary.counts == {"a": 2, "c": 2}
+    assert summary.errors == {"a": 0, "c": 1}
+    assert summary.min_count == 2
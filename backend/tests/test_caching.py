@@ -1,7 +1,14 @@
+from datetime import datetime, timedelta, timezone
 import pytest
+from sqlalchemy import insert
 from httpx import AsyncClient
-from app.services.url_service import UrlService
+from app.services.url_service import UrlService, UrlRecord
 from app.services.analytics_service import AnalyticsService
+from app.services.cache_invalidator import CacheInvalidator, cache_invalidator
+from app.repositories.cache_invalidation_repository import CacheInvalidationRepository
+from app.core.bloom import BloomFilter
+from app.models import CacheInvalidation
+from app.core.cache import URL_CACHE, MISSING_ALIAS_CACHE, TTLCache, get_bloom, get_cache, set_bloom
 
 
 @pytest.mark.asyncio
@@ -86,3 +93,183 @@ async def test_analytics_cache_config(client: AsyncClient):
     assert service._analytics_cache is not None
     assert service._analytics_cache.maxsize == 1000
     assert service._analytics_cache.ttl == 60
+
+
+@pytest.mark.asyncio
+async def test_resolve_cache_hit_skips_session(db_session):
+    """Cached aliases resolve to plain records without using the session."""
+    service = UrlService()
+    alias, _ = await service.shorten(db_session, "https://example.com/record", "http://test")
+
+    record = await service.resolve(None, alias)
+    assert isinstance(record, UrlRecord)
+    assert record.original_url == "https://example.com/record"
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.original_url = "https://example.com/other"
+
+
+@pytest.mark.asyncio
+async def test_services_share_one_url_cache(db_session):
+    """Every UrlService instance uses the same process-wide cache."""
+    creator, resolver = UrlService(), UrlService()
+    assert creator._url_cache is resolver._url_cache
+
+    alias, _ = await creator.shorten(db_session, "https://example.com/shared", "http://test")
+    url = await creator.get_by_alias(db_session, alias)
+    await creator.update_url(db_session, url, "https://example.com/updated")
+
+    record = await resolver.resolve(db_session, alias)
+    assert record.original_url == "https://example.com/updated"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_published_by_another_worker(db_session):
+    """Polling the invalidation log evicts keys published by other processes."""
+    service = UrlService()
+    alias, _ = await service.shorten(db_session, "https://example.com/remote", "http://test")
+    assert alias in service._url_cache
+
+    # Simulate another worker publishing an eviction into the shared table
+    await CacheInvalidationRepository().add(db_session, URL_CACHE, [alias])
+    assert alias in service._url_cache
+
+    applied = await cache_invalidator.poll(db_session)
+    assert applied >= 1
+    assert alias not in service._url_cache
+
+
+@pytest.mark.asyncio
+async def test_invalidation_after_prune_empties_log(db_session):
+    """Ids are never reused, so evictions published after pruning still reach pollers."""
+    repo = CacheInvalidationRepository()
+    worker = CacheInvalidator()
+    await repo.add(db_session, URL_CACHE, ["old001", "old002", "old003"])
+    assert await worker.poll(db_session) == 3
+    await repo.prune(db_session, datetime.now(timezone.utc) + timedelta(seconds=1))
+
+    await repo.add(db_session, URL_CACHE, ["new001"])
+    assert await repo.latest_id(db_session) == 4
+    assert await worker.poll(db_session) == 1
+
+    # A log whose ids restarted anyway (e.g. recreated) is re-read from the start
+    await repo.prune(db_session, datetime.now(timezone.utc) + timedelta(seconds=1))
+    await db_session.execute(insert(CacheInvalidation).values(id=1, cache=URL_CACHE, key="new002"))
+    assert await worker.poll(db_session) == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_alias_negative_cached(db_session):
+    """A confirmed miss is answered from the negative cache without a query."""
+    service = UrlService()
+    assert await service.resolve(db_session, "zzNope") is None
+    assert await service.resolve(None, "zzNope") is None
+    analytics = AnalyticsService()
+    assert await analytics.get_click_series(None, "zzNope", granularity="hour") is None
+
+    # Shortening evicts the negative entry for its alias
+    service._missing_cache["zzNew1"] = True
+    await cache_invalidator.publish(db_session, MISSING_ALIAS_CACHE, "zzNew1")
+    assert "zzNew1" not in service._missing_cache
+
+
+@pytest.mark.asyncio
+async def test_alias_bloom_filter(db_session):
+    """Aliases missing from the Bloom filter resolve to None without a query."""
+    service = UrlService()
+    alias, _ = await service.shorten(db_session, "https://example.com/bloom", "http://test")
+    service._url_cache.pop(alias, None)
+    await service.load_alias_filter(db_session)
+    try:
+        bloom = get_bloom(MISSING_ALIAS_CACHE)
+        assert alias in bloom
+        assert await service.resolve(None, "neverX") is None
+
+        created, _ = await service.shorten(db_session, "https://example.com/bloom2", "http://test")
+        assert created in bloom
+        assert (await service.resolve(db_session, alias)).original_url == "https://example.com/bloom"
+    finally:
+        set_bloom(MISSING_ALIAS_CACHE, None)
+
+
+@pytest.mark.asyncio
+async def test_dedup_reuses_live_alias(db_session, monkeypatch):
+    """With deduplication on, repeat destinations return the existing alias until it is archived."""
+    service = UrlService()
+    monkeypatch.setattr(service, "_dedup", True)
+    alias, _ = await service.shorten(db_session, "https://Example.com", "http://test")
+    again, _ = await service.shorten(db_session, "https://example.com/", "http://test")
+    assert again == alias
+
+    # A cold cache falls back to the indexed hash lookup
+    service._destination_cache.clear()
+    results = await service.shorten_many(
+        db_session, ["https://example.com", "https://example.com/other", "https://example.com/other"], "http://test"
+    )
+    assert results[0][0] == alias
+    assert results[1] == results[2] and results[1][0] != alias
+
+    url = await service.get_by_alias(db_session, alias)
+    await service.archive_url(db_session, url, True)
+    fresh, _ = await service.shorten(db_session, "https://example.com", "http://test")
+    assert fresh != alias
+
+
+@pytest.mark.asyncio
+async def test_dedup_skips_caching_destinations_invalidated_mid_read(db_session, monkeypatch):
+    """A hash lookup that races an invalidation is used but not cached."""
+    service = UrlService()
+    monkeypatch.setattr(service, "_dedup", True)
+    alias, _ = await service.shorten(db_session, "https://example.com/racing", "http://test")
+    service._destination_cache.clear()
+
+    get_by_hashes = service.repo.get_by_hashes
+
+    async def racing_get_by_hashes(db, hashes):
+        urls = await get_by_hashes(db, hashes)
+        cache_invalidator.generation += 1
+        return urls
+
+    monkeypatch.setattr(service.repo, "get_by_hashes", racing_get_by_hashes)
+    again, _ = await service.shorten(db_session, "https://example.com/racing", "http://test")
+    assert again == alias
+    assert len(service._destination_cache) == 0
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"k{i:05d}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"x{i:05d}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_ttl_cache_expiry_and_eviction():
+    """Entries expire after the TTL, and a full cache evicts the oldest entry."""
+    now = [1000.0]
+    cache = TTLCache(maxsize=2, ttl=10, timer=lambda: now[0])
+    cache["a"] = 1
+    now[0] += 5
+    cache["b"] = 2
+    now[0] += 3
+    cache["c"] = 3
+    assert "a" not in cache
+    assert cache["b"] == 2 and cache["c"] == 3
+
+    now[0] += 8
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 1
+
+
+def test_registered_caches_evict_least_recently_used():
+    """A full cache evicts the entry read least recently, so hot aliases stay cached."""
+    cache = get_cache("test_lru", maxsize=2, ttl=60)
+    cache["hot"] = 1
+    cache["cold"] = 2
+    assert cache["hot"] == 1
+    cache["new"] = 3
+    assert "cold" not in cache
+    assert cache["hot"] == 1 and cache["new"] == 3
@@ -0,0 +1,148 @@
+import asyncio
+import sqlite3
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from app.core.database import Base, _create_engines
+from app.core.schema import migrate
+from app.models import Click, ClickDaily, Url, VisitorSketch
+from app.services.click_buffer import ClickBuffer
+from app.api.fast_redirect import RedirectFastPathMiddleware
+from app.services.url_service import UrlService
+from app.main import app
+
+
+@pytest_asyncio.fixture
+async def buffer_sessionmaker(tmp_path):
+    """Isolated file database so committed clicks don't leak into other tests."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'clicks.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _click_count(session_factory) -> int:
+    async with session_factory() as session:
+        return (await session.execute(select(func.count(Click.id)))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_buffer_flushes_full_batch(buffer_sessionmaker):
+    buffer = ClickBuffer(max_size=100, batch_size=5, flush_interval=60)
+    await buffer.start(buffer_sessionmaker)
+    for _ in range(5):
+        await buffer.record(None, url_id=1)
+
+    # A full batch is written without waiting for the flush interval
+    for _ in range(50):
+        if await _click_count(buffer_sessionmaker) == 5:
+            break
+        await asyncio.sleep(0.01)
+    assert await _click_count(buffer_sessionmaker) == 5
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_buffer_drains_on_stop(buffer_sessionmaker):
+    buffer = ClickBuffer(max_size=100, batch_size=50, flush_interval=60)
+    await buffer.start(buffer_sessionmaker)
+    for i in range(12):
+        await buffer.record(None, url_id=i % 3 + 1)
+    await buffer.stop()
+
+    assert not buffer.running
+    assert await _click_count(buffer_sessionmaker) == 12
+
+
+@pytest.mark.asyncio
+async def test_buffer_drops_clicks_for_deleted_urls(tmp_path):
+    """With the production pragmas, clicks queued for a deleted URL are rejected, not orphaned."""
+    engine, reader = _create_engines(f"sqlite+aiosqlite:///{tmp_path / 'fk.db'}")
+    await migrate(engine)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        deleted = Url(alias="gone01", original_url="https://gone.com")
+        session.add(deleted)
+        await session.commit()
+
+    buffer = ClickBuffer(max_size=100, batch_size=50, flush_interval=60)
+    await buffer.start(session_factory)
+    for _ in range(3):
+        await buffer.record(None, url_id=deleted.id, visitor=7)
+    async with session_factory() as session:
+        await session.delete(await session.get(Url, deleted.id))
+        await session.commit()
+        created = Url(alias="new001", original_url="https://new.com")
+        session.add(created)
+        await session.commit()
+    await buffer.record(None, url_id=created.id)
+    await buffer.stop()
+
+    # The new URL doesn't reuse the deleted id, so it inherits none of its clicks
+    assert created.id != deleted.id
+    async with session_factory() as session:
+        assert (await session.execute(select(Click.url_id))).scalars().all() == [created.id]
+        assert (await session.execute(select(ClickDaily.url_id))).scalars().all() == [created.id]
+        assert (await session.execute(select(func.count()).select_from(VisitorSketch))).scalar_one() == 0
+    await engine.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_buffer_retries_locked_database(tmp_path):
+    """Clicks written while another process holds the write lock are retried, not lost."""
+    path = tmp_path / "locked.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 0})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    other_process = sqlite3.connect(path, isolation_level=None)
+    other_process.execute("BEGIN IMMEDIATE")
+    buffer = ClickBuffer(max_size=100, batch_size=5, flush_interval=60)
+    buffer.retry_backoff = 0.01
+    await buffer.start(session_factory)
+    for _ in range(5):
+        await buffer.record(None, url_id=1)
+    await asyncio.sleep(0.1)  # the writer hits "database is locked" and backs off
+    other_process.execute("COMMIT")
+    other_process.close()
+    await buffer.stop()
+
+    assert await _click_count(session_factory) == 5
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_fast_path_redirects_cached_alias(client: AsyncClient, db_session, buffer_sessionmaker):
+    """The ASGI fast path answers cached aliases and queues the click."""
+    buffer = ClickBuffer(max_size=100, batch_size=50, flush_interval=60)
+    await buffer.start(buffer_sessionmaker)
+    # Wired like app.main: the middleware runs inside the app, which sets scope["app"]
+    fast_app = FastAPI()
+    fast_app.add_middleware(RedirectFastPathMiddleware, buffer=buffer)
+    fast_app.router.routes.extend(app.routes)
+    fast = AsyncClient(transport=ASGITransport(app=fast_app), base_url="http://test")
+    async with fast:
+        r = await client.post("/api/shorten", json={"url": "https://example.com/café"})
+        alias = r.json()["alias"]
+
+        r = await fast.get(f"/{alias}")
+        assert r.status_code == 302
+        assert r.headers["location"] == "https://example.com/caf%C3%A9"
+        assert r.headers["content-length"] == "0"
+
+        # A cached alias that collides with a static 6-character route is left to routing
+        db_session.add(Url(alias="health", original_url="https://example.com/shadowed"))
+        await db_session.flush()
+        assert await UrlService().resolve(db_session, "health") is not None
+        assert (await fast.get("/health")).json() == {"status": "ok"}
+
+        # Misses fall through to the normal app
+        assert (await fast.get("/nonex1")).status_code == 404
+    await buffer.stop()
+    assert await _click_count(buffer_sessionmaker) == 1
@@ -0,0 +1,248 @@
+import sqlite3
+from datetime import datetime, time, timedelta, timezone
+import pytest
+import pytest_asyncio
+from pydantic import ValidationError
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.exc import OperationalError
+from app.core.config import Settings
+from app.core.database import Base, LazySession, TrackedSession, _create_engines
+from app.core.schema import migrate, upgrade_schema
+from app.core.security import destination_hash
+from app.core.sqlite import WalCheckpointer, apply_storage_profile
+from app.jobs.backfill_url_hash import backfill_url_hash
+from app.jobs.compact_clicks import compact_clicks, retention_cutoff
+from app.models import Click, ClickDaily, Url
+from app.repositories.cache_invalidation_repository import CacheInvalidationRepository
+from app.repositories.click_repository import ClickRepository
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'lazy.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(
+        engine, class_=AsyncSession, sync_session_class=TrackedSession, expire_on_commit=False
+    )
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_unused_never_opens(session_factory):
+    db = LazySession(session_factory)
+    await db.finish()
+    assert not db.started
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_read_only_skips_commit(session_factory):
+    db = LazySession(session_factory)
+    await db.execute(select(func.count(Url.id)))
+    assert db.started
+    assert not db.sync_session.info.get("has_writes")
+    await db.finish()
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_commits_writes(session_factory):
+    db = LazySession(session_factory)
+    db.add(Url(alias="lazy01", original_url="https://example.com"))
+    await db.flush()
+    assert db.sync_session.info["has_writes"]
+    await db.finish()
+
+    async with session_factory() as check:
+        assert (await check.execute(select(func.count(Url.id)))).scalar_one() == 1
+
+
+@pytest.mark.asyncio
+async def test_upgrade_schema_adds_url_hash(session_factory):
+    """Databases created before url_hash get the column, its index and backfilled values."""
+    engine = session_factory.kw["bind"]
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("DROP INDEX ix_urls_url_hash")
+        await conn.exec_driver_sql("ALTER TABLE urls DROP COLUMN url_hash")
+        await conn.exec_driver_sql(
+            "INSERT INTO urls (alias, original_url, archived, created_at)"
+            " VALUES ('legacy', 'https://example.com', 0, '2025-01-01')"
+        )
+        executed = await conn.run_sync(upgrade_schema)
+        assert len(executed) == 2
+        assert await conn.run_sync(upgrade_schema) == []
+
+    assert await backfill_url_hash(session_factory) == 1
+    async with session_factory() as session:
+        url_hash = (await session.execute(select(Url.url_hash))).scalar_one()
+    assert url_hash == destination_hash("https://example.com")
+
+
+@pytest.mark.asyncio
+async def test_upgrade_schema_rebuilds_invalidation_log_with_autoincrement(session_factory):
+    """Logs created before AUTOINCREMENT keep their rows and stop reusing ids."""
+    engine = session_factory.kw["bind"]
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("DROP TABLE cache_invalidations")
+        await conn.exec_driver_sql(
+            "CREATE TABLE cache_invalidations (id INTEGER NOT NULL PRIMARY KEY,"
+            " cache VARCHAR(32) NOT NULL, key VARCHAR(64) NOT NULL, created_at DATETIME NOT NULL)"
+        )
+        await conn.exec_driver_sql(
+            "INSERT INTO cache_invalidations (cache, key, created_at) VALUES ('url', 'old001', '2025-01-01')"
+        )
+        assert await conn.run_sync(upgrade_schema) == ["REBUILD TABLE cache_invalidations"]
+        assert await conn.run_sync(upgrade_schema) == []
+
+    repo = CacheInvalidationRepository()
+    async with session_factory() as session:
+        assert await repo.list_since(session, 0) == [(1, "url", "old001")]
+        await repo.prune(session, datetime(2026, 1, 1))
+        await repo.add(session, "url", ["new001"])
+        assert await repo.latest_id(session) == 2
+
+
+@pytest.mark.asyncio
+async def test_storage_profile_and_checkpoint(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}")
+    apply_storage_profile(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        pragmas = {
+            name: (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "temp_store")
+        }
+    assert pragmas == {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000, "temp_store": 2}
+
+    checkpointer = WalCheckpointer(interval=3600)
+    await checkpointer.start(engine)
+    assert checkpointer.running
+    busy, wal_pages, checkpointed = await checkpointer.checkpoint()
+    assert busy == 0 and checkpointed == wal_pages
+    await checkpointer.stop()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_migrate_rebuilds_urls_without_cascading(tmp_path):
+    """An old urls table gains AUTOINCREMENT under the production pragmas, keeping its clicks."""
+    engine, reader = _create_engines(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    await migrate(engine)
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        await conn.exec_driver_sql("DROP TABLE urls")
+        await conn.exec_driver_sql(
+            "CREATE TABLE urls (id INTEGER NOT NULL PRIMARY KEY, alias VARCHAR(6) NOT NULL,"
+            " original_url TEXT NOT NULL, url_hash BLOB, archived BOOLEAN NOT NULL, created_at DATETIME NOT NULL)"
+        )
+        await conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            "INSERT INTO urls (alias, original_url, archived, created_at)"
+            " VALUES ('legacy', 'https://example.com', 0, '2025-01-01')"
+        )
+        await ClickRepository().create_many(conn, [(1, datetime(2025, 1, 2))])
+        with pytest.raises(RuntimeError, match="foreign keys off"):
+            await conn.run_sync(upgrade_schema)
+
+    assert "REBUILD TABLE urls" in await migrate(engine)
+    assert await migrate(engine) == []
+    async with engine.connect() as conn:
+        assert (await conn.exec_driver_sql("PRAGMA foreign_keys")).scalar() == 1
+        assert (await conn.execute(select(func.count(Click.id)))).scalar_one() == 1
+        assert (await conn.execute(select(func.sum(ClickDaily.count)))).scalar_one() == 1
+    await engine.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_compact_clicks_keeps_rollup_and_shrinks_file(tmp_path):
+    # The single-connection writer, so vacuuming must not need a second connection at once
+    engine, reader = _create_engines(f"sqlite+aiosqlite:///{tmp_path / 'compact.db'}")
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        assert (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() == 2
+
+    now = datetime.now(timezone.utc)
+    repo = ClickRepository()
+    async with factory() as session:
+        session.add(Url(alias="compac", original_url="https://example.com"))
+        await session.flush()
+        url_id = (await session.execute(select(Url.id))).scalar_one()
+        await repo.create_many(session, [(url_id, now - timedelta(days=200, seconds=i)) for i in range(20000)])
+        await repo.create_many(session, [(url_id, now)] * 10)
+        await session.commit()
+
+    report = await compact_clicks(factory, retention_days=30, batch_size=3000)
+    assert report.rows_compacted == 20000
+    assert report.bytes_reclaimed > 0
+
+    async with factory() as session:
+        assert (await session.execute(select(func.count(Click.id)))).scalar_one() == 10
+        assert (await session.execute(select(func.sum(ClickDaily.count)))).scalar_one() == 20010
+        # Rebuilding the rollup from what is left must not drop compacted days
+        await repo.rebuild_daily(session, since=retention_cutoff(30).date())
+        assert (await session.execute(select(func.sum(ClickDaily.count)))).scalar_one() == 20010
+    await engine.dispose()
+    await reader.dispose()
+
+
+def test_retention_is_off_by_default():
+    assert retention_cutoff() is None
+    assert retention_cutoff(1) == datetime.combine(datetime.now(timezone.utc).date(), time.min)
+
+
+def test_retention_must_outlast_analytics_window():
+    with pytest.raises(ValidationError):
+        Settings(CLICK_RETENTION_DAYS=30, ANALYTICS_MAX_DAYS=90)
+    assert Settings(CLICK_RETENTION_DAYS=91, ANALYTICS_MAX_DAYS=90).CLICK_RETENTION_DAYS == 91
+    assert Settings(CLICK_RETENTION_DAYS=0).CLICK_RETENTION_DAYS == 0
+
+
+@pytest.mark.asyncio
+async def test_writer_takes_write_lock_when_transaction_begins(tmp_path):
+    """Writer transactions start with BEGIN IMMEDIATE, so they never have to upgrade a read lock."""
+    path = tmp_path / "immediate.db"
+    writer, reader = _create_engines(f"sqlite+aiosqlite:///{path}")
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    other_process = sqlite3.connect(path, timeout=0)
+    async with writer.begin() as conn:
+        await conn.execute(select(func.count(Url.id)))
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other_process.execute("BEGIN IMMEDIATE")
+
+    # Checkpoints run outside a transaction, so they don't wait for the lock
+    other_process.execute("BEGIN IMMEDIATE")
+    checkpointer = WalCheckpointer(interval=3600)
+    await checkpointer.start(writer)
+    await checkpointer.checkpoint()
+    await checkpointer.stop()
+    other_process.execute("ROLLBACK")
+    other_process.close()
+    await writer.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reader_pool_is_read_only_and_not_blocked_by_writer(tmp_path):
+    writer, reader = _create_engines(f"sqlite+aiosqlite:///{tmp_path / 'split.db'}")
+    assert writer is not reader
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with writer.connect() as write_conn:
+        await write_conn.execute(Url.__table__.insert().values(alias="pendng", original_url="https://a.com"))
+        # The write transaction is still open; readers see the last commit without waiting
+        async with reader.connect() as read_conn:
+            count = (await read_conn.execute(select(func.count(Url.id)))).scalar_one()
+            assert count == 0
+            with pytest.raises(OperationalError):
+                await read_conn.execute(Url.__table__.insert().values(alias="nowrit", original_url="https://b.com"))
+        await write_conn.commit()
+
+    await writer.dispose()
+    await reader.dispose()
@@ -1,5 +1,18 @@
+import asyncio
+import csv
+import io
+import json
 import pytest
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.api.dependencies import (
+    rate_limit_api_dependency,
+    rate_limit_shorten_batch_dependency,
+    rate_limit_shorten_dependency,
+)
+from app.core import database
+from app.core.database import Base, TrackedSession, _create_engines, get_db, get_read_db
+from app.main import app
 
 
 @pytest.mark.asyncio
@@ -34,6 +47,29 @@ async def test_shorten_missing_scheme(client: AsyncClient):
     assert r.status_code == 400
 
 
+@pytest.mark.asyncio
+async def test_shorten_batch(client: AsyncClient):
+    urls = ["https://example.com/a", "not-a-url", "https://example.com/b"]
+    r = await client.post("/api/shorten/batch", json={"urls": urls})
+    assert r.status_code == 201
+    results = r.json()["results"]
+    assert [item["url"] for item in results] == urls
+    assert results[1]["alias"] is None and results[1]["error"]
+    ok = [results[0], results[2]]
+    assert all(item["error"] is None and len(item["alias"]) == 6 for item in ok)
+    assert ok[0]["alias"] != ok[1]["alias"]
+
+    r = await client.get(f"/{ok[1]['alias']}")
+    assert r.status_code == 302
+    assert r.headers["location"] == "https://example.com/b"
+
+
+@pytest.mark.asyncio
+async def test_shorten_batch_empty(client: AsyncClient):
+    r = await client.post("/api/shorten/batch", json={"urls": []})
+    assert r.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_redirect_found(client: AsyncClient):
     shorten_r = await client.post("/api/shorten", json={"url": "https://example.com/target"})
@@ -100,6 +136,149 @@ async def test_list_urls_order_and_clicks(client: AsyncClient):
     assert by_alias[alias2]["total_clicks"] == 0
 
 
+@pytest.mark.asyncio
+async def test_list_urls_keyset_pages(client: AsyncClient):
+    created = []
+    for i in range(5):
+        r = await client.post("/api/shorten", json={"url": f"https://page{i}.com"})
+        created.append(r.json()["alias"])
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = await client.get("/api/urls", params=params)
+        assert r.status_code == 200
+        assert len(r.json()) <= 2
+        seen += [item["alias"] for item in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == created[::-1]
+
+    r = await client.get("/api/urls", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_urls_archived_filter(client: AsyncClient):
+    r = await client.post("/api/shorten", json={"url": "https://keep.com"})
+    kept = r.json()["alias"]
+    r = await client.post("/api/shorten", json={"url": "https://old.com"})
+    archived = r.json()["alias"]
+    await client.patch(f"/api/urls/{archived}/archive", json={"archived": True})
+
+    r = await client.get("/api/urls", params={"archived": True})
+    assert [item["alias"] for item in r.json()] == [archived]
+    r = await client.get("/api/urls", params={"archived": False})
+    assert [item["alias"] for item in r.json()] == [kept]
+
+
+@pytest.mark.asyncio
+async def test_export_urls(client: AsyncClient):
+    aliases = []
+    for url in ["https://a.com", "https://b.com/x,y"]:
+        r = await client.post("/api/shorten", json={"url": url})
+        aliases.append(r.json()["alias"])
+    await client.get(f"/{aliases[0]}")
+
+    r = await client.get("/api/urls/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["alias"] for row in rows] == aliases
+    assert rows[0]["total_clicks"] == 1 and rows[1]["total_clicks"] == 0
+
+    r = await client.get("/api/urls/export", params={"format": "csv"})
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["original_url"] for row in rows] == ["https://a.com", "https://b.com/x,y"]
+    assert rows[0]["archived"] == "false"
+
+
+@pytest.mark.asyncio
+async def test_sessions_finish_before_response_except_export(client: AsyncClient, db_session):
+    """Writes commit before the response is sent; only the export stream keeps its session open."""
+    events = []
+
+    def tracked(name):
+        async def session():
+            yield db_session
+            events.append(f"{name} finished")
+        return session
+
+    app.dependency_overrides[get_db] = tracked("write")
+    app.dependency_overrides[get_read_db] = tracked("read")
+
+    async def recording_app(scope, receive, send):
+        async def record(message):
+            if message["type"] == "http.response.start":
+                events.append("response sent")
+            await send(message)
+        await app(scope, receive, record)
+
+    async with AsyncClient(transport=ASGITransport(app=recording_app), base_url="http://test") as c:
+        await c.post("/api/shorten", json={"url": "https://commit.com"})
+        assert events == ["write finished", "response sent"]
+        events.clear()
+        await c.get("/api/urls/export")
+        assert events == ["response sent", "read finished"]
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_release_their_sessions(tmp_path, monkeypatch):
+    """Through the real get_db/get_read_db: an endpoint error rolls back and frees the connection."""
+    writer, reader = _create_engines(f"sqlite+aiosqlite:///{tmp_path / 'deps.db'}")
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    for name, bind in (("AsyncSessionLocal", writer), ("ReadSessionLocal", reader)):
+        monkeypatch.setattr(database, name, async_sessionmaker(
+            bind, class_=AsyncSession, sync_session_class=TrackedSession, expire_on_commit=False
+        ))
+    for dependency in (rate_limit_shorten_dependency, rate_limit_api_dependency, rate_limit_shorten_batch_dependency):
+        app.dependency_overrides[dependency] = lambda: None
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+            alias = (await c.post("/api/shorten", json={"url": "https://first.com"})).json()["alias"]
+            r = await c.patch(f"/api/urls/{alias}", json={"original_url": "not a url"})
+            assert r.status_code == 400
+            assert (await c.get("/api/urls/zzzzz9")).status_code == 404
+            assert writer.pool.checkedout() == 0 and reader.pool.checkedout() == 0
+            # The writer's single connection is free, so the next write doesn't wait for it
+            r = await asyncio.wait_for(c.post("/api/shorten", json={"url": "https://second.com"}), timeout=5)
+            assert r.status_code == 201
+    finally:
+        app.dependency_overrides.clear()
+        await writer.dispose()
+        await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_url_detail_and_patch_stats(client: AsyncClient):
+    r = await client.post("/api/shorten", json={"url": "https://detail.com"})
+    alias = r.json()["alias"]
+    await client.get(f"/{alias}")
+    await client.get(f"/{alias}")
+
+    r = await client.get(f"/api/urls/{alias}")
+    assert r.status_code == 200
+    assert r.json() == {
+        "alias": alias,
+        "original_url": "https://detail.com",
+        "total_clicks": 2,
+        "archived": False,
+    }
+
+    r = await client.patch(f"/api/urls/{alias}", json={"original_url": "https://moved.com"})
+    assert r.json()["original_url"] == "https://moved.com"
+    assert r.json()["total_clicks"] == 2
+    r = await client.patch(f"/api/urls/{alias}/archive", json={"archived": True})
+    assert r.json()["archived"] is True
+    assert r.json()["total_clicks"] == 2
+
+    r = await client.get("/api/urls/nonex1")
+    assert r.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_analytics_not_found(client: AsyncClient):
     r = await client.get("/api/analytics/nonex1")
@@ -121,3 +300,34 @@ async def test_analytics_success(client: AsyncClient):
         assert "clicks" in day
         assert len(day["date"]) == 10  # YYYY-MM-DD
         assert day["clicks"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_analytics_batch(client: AsyncClient):
+    aliases = []
+    for i in range(3):
+        s = await client.post("/api/shorten", json={"url": f"https://example.com/spark{i}"})
+        aliases.append(s.json()["alias"])
+    for _ in range(2):
+        await client.get(f"/{aliases[1]}")
+
+    r = await client.post("/api/analytics/batch", json={"aliases": [aliases[2], "nonex1", *aliases[:2]]})
+    assert r.status_code == 200
+    data = r.json()
+    assert [item["alias"] for item in data["results"]] == [aliases[2], aliases[0], aliases[1]]
+    assert data["not_found"] == ["nonex1"]
+    totals = [sum(d["clicks"] for d in item["clicks_by_day"]) for item in data["results"]]
+    assert totals == [0, 0, 2]
+    assert all(len(item["clicks_by_day"]) == 7 for item in data["results"])
+
+    # Longer than the live counters: read from the rollup, same answer
+    r = await client.post("/api/analytics/batch", json={"aliases": [aliases[1]], "days": 60})
+    [item] = r.json()["results"]
+    assert len(item["clicks_by_day"]) == 60
+    assert item["clicks_by_day"][-1]["clicks"] == 2
+
+
+@pytest.mark.asyncio
+async def test_analytics_batch_validation(client: AsyncClient):
+    r = await client.post("/api/analytics/batch", json={"aliases": []})
+    assert r.status_code == 422
@@ -1,5 +1,9 @@
+import asyncio
+import sqlite3
 import pytest
 from httpx import AsyncClient
+from app.core import rate_limit
+from app.core.rate_limit import InMemoryRateLimiter, SQLiteRateLimiter
 
 
 @pytest.mark.asyncio
@@ -22,6 +26,20 @@ async def test_rate_limit_on_shorten(client_with_rate_limit: AsyncClient):
     assert "retry_after_seconds" in data
 
 
+@pytest.mark.asyncio
+async def test_batch_rate_limit_counts_items(client_with_rate_limit: AsyncClient, monkeypatch):
+    """Batch shortening draws per URL from its own budget, not the single-URL one."""
+    monkeypatch.setattr(rate_limit._settings, "RATE_LIMIT_BATCH_ITEMS", 10)
+    urls = [f"https://example{i}.com" for i in range(6)]
+    r = await client_with_rate_limit.post("/api/shorten/batch", json={"urls": urls})
+    assert r.status_code == 201
+    r = await client_with_rate_limit.post("/api/shorten/batch", json={"urls": urls})
+    assert r.status_code == 429
+
+    r = await client_with_rate_limit.post("/api/shorten", json={"url": "https://example.com"})
+    assert r.status_code == 201
+
+
 @pytest.mark.asyncio
 async def test_redirect_not_rate_limited(client_with_rate_limit: AsyncClient):
     """
@@ -67,3 +85,70 @@ async def test_api_endpoints_moderate_rate_limit(client_with_rate_limit: AsyncCl
     # 21st should be limited
     r = await client_with_rate_limit.get("/api/urls")
     assert r.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_retry_after(monkeypatch):
+    """Denials report when the trailing-window estimate frees a slot."""
+    now = [6000.0]  # start of a 60s window
+    monkeypatch.setattr("app.core.rate_limit.time.time", lambda: now[0])
+    limiter = InMemoryRateLimiter()
+    for _ in range(5):
+        assert await limiter.check_rate_limit("1.1.1.1", 5, 60) == (True, 0)
+    assert await limiter.check_rate_limit("1.1.1.1", 5, 60) == (False, 72)
+
+    # Halfway through the next window, 5 * 0.5 = 2.5 requests still count
+    now[0] += 90
+    for _ in range(2):
+        assert (await limiter.check_rate_limit("1.1.1.1", 5, 60))[0]
+    allowed, retry_after = await limiter.check_rate_limit("1.1.1.1", 5, 60)
+    assert not allowed and 0 < retry_after <= 30
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_key_table_is_bounded():
+    limiter = InMemoryRateLimiter(max_keys=100)
+    for i in range(1000):
+        await limiter.check_rate_limit(f"10.0.{i // 256}.{i % 256}", 5, 60)
+    assert len(limiter._state) == 100
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_matches_in_memory(tmp_path, monkeypatch):
+    now = [6000.0]
+    monkeypatch.setattr("app.core.rate_limit.time.time", lambda: now[0])
+    memory = InMemoryRateLimiter()
+    shared = SQLiteRateLimiter(str(tmp_path / "ratelimit.db"))
+    for step in [0, 0, 0, 0, 0, 0, 30, 45, 45, 45, 200]:
+        now[0] += step
+        assert await shared.check_rate_limit("1.1.1.1", 5, 60) == await memory.check_rate_limit("1.1.1.1", 5, 60)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_shared_across_workers(tmp_path):
+    """Two limiters on one file (as two worker processes would be) share a budget."""
+    path = str(tmp_path / "ratelimit.db")
+    worker_a, worker_b = SQLiteRateLimiter(path), SQLiteRateLimiter(path)
+    for i in range(5):
+        limiter = worker_a if i % 2 else worker_b
+        assert (await limiter.check_rate_limit("2.2.2.2", 5, 60, bucket="shorten"))[0]
+    assert not (await worker_a.check_rate_limit("2.2.2.2", 5, 60, bucket="shorten"))[0]
+    assert not (await worker_b.check_rate_limit("2.2.2.2", 5, 60, bucket="shorten"))[0]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_waits_for_lock_without_blocking(tmp_path):
+    """While another worker holds the write lock, checks wait without stalling the event loop."""
+    path = str(tmp_path / "ratelimit.db")
+    limiter = SQLiteRateLimiter(path)
+    assert (await limiter.check_rate_limit("3.3.3.3", 5, 60))[0]
+
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+    check = asyncio.create_task(limiter.check_rate_limit("3.3.3.3", 5, 60))
+    for _ in range(5):
+        await asyncio.sleep(0.01)  # the loop keeps running while the check waits
+    assert not check.done()
+    other_worker.execute("COMMIT")
+    other_worker.close()
+    assert (await check)[0]
@@ -2,14 +2,19 @@ import type {
   ShortenRequest, 
   ShortenResponse, 
   UrlItem, 
+  UrlPage,
+  UrlListParams,
   AnalyticsResponse,
+  AnalyticsBatchResponse,
+  RealtimeResponse,
+  TopLinksResponse,
   RateLimitError,
   ApiError
 } from '@/types/api';
 
 export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
-async function apiCall<T>(endpoint: string, options?: RequestInit): Promise<T> {
+async function apiResponse(endpoint: string, options?: RequestInit): Promise<Response> {
   const res = await fetch(`${API_BASE_URL}${endpoint}`, {
     headers: { 'Content-Type': 'application/json' },
     ...options,
@@ -35,6 +40,11 @@ async function apiCall<T>(endpoint: string, options?: RequestInit): Promise<T> {
     throw error;
   }
 
+  return res;
+}
+
+async function apiCall<T>(endpoint: string, options?: RequestInit): Promise<T> {
+  const res = await apiResponse(endpoint, options);
   return res.json();
 }
 
@@ -47,14 +57,36 @@ export const api = {
     });
   },
 
-  async getUrls(): Promise<UrlItem[]> {
-    return apiCall<UrlItem[]>('/api/urls');
+  async getUrls(params: UrlListParams = {}): Promise<UrlPage> {
+    const query = new URLSearchParams();
+    if (params.archived !== undefined) query.set('archived', String(params.archived));
+    if (params.limit !== undefined) query.set('limit', String(params.limit));
+    if (params.cursor) query.set('cursor', params.cursor);
+    const qs = query.toString();
+    const res = await apiResponse(`/api/urls${qs ? `?${qs}` : ''}`);
+    return { items: await res.json(), nextCursor: res.headers.get('X-Next-Cursor') };
   },
 
   async getAnalytics(alias: string): Promise<AnalyticsResponse> {
     return apiCall<AnalyticsResponse>(`/api/analytics/${alias}`);
   },
 
+  async getRealtime(alias: string, minutes?: number): Promise<RealtimeResponse> {
+    const qs = minutes !== undefined ? `?minutes=${minutes}` : '';
+    return apiCall<RealtimeResponse>(`/api/analytics/${alias}/realtime${qs}`);
+  },
+
+  async getTopLinks(window: TopLinksResponse['window'] = '24h', limit = 10): Promise<TopLinksResponse> {
+    return apiCall<TopLinksResponse>(`/api/analytics/top?window=${window}&limit=${limit}`);
+  },
+
+  async getAnalyticsBatch(aliases: string[], days?: number): Promise<AnalyticsBatchResponse> {
+    return apiCall<AnalyticsBatchResponse>('/api/analytics/batch', {
+      method: 'POST',
+      body: JSON.stringify({ aliases, days }),
+    });
+  },
+
   async updateUrl(alias: string, newUrl: string): Promise<UrlItem> {
     return apiCall<UrlItem>(`/api/urls/${alias}`, {
       method: 'PATCH',
@@ -18,6 +18,8 @@ export function Dashboard() {
   // URLs state
   const [urls, setUrls] = useState<UrlItem[]>([]);
   const [urlsLoading, setUrlsLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Analytics state
   const [selectedAlias, setSelectedAlias] = useState<string | null>(null);
@@ -33,9 +35,10 @@ export function Dashboard() {
   const [dialogAction, setDialogAction] = useState<UrlAction | null>(null);
   const [dialogUrl, setDialogUrl] = useState<UrlItem | null>(null);
 
+  // Archived links are filtered by the API, so refetch when the tab changes
   useEffect(() => {
     fetchUrls();
-  }, []);
+  }, [activeTab]);
 
   useEffect(() => {
     if (selectedAlias) {
@@ -46,14 +49,17 @@ export function Dashboard() {
     }
   }, [selectedAlias]);
 
+  const archivedFilter = activeTab === 'archived' ? true : undefined;
+
   const fetchUrls = async () => {
     setUrlsLoading(true);
     try {
-      const data = await api.getUrls();
-      setUrls(data);
+      const page = await api.getUrls({ archived: archivedFilter });
+      setUrls(page.items);
+      setNextCursor(page.nextCursor);
       // Auto-select first URL if none selected
-      if (data.length > 0 && !selectedAlias) {
-        setSelectedAlias(data[0].alias);
+      if (page.items.length > 0 && !selectedAlias) {
+        setSelectedAlias(page.items[0].alias);
       }
     } catch (err) {
       const apiError = err as ApiError;
@@ -63,6 +69,21 @@ export function Dashboard() {
     }
   };
 
+  const loadMoreUrls = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await api.getUrls({ archived: archivedFilter, cursor: nextCursor });
+      setUrls(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      const apiError = err as ApiError;
+      toast.error(apiError.message || 'Failed to load URLs');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchAnalytics = async (alias: string) => {
     setAnalyticsLoading(true);
     setAnalyticsError(null);
@@ -131,7 +152,7 @@ export function Dashboard() {
     }
   };
 
-  // Compute stats with useMemo
+  // Compute stats with useMemo (over the pages loaded so far)
   const totalClicks = useMemo(() => urls.reduce((sum, u) => sum + u.total_clicks, 0), [urls]);
   const activeLinks = useMemo(() => urls.length, [urls]);
 
@@ -142,8 +163,7 @@ export function Dashboard() {
         return [...urls].sort((a, b) => b.total_clicks - a.total_clicks);
       case 'recent':
         return urls; // Already sorted by created_at DESC from backend
-      case 'archived':
-        return urls.filter(u => u.archived);
+      case 'archived': // Filtered server-side
       case 'all':
       default:
         return urls;
@@ -225,6 +245,17 @@ export function Dashboard() {
               loading={urlsLoading}
               activeTab={activeTab}
             />
+
+            {nextCursor && !urlsLoading && (
+              <button
+                onClick={loadMoreUrls}
+                disabled={loadingMore}
+                className="w-full flex items-center justify-center gap-2 px-4 py-2 rounded-xl bg-card border border-border text-sm font-medium text-foreground hover:bg-muted disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+              >
+                {loadingMore && <Loader />}
+                Load more
+              </button>
+            )}
           </div>
 
           <div className="lg:sticky lg:top-4 lg:self-start">
@@ -21,14 +21,58 @@ export interface UrlItem {
   archived: boolean;
 }
 
+export interface UrlPage {
+  items: UrlItem[];
+  nextCursor: string | null; // pass back as `cursor` for the next page
+}
+
+export interface UrlListParams {
+  archived?: boolean;
+  limit?: number;
+  cursor?: string;
+}
+
 export interface ClicksByDay {
   date: string; // YYYY-MM-DD
   clicks: number;
+  unique_visitors?: number | null; // approximate; UTC daily series only
 }
 
 export interface AnalyticsResponse {
   alias: string;
+  granularity: 'day' | 'hour';
   clicks_by_day: ClicksByDay[];
+  unique_visitors?: number | null;
+}
+
+export interface ClicksByMinute {
+  minute: string; // YYYY-MM-DDTHH:MM (UTC)
+  clicks: number;
+}
+
+export interface RealtimeResponse {
+  alias: string;
+  total: number;
+  clicks_by_minute: ClicksByMinute[];
+}
+
+export interface TopLink {
+  alias: string;
+  original_url: string;
+  clicks: number;
+  error: number;
+}
+
+export interface TopLinksResponse {
+  window: '1h' | '24h' | '7d';
+  total_clicks: number;
+  max_error: number;
+  links: TopLink[];
+}
+
+export interface AnalyticsBatchResponse {
+  results: AnalyticsResponse[];
+  not_found: string[];
 }
 
 export interface ApiError {